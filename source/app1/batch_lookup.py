@@ -0,0 +1,244 @@
+import os
+import sys
+import glob
+import json
+import threading
+import multiprocessing
+from multiprocessing.util import Finalize
+import dictionary_lookup
+from lookup_cache import LookupCache
+from near_match_index import NearMatchIndex
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+_worker_state = dict()
+
+
+def _init_worker(files, shard_dir=None, cache_size=0, compact=False,
+                 cache_file=None, save_part=False):
+    """Load the dictionary and its indexes once per worker process.
+
+    The result cache starts from cache_file, when given. With save_part
+    set, the worker saves its cache to a part file of its own as the
+    worker process exits (see _merge_cache_parts).
+
+    :param files: list
+    :param shard_dir: str
+    :param cache_size: int
+    :param compact: bool
+    :param cache_file: str
+    :param save_part: bool
+    :return: None
+    """
+    data = dictionary_lookup.load_data_files(files=files,
+                                             shard_dir=shard_dir,
+                                             compact=compact)
+    _worker_state['data'] = data
+    _worker_state['case_index'] = dictionary_lookup.build_case_index(
+        data=data)
+    _worker_state['near_index'] = NearMatchIndex(words=data.keys())
+    cache = LookupCache(maxsize=cache_size, file=cache_file, source=files)
+    _worker_state['cache'] = cache
+
+    if cache_file and save_part:
+        cache.file = f'{cache_file}.part-{os.getpid()}'
+        Finalize(cache, cache.save, exitpriority=10)
+
+
+def _merge_cache_parts(files, cache_file, cache_size):
+    """Merge the part files saved by the workers into cache_file.
+
+    :param files: list
+    :param cache_file: str
+    :param cache_size: int
+    :return: None
+    """
+    cache = LookupCache(maxsize=cache_size, file=cache_file, source=files)
+
+    for part_file in glob.glob(f'{glob.escape(cache_file)}.part-*'):
+        cache.update(LookupCache(maxsize=cache_size, file=part_file,
+                                 source=files))
+        os.remove(part_file)
+
+    cache.save()
+
+
+def _resolve_word(word):
+    """Look up word in the worker's dictionary.
+
+    Return the result as one line of json text, holding the word, the
+    found word and its usages, and the near-matches for a missed word.
+
+    :param word: str
+    :return: str
+    """
+    data = _worker_state['data']
+    cache = _worker_state['cache']
+    found_word, found_usages = dictionary_lookup.find_word(
+        data, word, index=_worker_state['case_index'], cache=cache)
+
+    if found_usages:
+        near_matches = []
+    else:
+        found_word = None
+        near_matches = dictionary_lookup.find_near_matches(
+            data, word, index=_worker_state['near_index'], cache=cache)
+
+    return json.dumps({'word': word, 'found': found_word,
+                       'usages': found_usages,
+                       'near_matches': near_matches}, ensure_ascii=False)
+
+
+def iter_words(stream):
+    """Yield every non-blank line of stream as a word to look up.
+
+    :param stream: file object
+    :return: generator of str
+    """
+    for line in stream:
+        word = line.strip()
+        if word:
+            yield word
+
+
+def _bounded(items, slots, done):
+    """Yield every item of items, taking one of slots before each.
+
+    The pool's task handler drains its iterable as fast as it can, so
+    taking a slot per item bounds the words read ahead of the results.
+    Stop early once done is set.
+
+    :param items: iterable
+    :param slots: threading.Semaphore
+    :param done: threading.Event
+    :return: generator
+    """
+    for item in items:
+        slots.acquire()
+        if done.is_set():
+            return
+        yield item
+
+
+def resolve_words(files, words, workers=None, chunk_size=256, ordered=True,
+                  cache_size=0, shard_dir=None, compact=False,
+                  cache_file=None, reshard=False):
+    """Look up every word in words within the dictionary files.
+
+    Yield one line of json text per word (see _resolve_word). The words
+    are fanned out to a pool of worker processes, each of which loads
+    the dictionary once, in chunks of chunk_size words. Words are read
+    from words at most a window of words ahead of the results, so an
+    unbounded stream of words never has to be held in memory. With
+    ordered set to False, results are yielded as soon as they are ready
+    rather than in input order. Each worker keeps its own result cache
+    of cache_size results, and with compact set, holds its dictionary
+    in a CompactDictionary.
+
+    With a cache_file, every worker's cache starts from that file, and
+    once all words have been looked up, the workers' caches are merged
+    and saved back to it.
+
+    Several files are split into shard files once, here, before the
+    workers start, so the workers only open the shards (with reshard
+    set, the files are split again first).
+
+    :param files: list
+    :param words: iterable of str
+    :param workers: int
+    :param chunk_size: int
+    :param ordered: bool
+    :param cache_size: int
+    :param shard_dir: str
+    :param compact: bool
+    :param cache_file: str
+    :param reshard: bool
+    :return: generator of str
+    """
+    workers = workers or os.cpu_count() or 1
+    words = iter(words)
+
+    if len(files) > 1:
+        dictionary_lookup.load_data_files(files=files, shard_dir=shard_dir,
+                                          reshard=reshard)
+
+    if workers == 1:
+        _init_worker(files=files, shard_dir=shard_dir, cache_size=cache_size,
+                     compact=compact, cache_file=cache_file)
+        yield from map(_resolve_word, words)
+        _worker_state['cache'].save()
+        return
+
+    slots = threading.Semaphore(chunk_size * workers * 4)
+    done = threading.Event()
+
+    with multiprocessing.Pool(processes=workers, initializer=_init_worker,
+                              initargs=(files, shard_dir, cache_size,
+                                        compact, cache_file,
+                                        True)) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+
+        try:
+            for line in imap(_resolve_word,
+                             _bounded(items=words, slots=slots, done=done),
+                             chunksize=chunk_size):
+                slots.release()
+                yield line
+
+        finally:
+            done.set()
+            slots.release()
+
+        pool.close()
+        pool.join()
+
+    if cache_file:
+        _merge_cache_parts(files=files, cache_file=cache_file,
+                           cache_size=cache_size)
+
+
+def run_batch(files, batch='-', output='-', workers=None, chunk_size=256,
+              ordered=True, cache_size=0, shard_dir=None, compact=False,
+              cache_file=None, reshard=False):
+    """Look up every word listed in batch and write jsonl results to output.
+
+    Read the words, one per line, from the file named batch, and write
+    the results, one json document per line, to the file named output.
+    A name of '-' stands for stdin and stdout, respectively.
+
+    Return the number of words looked up.
+
+    :param files: list
+    :param batch: str
+    :param output: str
+    :param workers: int
+    :param chunk_size: int
+    :param ordered: bool
+    :param cache_size: int
+    :param shard_dir: str
+    :param compact: bool
+    :param cache_file: str
+    :param reshard: bool
+    :return: int
+    """
+    source = sys.stdin if batch == '-' else open(batch)
+    target = sys.stdout if output == '-' else open(output, 'w')
+    count = 0
+
+    try:
+        for line in resolve_words(files=files, words=iter_words(source),
+                                  workers=workers, chunk_size=chunk_size,
+                                  ordered=ordered, cache_size=cache_size,
+                                  shard_dir=shard_dir, compact=compact,
+                                  cache_file=cache_file, reshard=reshard):
+            target.write(f'{line}\n')
+            count += 1
+
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    return count
@@ -0,0 +1,230 @@
+from array import array
+from collections.abc import Mapping
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+"""Compact store layout:
+
+    keys            utf-8 encoded words, back to back, one buffer
+    key offsets     position of every word within keys, plus the end
+    texts           utf-8 encoded usage texts, back to back, one buffer;
+                    every distinct text is stored once
+    text offsets    position of every text within texts, plus the end
+    usage ids       text number of every usage, grouped by word
+    usage offsets   position of every word's group within usage ids,
+                    plus the end
+    list flags      one byte per word, set when its usages are a list
+
+Words are sorted by (casefolded word, word), as in a snapshot file, so
+both exact lookups and casefolded lookups are a binary search, and all
+spellings of a word sit next to each other."""
+
+
+def _sort_key(word):
+    return word.casefold(), word
+
+
+def _narrow(offsets):
+    """Copy offsets into an array of 4-byte items, unless the largest
+    offset needs 8 bytes.
+
+    :param offsets: array
+    :return: array
+    """
+    return array('I' if offsets[-1] < 1 << 32 else 'Q', offsets)
+
+
+class _CompactCaseIndex:
+    """Case index (casefolded word -> spellings) served by a compact store."""
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, folded, default=None):
+        return self.store.spellings(folded) or default
+
+
+class CompactDictionary(Mapping):
+    """Read-only dictionary of words and their usages, packed into a few
+    flat buffers and arrays.
+
+    A dict of words holds a str object for every word and usage and a
+    list object for every word's usages, and the overhead of those
+    objects outweighs the text itself. Here, the words are held in one
+    utf-8 buffer and the usage texts in another, addressed by arrays of
+    offsets, and a usage text that occurs more than once is stored only
+    once. A word's usages are decoded only when the word is looked up.
+
+    Lookups are a binary search over the sorted words, so they take
+    O(log n) time. The store is built once, from (word, usages) entries;
+    when a word appears more than once, its last usages win.
+    """
+    def __init__(self, entries):
+        self._texts = bytearray()
+        self._text_offsets = array('Q', [0])
+        self._text_ids = dict()
+        self._text_clashes = dict()
+        entry_ids = dict()
+        entry_usages = array('I')
+        entry_offsets = array('Q', [0])
+        entry_lists = bytearray()
+
+        for word, usages in entries:
+            is_list = isinstance(usages, list)
+            for text in (usages if is_list else [usages]):
+                entry_usages.append(self._intern(text.encode('utf-8')))
+
+            entry_ids[word] = len(entry_lists)
+            entry_offsets.append(len(entry_usages))
+            entry_lists.append(is_list)
+
+        del self._text_ids, self._text_clashes
+
+        words = sorted(entry_ids, key=_sort_key)
+        self._keys = bytearray()
+        self._key_offsets = array('Q', [0])
+        self._usage_ids = array('I')
+        self._usage_offsets = array('Q', [0])
+        self._lists = bytearray()
+
+        for word in words:
+            entry = entry_ids[word]
+            self._keys += word.encode('utf-8')
+            self._key_offsets.append(len(self._keys))
+            self._usage_ids.extend(entry_usages[entry_offsets[entry]:
+                                                entry_offsets[entry + 1]])
+            self._usage_offsets.append(len(self._usage_ids))
+            self._lists.append(entry_lists[entry])
+
+        self._text_offsets = _narrow(self._text_offsets)
+        self._key_offsets = _narrow(self._key_offsets)
+        self._usage_offsets = _narrow(self._usage_offsets)
+        self._count = len(words)
+        self.case_index = _CompactCaseIndex(store=self)
+
+    def _intern(self, encoded):
+        """Return the text number of an encoded usage text, appending the
+        text to the texts buffer if it has not been stored yet.
+
+        Texts are filed by hash only, so that the build never holds a
+        str object for every distinct text; the rare text whose hash is
+        taken by another is filed under its own bytes.
+
+        :param encoded: bytes
+        :return: int
+        """
+        key = hash(encoded)
+        text_id = self._text_ids.get(key)
+        if text_id is not None and self._texts[
+                self._text_offsets[text_id]:
+                self._text_offsets[text_id + 1]] != encoded:
+            text_id = self._text_clashes.get(encoded)
+            key = None
+
+        if text_id is None:
+            text_id = len(self._text_offsets) - 1
+            self._texts += encoded
+            self._text_offsets.append(len(self._texts))
+            if key is None:
+                self._text_clashes[encoded] = text_id
+            else:
+                self._text_ids[key] = text_id
+
+        return text_id
+
+    def _word(self, i):
+        return self._keys[self._key_offsets[i]:
+                          self._key_offsets[i + 1]].decode('utf-8')
+
+    def _text(self, text_id):
+        return self._texts[self._text_offsets[text_id]:
+                           self._text_offsets[text_id + 1]].decode('utf-8')
+
+    def _usages(self, i):
+        usages = [self._text(text_id) for text_id in
+                  self._usage_ids[self._usage_offsets[i]:
+                                  self._usage_offsets[i + 1]]]
+
+        return usages if self._lists[i] else usages[0]
+
+    def _search(self, folded):
+        """Return position of the first word that casefolds to folded or
+        sorts after it."""
+        lo, hi = 0, self._count
+        target = (folded, '')
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _sort_key(self._word(mid)) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+    def _locate(self, word):
+        folded = word.casefold()
+        i = self._search(folded)
+
+        while i < self._count:
+            found = self._word(i)
+            if found == word:
+                return i
+            if found.casefold() != folded:
+                break
+            i += 1
+
+        return None
+
+    def memory_usage(self):
+        """Return the number of bytes held by the store's buffers and arrays.
+
+        :return: int
+        """
+        return sum(len(buffer) * getattr(buffer, 'itemsize', 1) for buffer in
+                   (self._keys, self._key_offsets, self._texts,
+                    self._text_offsets, self._usage_ids,
+                    self._usage_offsets, self._lists))
+
+    def spellings(self, folded):
+        """Return every word in the store that casefolds to folded.
+
+        :param folded: str
+        :return: list
+        """
+        words = []
+        i = self._search(folded)
+
+        while i < self._count:
+            word = self._word(i)
+            if word.casefold() != folded:
+                break
+            words.append(word)
+            i += 1
+
+        return words
+
+    def get(self, word, default=None):
+        i = self._locate(word)
+        if i is None:
+            return default
+
+        return self._usages(i)
+
+    def __getitem__(self, word):
+        i = self._locate(word)
+        if i is None:
+            raise KeyError(word)
+
+        return self._usages(i)
+
+    def __contains__(self, word):
+        return isinstance(word, str) and self._locate(word) is not None
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._word(i)
+
+    def __len__(self):
+        return self._count
@@ -0,0 +1,10 @@
+import os
+import sys
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+# The app1 modules import each other by their bare names, as they do when
+# run as scripts from this directory.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
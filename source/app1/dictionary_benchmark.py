@@ -0,0 +1,384 @@
+import gc
+import os
+import sys
+import json
+import time
+import random
+import platform
+import multiprocessing
+import interactive_dictionary
+from queue import Empty
+from near_match_index import NearMatchIndex
+from argparse import ArgumentParser, RawDescriptionHelpFormatter
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+_description = """\
+Interactive Dictionary Benchmark Suite
+
+Objective
+    Measure the load and lookup performance of the Interactive
+    Dictionary Lookup Utility against synthetic dictionaries."""
+_epilog = """\
+Detail
+    A synthetic dictionary is generated for every requested size.
+    Each dictionary is measured with every requested backend, in a
+    fresh process so that its peak memory use is its own:
+
+    - json, load_data_file() parses the json-formatted file.
+
+    - snapshot, the file is compiled once into a binary snapshot,
+      which load_data_file() then memory-maps.
+
+    - compact, load_data_file() packs the json-formatted file into
+      a CompactDictionary.
+
+    Reported per run: load time, peak and current resident memory
+    after loading, p50/p99 latency of find_word() for words present
+    in the dictionary (in random casing), and p50/p99 latency of
+    find_near_matches() for misspelled words, along with the time
+    to build the near-match index. Results are printed and saved
+    as json for comparison between versions."""
+__doc__ = f"""\
+{_description}
+{_epilog}"""
+_result_poll_seconds = 1.0
+_letters = 'etaoinshrdlcumwfgypbvkjxqz'
+_letter_weights = [12.7, 9.1, 8.2, 7.5, 7.0, 6.7, 6.3, 6.1, 6.0, 4.3, 4.0, 2.8,
+                   2.8, 2.4, 2.4, 2.2, 2.0, 2.0, 1.9, 1.5, 1.0, 0.8, 0.2, 0.2,
+                   0.1, 0.1]
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def _read_app_version():
+    """Return the version of the app, as declared by app_version in the
+    package's __init__.py, or None when it is not declared there.
+
+    :return: str
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '__init__.py')
+
+    with open(path) as fh:
+        for line in fh:
+            name, _, value = line.partition('=')
+            if name.strip() == 'app_version':
+                return value.strip().strip('\'"')
+
+    return None
+
+
+def _receive_result(process, queue):
+    """Wait for the result of a measuring process, and return it.
+
+    The queue is polled, so that a process that dies before putting its
+    result raises BenchmarkError instead of blocking forever.
+
+    :param process: multiprocessing.Process
+    :param queue: multiprocessing.Queue
+    :return: dict
+    """
+    while True:
+        try:
+            return queue.get(timeout=_result_poll_seconds)
+
+        except Empty:
+            if not process.is_alive():
+                raise BenchmarkError(f'measuring process exited with code '
+                                     f'{process.exitcode}')
+
+
+def _generate_words(count, rng):
+    """Generate count distinct, word-like strings.
+
+    :param count: int
+    :param rng: random.Random
+    :return: list
+    """
+    words = set()
+
+    while len(words) < count:
+        length = min(max(int(rng.gauss(8, 3)), 2), 20)
+        word = ''.join(rng.choices(_letters, weights=_letter_weights,
+                                   k=length))
+        casing = rng.random()
+        if casing < 0.05:
+            word = word.title()
+        elif casing < 0.07:
+            word = word.upper()
+        words.add(word)
+
+    return sorted(words)
+
+
+def _misspell(word, rng):
+    """Apply one random edit (delete, insert, substitute, or transpose).
+
+    :param word: str
+    :param rng: random.Random
+    :return: str
+    """
+    i = rng.randrange(len(word))
+    edit = rng.randrange(4)
+
+    if edit == 0 and len(word) > 2:
+        return word[:i] + word[i + 1:]
+    if edit == 1:
+        return word[:i] + rng.choice(_letters) + word[i:]
+    if edit == 2:
+        return word[:i] + rng.choice(_letters) + word[i + 1:]
+    if i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+    return word + rng.choice(_letters)
+
+
+def generate_dictionary(file, size, structure='mixed', seed=0):
+    """Write a synthetic json-formatted dictionary file of size words.
+
+    Usages are a string (structure 'string'), a list of strings
+    (structure 'list'), or either, alternately (structure 'mixed').
+
+    :param file: str
+    :param size: int
+    :param structure: str
+    :param seed: int
+    :return: None
+    """
+    rng = random.Random(seed)
+    words = _generate_words(count=size, rng=rng)
+    data = dict()
+
+    for i, word in enumerate(words):
+        usages = [f'Usage {n + 1} of the word {word}, as in a synthetic '
+                  f'sentence number {i}.' for n in range(rng.randint(1, 4))]
+        if structure == 'string' or (structure == 'mixed' and i % 2):
+            usages = usages[0]
+        data[word] = usages
+
+    with open(file, 'w') as fh:
+        json.dump(data, fh)
+
+
+def _percentile(samples, percent):
+    """Return the value below which percent of the samples fall.
+
+    :param samples: list
+    :param percent: float
+    :return: float
+    """
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+def _peak_rss_kb():
+    """Return the peak resident memory of this process so far, in KiB,
+    or None where the resource module is unavailable.
+
+    :return: int
+    """
+    if not resource:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+
+    return peak
+
+
+def _rss_kb():
+    """Return the current resident memory of this process, in KiB, or
+    None where /proc is unavailable.
+
+    :return: int
+    """
+    try:
+        with open('/proc/self/statm') as fh:
+            resident = int(fh.read().split()[1])
+
+    except (OSError, IndexError, ValueError):
+        return None
+
+    return resident * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def _timed(function, words):
+    """Call function once for each of words, timing every call.
+
+    Return the median and 99th percentile latency, in microseconds.
+
+    :param function: function
+    :param words: list
+    :return: dict
+    """
+    samples = []
+
+    for word in words:
+        start = time.perf_counter()
+        function(word)
+        samples.append(time.perf_counter() - start)
+
+    return {'p50_us': round(_percentile(samples, 50) * 1e6, 2),
+            'p99_us': round(_percentile(samples, 99) * 1e6, 2),
+            'count': len(samples)}
+
+
+def _measure(file, compact, lookups, near_lookups, seed, queue):
+    """Load file and time lookups against it; run in a fresh process.
+
+    :param file: str
+    :param compact: bool
+    :param lookups: int
+    :param near_lookups: int
+    :param seed: int
+    :param queue: multiprocessing.Queue
+    :return: None
+    """
+    start = time.perf_counter()
+    data = interactive_dictionary.load_data_file(file=file, compact=compact)
+    case_index = interactive_dictionary.build_case_index(data=data)
+    load_seconds = time.perf_counter() - start
+    peak_rss_kb = _peak_rss_kb()
+    gc.collect()
+    rss_kb = _rss_kb()
+
+    rng = random.Random(seed)
+    words = list(data.keys())
+    hits = [rng.choice([word.lower(), word.upper(), word.title()])
+            for word in rng.choices(words, k=lookups)]
+    misses = []
+    while len(misses) < near_lookups:
+        word = _misspell(rng.choice(words), rng)
+        if word not in data:
+            misses.append(word)
+
+    start = time.perf_counter()
+    near_index = NearMatchIndex(words=data.keys())
+    len(near_index)
+    near_index_seconds = time.perf_counter() - start
+
+    queue.put({
+        'load_seconds': round(load_seconds, 4),
+        'peak_rss_kb': peak_rss_kb,
+        'rss_kb': rss_kb,
+        'find_word': _timed(lambda word: interactive_dictionary.find_word(
+            data, word, index=case_index), hits),
+        'near_index_build_seconds': round(near_index_seconds, 4),
+        'find_near_matches': _timed(
+            lambda word: interactive_dictionary.find_near_matches(
+                data, word, index=near_index), misses),
+        'peak_rss_kb_after_lookups': _peak_rss_kb(),
+    })
+
+
+def run_benchmarks(sizes, backends=('json', 'snapshot', 'compact'),
+                   structure='mixed', lookups=10000, near_lookups=500,
+                   work_dir='.', seed=0):
+    """Generate dictionaries and measure every backend against each.
+
+    Return a list of result records, one per (size, backend) run.
+
+    :param sizes: list
+    :param backends: tuple
+    :param structure: str
+    :param lookups: int
+    :param near_lookups: int
+    :param work_dir: str
+    :param seed: int
+    :return: list
+    """
+    context = multiprocessing.get_context('spawn')
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+
+    for size in sizes:
+        json_file = f'{work_dir}/benchmark-{size}-{structure}.json'
+        if not os.path.isfile(json_file):
+            generate_dictionary(file=json_file, size=size,
+                                structure=structure, seed=seed)
+
+        for backend in backends:
+            record = {'size': size, 'structure': structure,
+                      'backend': backend}
+            file = json_file
+
+            if backend == 'snapshot':
+                file = f'{work_dir}/benchmark-{size}-{structure}.snapshot'
+                start = time.perf_counter()
+                interactive_dictionary.compile_data_file(file=json_file,
+                                                         target=file)
+                record['compile_seconds'] = round(
+                    time.perf_counter() - start, 4)
+
+            queue = context.Queue()
+            process = context.Process(target=_measure, args=(
+                file, backend == 'compact', lookups, near_lookups, seed,
+                queue))
+            process.start()
+            record.update(_receive_result(process=process, queue=queue))
+            process.join()
+
+            print(json.dumps(record))
+            results.append(record)
+
+    return results
+
+
+def _parse_args():
+    """Parse and validate command line arguments.
+
+    Return the arguments with their values. Print the module's
+    usage message when the arguments are determined to be invalid.
+
+    :return: argparse.Namespace
+    """
+    parser = ArgumentParser(description=_description, epilog=_epilog,
+                            formatter_class=RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--sizes', type=int, nargs='+',
+                        default=[10000, 100000, 1000000],
+                        help='Dictionary sizes (number of words) to measure.')
+    parser.add_argument('-b', '--backends', type=str, nargs='+',
+                        default=['json', 'snapshot', 'compact'],
+                        choices=['json', 'snapshot', 'compact'],
+                        help='Dictionary backends to measure.')
+    parser.add_argument('--structure', type=str, default='mixed',
+                        choices=['mixed', 'string', 'list'],
+                        help='Usages structure of the synthetic dictionaries.')
+    parser.add_argument('--lookups', type=int, default=10000,
+                        help='Number of find_word lookups to time.')
+    parser.add_argument('--near-lookups', type=int, default=500,
+                        help='Number of find_near_matches lookups to time.')
+    parser.add_argument('-d', '--work-dir', type=str, default='.',
+                        help='Directory to keep generated dictionaries in.')
+    parser.add_argument('-o', '--output', type=str,
+                        default='benchmark_results.json',
+                        help='File to save the json results to.')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = _parse_args()
+
+    results = run_benchmarks(sizes=args.sizes, backends=args.backends,
+                             structure=args.structure, lookups=args.lookups,
+                             near_lookups=args.near_lookups,
+                             work_dir=args.work_dir)
+
+    with open(args.output, 'w') as fh:
+        json.dump({'app_version': _read_app_version(),
+                   'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'results': results}, fh, indent=2)
+
+    print(f'Benchmark results saved to file:\n  {args.output}')
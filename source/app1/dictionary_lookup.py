@@ -0,0 +1,188 @@
+import difflib
+import heapq
+import sharded_dictionary
+from dictionary_source import load_data_file
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+
+def build_case_index(data):
+    """Map every casefolded word in data to the words of that spelling.
+
+    Return a dict whose keys are casefolded words and whose values are
+    lists of the original words (e.g. 'iphone' -> ['iPhone', 'IPHONE']).
+    The index is built in one pass over the words of data and holds
+    references to the existing word strings only; no usages are copied.
+
+    A dictionary snapshot or a sharded dictionary carries its own case
+    index, which is returned as is.
+
+    :param data: dict
+    :return: dict
+    """
+    case_index = getattr(data, 'case_index', None)
+    if case_index is not None:
+        return case_index
+
+    index = dict()
+
+    for key in data.keys():
+        index.setdefault(key.casefold(), []).append(key)
+
+    return index
+
+
+def find_completions(data, prefix, index=None, limit=10):
+    """Locate the words within data that start with prefix.
+
+    Return up to limit words, in sorted order. When a prebuilt
+    PrefixTrie is supplied, walk the trie along the prefix. Otherwise,
+    scan every word in data.
+
+    :param data: dict
+    :param prefix: str
+    :param index: PrefixTrie
+    :param limit: int
+    :return: list
+    """
+    if index is not None:
+        return index.complete(prefix, limit=limit)
+
+    return heapq.nsmallest(limit, (word for word in data.keys()
+                                   if word.startswith(prefix)))
+
+
+def find_near_matches(data, word, index=None, cache=None):
+    """Locate best near-matches for word within data.
+
+    When a prebuilt NearMatchIndex is supplied, consult the index for the
+    best near-matches for this word. Otherwise, use the difflib package
+    to scan every word in data.
+
+    When a LookupCache is supplied, a copy of a cached result is returned
+    when available, and a newly computed result is cached as a tuple.
+
+    :param data: dict
+    :param word: str
+    :param index: NearMatchIndex
+    :param cache: LookupCache
+    :return: list
+    """
+    if cache is not None:
+        words = cache.get(('find_near_matches', word))
+        if words is not None:
+            return list(words)
+
+    guess_words = [word.lower(), word.upper(), word.title()]
+    words = []
+
+    for guess_word in guess_words:
+        if index:
+            words.extend(index.get_close_matches(guess_word))
+        else:
+            words.extend(difflib.get_close_matches(guess_word, data.keys()))
+
+    if cache is not None:
+        cache.put(('find_near_matches', word), tuple(words))
+
+    return words
+
+
+def find_word(data, word, index=None, cache=None):
+    """Look up usages for word within data.
+
+    Return a 2-tuple of either: a) the validated word and
+    the list containing all word usages that are found, or
+    b) the unvalidated word and None for those cases where
+    no usages are found.
+
+    When more than one spelling of word is found, the preferred
+    spelling is returned (see find_word_variants).
+
+    :param data: dict
+    :param word: str
+    :param index: dict
+    :param cache: LookupCache
+    :return: tuple
+    """
+    variants = find_word_variants(data, word, index=index, cache=cache)
+
+    if variants:
+        return variants[0]
+
+    return word, None
+
+
+def find_word_variants(data, word, index=None, cache=None):
+    """Look up usages for every spelling of word within data.
+
+    Return a list of 2-tuples, each holding a validated word and its
+    usages. Spellings in lower case, upper case, and title case come
+    first, in that order, followed by any other spellings.
+
+    Without an index, only the lower, upper, and title case spellings
+    of word are probed. With a case index (see build_case_index), a
+    single probe locates every spelling of word, including mixed-case
+    words like 'McDonald' or 'iPhone'.
+
+    When a LookupCache is supplied, a copy of a cached result is returned
+    when available, and a newly computed result is cached as a tuple.
+
+    :param data: dict
+    :param word: str
+    :param index: dict
+    :param cache: LookupCache
+    :return: list
+    """
+    if cache is not None:
+        variants = cache.get(('find_word_variants', word))
+        if variants is not None:
+            return list(variants)
+
+    candidates = [word.lower(), word.upper(), word.title()]
+
+    if index is not None:
+        spellings = index.get(word.casefold(), [])
+        candidates = [candidate for candidate in candidates
+                      if candidate in spellings] + spellings
+
+    variants = []
+
+    for candidate in dict.fromkeys(candidates):
+        usages = data.get(candidate)
+        if usages:
+            variants.append((candidate, usages))
+
+    if cache is not None:
+        cache.put(('find_word_variants', word), tuple(variants))
+
+    return variants
+
+
+def load_data_files(files, shard_dir=None, shard_count=64, compact=False,
+                    reshard=False):
+    """Load one or more dictionary files for lookups.
+
+    For a single file, return the result of load_data_file. For several
+    files, return a ShardedDictionary that combines them: each file is
+    split into shard files once, and a shard is loaded only when a
+    lookup first touches it, with the usages of a word merged from every
+    file that has the word. With compact set, the dictionary (or each
+    loaded shard) is held in a CompactDictionary. With reshard set, the
+    files are split again even when their shard files are current.
+
+    :param files: list
+    :param shard_dir: str
+    :param shard_count: int
+    :param compact: bool
+    :param reshard: bool
+    :return: dict
+    """
+    if len(files) == 1:
+        return load_data_file(file=files[0], compact=compact)
+
+    return sharded_dictionary.ShardedDictionary(
+        files=files, shard_dir=shard_dir, shard_count=shard_count,
+        compact=compact, reshard=reshard)
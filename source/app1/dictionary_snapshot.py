@@ -0,0 +1,223 @@
+import os
+import json
+import mmap
+import struct
+from collections.abc import Mapping
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+# Snapshot file layout (all integers are little-endian):
+#
+#     header      magic, format version, word count, offset of the key
+#                 blob, offset of the record table
+#     usages      one compact json document per word, back to back
+#     keys        utf-8 encoded words, back to back
+#     records     one fixed-size record per word: key offset (relative
+#                 to the key blob), key length, usages offset, usages
+#                 length
+#
+# Records are sorted by (casefolded word, word), so both exact lookups
+# and casefolded lookups are a binary search over the record table, and
+# all spellings of a word sit next to each other.
+_magic = b'TPMCDICT'
+_format_version = 1
+_header = struct.Struct('<8sIIQQ')
+_record = struct.Struct('<IIQI')
+
+
+class InvalidSnapshot(Exception):
+    pass
+
+
+def _sort_key(word):
+    return word.casefold(), word
+
+
+def compile_snapshot(entries, file):
+    """Write entries to file as a binary dictionary snapshot.
+
+    Each definition is written to the file as soon as it is read from
+    entries, so only the words and their offsets are held in memory.
+    When a word appears more than once, its last usages win. The file
+    is written under a temporary name and then moved into place.
+
+    :param entries: iterable of (str, str or list) tuples
+    :param file: str
+    :return: int
+    """
+    tmp_file = f'{file}.tmp'
+    records = dict()
+
+    with open(tmp_file, 'wb') as fh:
+        fh.write(bytes(_header.size))
+
+        for word, usages in entries:
+            blob = json.dumps(usages, ensure_ascii=False,
+                              separators=(',', ':')).encode('utf-8')
+            records[word] = (fh.tell(), len(blob))
+            fh.write(blob)
+
+        words = sorted(records, key=_sort_key)
+
+        keys_offset = fh.tell()
+        key_offsets = []
+        for word in words:
+            encoded = word.encode('utf-8')
+            key_offsets.append((fh.tell() - keys_offset, len(encoded)))
+            fh.write(encoded)
+
+        table_offset = fh.tell()
+        for word, (key_offset, key_length) in zip(words, key_offsets):
+            usages_offset, usages_length = records[word]
+            fh.write(_record.pack(key_offset, key_length,
+                                  usages_offset, usages_length))
+
+        fh.seek(0)
+        fh.write(_header.pack(_magic, _format_version, len(words),
+                              keys_offset, table_offset))
+
+    os.replace(tmp_file, file)
+
+    return len(words)
+
+
+def is_snapshot(file):
+    """Determine whether file is a binary dictionary snapshot.
+
+    :param file: str
+    :return: bool
+    """
+    try:
+        with open(file, 'rb') as fh:
+            return fh.read(len(_magic)) == _magic
+
+    except OSError:
+        return False
+
+
+class _SnapshotCaseIndex:
+    """Case index (casefolded word -> spellings) served by a snapshot."""
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def get(self, folded, default=None):
+        return self.snapshot.spellings(folded) or default
+
+
+class DictionarySnapshot(Mapping):
+    """Read-only, memory-mapped view of a binary dictionary snapshot.
+
+    Opening a snapshot maps the file and reads its header; nothing else
+    is decoded up front. A word's usages are decoded only when the word
+    is looked up, and pages of the file are loaded by the OS on demand.
+    """
+    def __init__(self, file):
+        with open(file, 'rb') as fh:
+            try:
+                self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise InvalidSnapshot(file)
+
+        try:
+            magic, version, count, keys_offset, table_offset = \
+                _header.unpack_from(self._mmap, 0)
+        except struct.error:
+            raise InvalidSnapshot(file)
+
+        if magic != _magic or version != _format_version:
+            raise InvalidSnapshot(file)
+
+        self.file = file
+        self._count = count
+        self._keys_offset = keys_offset
+        self._table_offset = table_offset
+        self.case_index = _SnapshotCaseIndex(snapshot=self)
+
+    def _record(self, i):
+        return _record.unpack_from(self._mmap,
+                                   self._table_offset + i * _record.size)
+
+    def _word(self, i):
+        key_offset, key_length, _, _ = self._record(i)
+        key_offset += self._keys_offset
+        return self._mmap[key_offset:key_offset + key_length].decode('utf-8')
+
+    def _usages(self, i):
+        _, _, usages_offset, usages_length = self._record(i)
+        return json.loads(
+            self._mmap[usages_offset:usages_offset + usages_length])
+
+    def _search(self, folded):
+        """Return position of the first record whose word casefolds to
+        folded or sorts after it."""
+        lo, hi = 0, self._count
+        target = (folded, '')
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _sort_key(self._word(mid)) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+    def _locate(self, word):
+        i = self._search(word.casefold())
+
+        while i < self._count:
+            found = self._word(i)
+            if found == word:
+                return i
+            if found.casefold() != word.casefold():
+                break
+            i += 1
+
+        return None
+
+    def spellings(self, folded):
+        """Return every word in the snapshot that casefolds to folded.
+
+        :param folded: str
+        :return: list
+        """
+        words = []
+        i = self._search(folded)
+
+        while i < self._count:
+            word = self._word(i)
+            if word.casefold() != folded:
+                break
+            words.append(word)
+            i += 1
+
+        return words
+
+    def close(self):
+        self._mmap.close()
+
+    def get(self, word, default=None):
+        i = self._locate(word)
+        if i is None:
+            return default
+
+        return self._usages(i)
+
+    def __getitem__(self, word):
+        i = self._locate(word)
+        if i is None:
+            raise KeyError(word)
+
+        return self._usages(i)
+
+    def __contains__(self, word):
+        return isinstance(word, str) and self._locate(word) is not None
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._word(i)
+
+    def __len__(self):
+        return self._count
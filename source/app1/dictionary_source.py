@@ -0,0 +1,117 @@
+import json
+import codecs
+import requests
+from json_stream import InvalidStructure, iter_entries
+from dictionary_snapshot import DictionarySnapshot, InvalidSnapshot
+from dictionary_snapshot import compile_snapshot, is_snapshot
+from compact_store import CompactDictionary
+from urllib.parse import urlparse
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+_chunk_size = 1 << 16
+
+
+class DownloadError(Exception):
+    pass
+
+
+class InvalidFileStructure(Exception):
+    pass
+
+
+def compile_data_file(file, target):
+    """Compile a json-formatted dictionary file into a snapshot file.
+
+    The dictionary file is streamed entry by entry into the snapshot
+    file, so it is never held in memory as a whole. Return the number
+    of words written to the snapshot file.
+
+    :param file: str
+    :param target: str
+    :return: int
+    """
+    return compile_snapshot(entries=iter_data_file(file=file), file=target)
+
+
+def iter_data_file(file='data.json'):
+    """Read json-formatted file containing words and their usages, one
+    entry at a time.
+
+    Yield a (word, usages) tuple for every entry as soon as it has been
+    parsed. The file is read in chunks, either from the local filesystem
+    or as a streamed response from a remote server, so neither the raw
+    text nor the parsed dictionary is held in memory as a whole. Every
+    entry is validated as it is read.
+
+    :param file: str
+    :return: generator of tuples
+    """
+    if urlparse(file).scheme in ('http', 'https'):
+        try:
+            with requests.get(file, stream=True) as response:
+                response.raise_for_status()
+                chunks = codecs.iterdecode(
+                    response.iter_content(chunk_size=_chunk_size), 'utf-8')
+                yield from iter_entries(chunks)
+
+        except requests.exceptions.RequestException:
+            raise DownloadError(file)
+
+        except (InvalidStructure, json.JSONDecodeError, UnicodeDecodeError):
+            raise InvalidFileStructure(file)
+
+        return
+
+    try:
+        with open(file) as fh:
+            yield from iter_entries(iter(lambda: fh.read(_chunk_size), ''))
+
+    except FileNotFoundError:
+        raise FileNotFoundError(file)
+
+    except (InvalidStructure, json.JSONDecodeError, UnicodeDecodeError):
+        raise InvalidFileStructure(file)
+
+    except OSError:
+        raise FileNotFoundError(file)
+
+
+def load_data_file(file='data.json', compact=False):
+    """Read json-formatted file containing common words and their usages.
+
+    Populate and return a dict containing words (keys) and their
+    dictionary usages (values).
+
+    The language dictionary file must read as a valid json structure.
+    The file may be located either on the local filesystem or on a
+    remote server. It is parsed incrementally (see iter_data_file).
+
+    A compiled dictionary snapshot file is opened as a memory-mapped
+    DictionarySnapshot, which is used in the same way as the dict.
+
+    With compact set, the entries are packed into a CompactDictionary
+    instead, which is used in the same way as the dict but holds far
+    fewer Python objects.
+
+    :param file: str
+    :param compact: bool
+    :return: dict
+    """
+    if is_snapshot(file):
+        try:
+            data = DictionarySnapshot(file)
+
+        except InvalidSnapshot:
+            raise InvalidFileStructure(file)
+
+        if compact:
+            data = CompactDictionary(entries=data.items())
+
+        return data
+
+    if compact:
+        return CompactDictionary(entries=iter_data_file(file=file))
+
+    return dict(iter_data_file(file=file))
@@ -1,15 +1,32 @@
 import os
 import sys
-import requests
-import json
-import difflib
-
-__doc__ = """\
+import batch_lookup
+import lookup_server
+import sharded_dictionary
+from near_match_index import NearMatchIndex
+from prefix_trie import PrefixTrie
+from lookup_cache import LookupCache
+# The loaders and lookups live in their own modules, so that the batch and
+# server modules can share them; they remain importable from here as well.
+from dictionary_source import DownloadError, InvalidFileStructure
+from dictionary_source import compile_data_file, iter_data_file
+from dictionary_source import load_data_file
+from dictionary_lookup import build_case_index, find_completions
+from dictionary_lookup import find_near_matches, find_word
+from dictionary_lookup import find_word_variants, load_data_files
+from argparse import ArgumentParser, RawDescriptionHelpFormatter
+
+try:
+    import readline
+except ImportError:
+    readline = None
+
+_description = """\
 Interactive Dictionary Lookup Utility
 
 Objective
-    Look up usages of a word within a language dictionary file.
-
+    Look up usages of a word within a language dictionary file."""
+_epilog = """\
 Detail
     This is an interactive dictionary command-line script. This
     app comes packaged with an English-language dictionary file.
@@ -31,13 +48,62 @@ Detail
 
     - { "WORD": [ "DEFINITION_1", "DEFINITION_2", ... ], ... }
 
-Script Usage
-    Optional command-line parameters:
-
-    --help, -h                  Print this help message and exit.
-
-    --file=<PATH TO FILE>, -f <PATH TO FILE>
-                                Path to a json-formatted dictionary file."""
+Dictionary Snapshots
+    The compile command converts a json-formatted dictionary file
+    into a compact binary snapshot file. A snapshot file may be
+    given to the --file option in place of a json-formatted file.
+    It is memory-mapped rather than parsed, so startup time stays
+    nearly constant, and the usages of a word are decoded only
+    when that word is looked up.
+
+Batch Lookups
+    The --batch option replaces the interactive prompt. Words are
+    read one per line from a file or from stdin, and one json
+    document per word is written to stdout or to the --output
+    file, e.g.:
+
+    {"word": "bar", "found": "bar", "usages": [...], "near_matches": []}
+
+    The lookups are spread across a pool of worker processes,
+    each of which loads the dictionary once.
+
+Lookup Server
+    The --serve option loads the dictionary once and answers
+    lookups from clients over a unix socket (--socket) or a
+    localhost port (--port), one json request per line. The
+    --connect option runs the interactive prompt against a
+    running server, so no dictionary is loaded at startup.
+
+Combined Dictionaries
+    When the --file option is given more than once, the files are
+    combined. Each file is split once into shard files (kept in
+    the --shard-dir directory) by a hash of the word, and a shard
+    is loaded only when a lookup first touches it. The usages of
+    a word are merged from every file that has the word. A file
+    is split again once it changes, a url once a day, and every
+    file whenever the --reshard option is given.
+
+Prefix Queries
+    At the prompt, input of the form prefix:<PREFIX> lists the
+    words that start with PREFIX, and the TAB key completes a
+    partially typed word (where the readline module is available).
+
+Result Cache
+    Lookup results are kept in a least-recently-used cache of
+    --cache-size results, so repeated words and misspellings are
+    answered without recomputing their near-matches. With the
+    --cache-file option, the cache is kept between sessions; it
+    is discarded when the dictionary file has changed since.
+
+Compact Dictionaries
+    The --compact option packs the loaded dictionary into a few
+    flat buffers instead of a dict of str and list objects, with
+    every distinct usage text stored once. Resident memory shrinks
+    several-fold for large dictionaries, while a lookup remains a
+    binary search over the sorted words."""
+__doc__ = f"""\
+{_description}
+{_epilog}"""
 _file_meta = """\
 Project Repo: https://github.com/zero2cx/tpmc.git
 Author: David Schenck
@@ -45,14 +111,7 @@ Acknowledgement: This app is forked from the Application 1 exercise of
 `The Python Mega Course`_ https://www.udemy.com/the-python-mega-course
 (creator: `Ardit Sulce`_ https://www.udemy.com/user/adiune)."""
 _path_to_project_module = '..'
-
-
-class DownloadError(Exception):
-    pass
-
-
-class InvalidFileStructure(Exception):
-    pass
+_completion_limit = 20
 
 
 def _load_from_config(path):
@@ -76,64 +135,175 @@ def _load_from_config(path):
 def _parse_args(args):
     """Parse and validate command line arguments.
 
-    Return either the parsed or default dictionary file name.
-
-    Upon request or when the parsed arguments are incoherent, print the
-    module's docstring and exit.
+    Return the arguments with their values. Print the module's
+    usage message when the arguments are determined to be invalid.
 
     :param args: list
-    :return: str
+    :return: argparse.Namespace
+    """
+    parser = ArgumentParser(description=_description, epilog=_epilog,
+                            formatter_class=RawDescriptionHelpFormatter)
+    parser.add_argument('-f', '--file', type=str, action='append',
+                        help='Path to a json-formatted dictionary file or '
+                             'to a compiled dictionary snapshot file. Give '
+                             'more than once to combine several dictionaries.')
+    parser.add_argument('--shard-dir', type=str,
+                        default=sharded_dictionary.default_shard_dir,
+                        help='Directory to keep the shard files of combined '
+                             'dictionaries in.')
+    parser.add_argument('--reshard', action='store_true',
+                        help='Split combined dictionaries into shard files '
+                             'again, even when their shard files are current.')
+    parser.add_argument('--compact', action='store_true',
+                        help='Hold the dictionary in a compact, memory-lean '
+                             'store instead of a dict.')
+    parser.add_argument('-b', '--batch', type=str, nargs='?', const='-',
+                        help='Look up the words listed in this file (one per '
+                             'line, or stdin when omitted or "-") and write '
+                             'jsonl results instead of prompting.')
+    parser.add_argument('-o', '--output', type=str, default='-',
+                        help='File to write batch results to. '
+                             '[DEFAULT: stdout]')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Number of batch worker processes. '
+                             '[DEFAULT: number of CPUs]')
+    parser.add_argument('--chunk-size', type=int, default=256,
+                        help='Number of words sent to a batch worker at once.')
+    parser.add_argument('--unordered', action='store_true',
+                        help='Write batch results as soon as they are ready '
+                             'instead of in input order.')
+    parser.add_argument('--cache-size', type=int, default=4096,
+                        help='Number of lookup results to keep in the '
+                             'least-recently-used result cache (0 = off).')
+    parser.add_argument('--cache-file', type=str, default=None,
+                        help='File to keep the result cache in between '
+                             'sessions.')
+    parser.add_argument('--serve', action='store_true',
+                        help='Load the dictionary once and answer lookups '
+                             'from clients instead of prompting.')
+    parser.add_argument('--connect', action='store_true',
+                        help='Prompt for words and have a running lookup '
+                             'server answer them.')
+    parser.add_argument('--socket', type=str, default=None,
+                        help='Unix socket to serve on or connect to.')
+    parser.add_argument('--port', type=int,
+                        default=lookup_server.default_port,
+                        help='Localhost port to serve on or connect to, '
+                             'when no --socket is given.')
+    commands = parser.add_subparsers(dest='command')
+    compile_parser = commands.add_parser(
+        'compile', help='Compile a json-formatted dictionary file into a '
+                        'binary dictionary snapshot file.')
+    compile_parser.add_argument('source', type=str,
+                                help='Path to a json-formatted dictionary file.')
+    compile_parser.add_argument('target', type=str,
+                                help='Path of the snapshot file to write.')
+    args = parser.parse_args(args)
+    if not args.file:
+        args.file = [f'{_data_dir}/data.json']
+
+    return args
+
+
+def _enable_tab_completion(complete):
+    """When the readline module is available, complete the word typed at
+    the prompt when the TAB key is pressed.
+
+    :param complete: function
+    :return: None
     """
-    if not args:
-        return f'{_data_dir}/data.json'
+    if not readline:
+        return
 
-    if '--help' in args or '-h' in args:
-        print(__doc__)
-        exit(0)
+    matches = []
 
-    if args[0][:7] == '--file=':
-        path_to_file = args[0][7:]
-        if path_to_file == '':
-            print(__doc__)
-            exit(1)
-        return path_to_file
+    def completer(text, state):
+        if state == 0:
+            head, prefix = ('prefix:', text[7:]) if text[:7] == 'prefix:' \
+                else ('', text)
+            matches[:] = [f'{head}{match}'
+                          for match in complete(prefix, _completion_limit)]
 
-    if args[0] == '-f':
-        try:
-            return args[1]
-        except IndexError:
-            print(__doc__)
-            exit(1)
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer_delims(' \t\n')
+    readline.set_completer(completer)
+    readline.parse_and_bind('tab: complete')
 
 
-def _main(data):
+def _main(data, case_index=None, near_index=None, trie=None, cache=None,
+          client=None):
     """Use looping user-prompt interface to query user for keyboard input.
 
     Prompt the user for a word, conduct a dictionary lookup, print the result,
     then loop. Terminate the loop when the user elects to quit.
 
+    Input of the form 'prefix:<PREFIX>' lists the words starting with
+    PREFIX instead, and the TAB key completes a partially typed word.
+
+    When a client is given, the lookups are answered by a running lookup
+    server instead of by data.
+
     :param data: dict
+    :param case_index: dict
+    :param near_index: NearMatchIndex
+    :param trie: PrefixTrie
+    :param cache: LookupCache
+    :param client: lookup_server.LookupClient
     :return: None
     """
+    if client:
+        complete = client.complete
+    else:
+        def complete(prefix, limit):
+            return find_completions(data, prefix, index=trie, limit=limit)
+
+    _enable_tab_completion(complete=complete)
+
     banner_msg = '== Interactive Dictionary Lookup Utility =='
     prompt_msg = 'Type a word [hit ENTER to quit]: '
     word = input(f'{banner_msg}\n{prompt_msg}').strip()
 
     while word:
-        found_word, found_usages = find_word(data, word)
-
-        if isinstance(found_usages, list):
-            print(f'  [SUCCESS] found {len(found_usages)} usages of {found_word}:')
-            for usage in found_usages:
-                print(f'    * {usage}')
+        if word[:7] == 'prefix:':
+            prefix = word[7:].strip()
+            completions = complete(prefix, _completion_limit)
+
+            if completions:
+                print(f'  [SUCCESS] found {len(completions)} words starting '
+                      f'with {prefix}:')
+                for completion in completions:
+                    print(f'    > {completion}')
+            else:
+                print(f'  [FAILURE] no words start with {prefix}')
 
-        elif isinstance(found_usages, str):
-            print(f'  [SUCCESS] found 1 usage of {found_word}')
-            print(f'    * {found_usages}')
+            word = input(f'\n{prompt_msg}').strip()
+            continue
 
+        if client:
+            found_variants = client.find_word_variants(word)
         else:
+            found_variants = find_word_variants(data, word, index=case_index,
+                                                cache=cache)
+
+        for found_word, found_usages in found_variants:
+            if isinstance(found_usages, list):
+                print(f'  [SUCCESS] found {len(found_usages)} usages of {found_word}:')
+                for usage in found_usages:
+                    print(f'    * {usage}')
+
+            else:
+                print(f'  [SUCCESS] found 1 usage of {found_word}')
+                print(f'    * {found_usages}')
+
+        if not found_variants:
             print(f'  [FAILURE] {word} not found', end='')
-            found_near_matches = find_near_matches(data, word)
+            if client:
+                found_near_matches = client.find_near_matches(word)
+            else:
+                found_near_matches = find_near_matches(data, word,
+                                                       index=near_index,
+                                                       cache=cache)
 
             if found_near_matches:
                 print(f'... did you mean?')
@@ -148,92 +318,54 @@ def _main(data):
         print('!! Finished !!')
 
 
-def find_near_matches(data, word):
-    """Locate best near-matches for word within data.
-
-    Use the difflib package to find the best near-matches for this word.
-
-    :param data: dict
-    :param word: str
-    :return: list
-    """
-    guess_words = [word.lower(), word.upper(), word.title()]
-    words = []
-
-    for guess_word in guess_words:
-        words.extend(difflib.get_close_matches(guess_word, data.keys()))
-
-    return words
-
-
-def find_word(data, word):
-    """Look up usages for word within data.
-
-    Return a 2-tuple of either: a) the validated word and
-    the list containing all word usages that are found, or
-    b) the unvalidated word and None for those cases where
-    no usages are found.
-
-    :param data: dict
-    :param word: str
-    :return: tuple
-    """
-    usages = data.get(word.lower())
-    if usages:
-        return word.lower(), usages
-
-    usages = data.get(word.upper())
-    if usages:
-        return word.upper(), usages
-
-    usages = data.get(word.title())
-    if usages:
-        return word.title(), usages
-
-    return word, None
-
-
-def load_data_file(file='data.json'):
-    """Read json-formatted file containing common words and their usages.
-
-    Populate and return a dict containing words (keys) and their
-    dictionary usages (values).
-
-    The language dictionary file must read as a valid json structure.
-    The file may be located either on the local filesystem or on a
-    remote server.
-
-    :param file: str
-    :return: dict
-    """
-    try:
-        with open(file) as fh:
-            return json.loads(fh.read())
-
-    except FileNotFoundError:
-        raise FileNotFoundError(file)
-
-    except json.JSONDecodeError:
-        raise InvalidFileStructure(file)
-
-    except OSError as e:
-        if e.strerror == 'Invalid argument' and file[:4] == 'http':
-            try:
-                req = requests.get(file)
-                return json.loads(req.content)
-
-            except requests.exceptions.RequestException:
-                raise DownloadError(file)
+_data_dir = _load_from_config(path=_path_to_project_module)
 
-            except json.JSONDecodeError:
-                raise InvalidFileStructure(file)
+if __name__ == '__main__':
+    args = _parse_args(args=sys.argv[1:])
+
+    if args.command == 'compile':
+        count = compile_data_file(file=args.source, target=args.target)
+        print(f'Dictionary snapshot of {count} words saved to file:\n'
+              f'  {args.target}')
+
+    elif args.batch:
+        batch_lookup.run_batch(files=args.file, shard_dir=args.shard_dir,
+                               reshard=args.reshard,
+                               batch=args.batch,
+                               output=args.output, workers=args.workers,
+                               chunk_size=args.chunk_size,
+                               ordered=not args.unordered,
+                               cache_size=args.cache_size,
+                               cache_file=args.cache_file,
+                               compact=args.compact)
+
+    elif args.serve:
+        cache = LookupCache(maxsize=args.cache_size, file=args.cache_file,
+                            source=args.file)
+        try:
+            lookup_server.serve(files=args.file, shard_dir=args.shard_dir,
+                                path=args.socket, port=args.port, cache=cache,
+                                compact=args.compact, reshard=args.reshard)
 
-        raise FileNotFoundError(file)
+        finally:
+            cache.save()
 
+    elif args.connect:
+        client = lookup_server.LookupClient(path=args.socket, port=args.port)
+        _main(data=None, client=client)
+        client.close()
 
-_data_dir = _load_from_config(path=_path_to_project_module)
+    else:
+        data = load_data_files(files=args.file, shard_dir=args.shard_dir,
+                               compact=args.compact, reshard=args.reshard)
+        case_index = build_case_index(data=data)
+        near_index = NearMatchIndex(words=data.keys())
+        trie = PrefixTrie(words=data.keys())
+        cache = LookupCache(maxsize=args.cache_size, file=args.cache_file,
+                            source=args.file)
+        try:
+            _main(data=data, case_index=case_index, near_index=near_index,
+                  trie=trie, cache=cache)
 
-if __name__ == '__main__':
-    file = _parse_args(args=sys.argv[1:])
-    data = load_data_file(file=file)
-    _main(data=data)
+        finally:
+            cache.save()
@@ -0,0 +1,134 @@
+import json
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+_decoder = json.JSONDecoder()
+_whitespace = json.decoder.WHITESPACE
+_max_lookahead_chunks = 256
+_max_partial_token = 8
+
+
+class InvalidStructure(Exception):
+    pass
+
+
+class _ChunkReader:
+    """Buffer over an iterable of text chunks.
+
+    Only the unconsumed tail of the text is kept in the buffer, so memory
+    use is bounded by the chunk size and the size of the largest entry.
+    A single value may span at most max_lookahead chunks.
+    """
+    def __init__(self, chunks, max_lookahead=_max_lookahead_chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ''
+        self.pos = 0
+        self.max_lookahead = max_lookahead
+
+    def _read_more(self):
+        for chunk in self.chunks:
+            if chunk:
+                self.buffer = self.buffer[self.pos:] + chunk
+                self.pos = 0
+                return True
+
+        return False
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at the end)."""
+        while True:
+            self.pos = _whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read_more():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise InvalidStructure(f'expected one of {chars!r} at {char!r}')
+        self.pos += 1
+
+        return char
+
+    def decode(self):
+        """Decode the next complete json value from the buffer.
+
+        Another chunk is read only while the value may merely be cut off
+        at the end of the buffer: an unterminated string, or an error
+        within the last few characters (a partial literal or escape).
+        An error further back is raised at once, as is any error once
+        max_lookahead chunks have been read without completing a value.
+        """
+        self.peek()
+        lookahead = 0
+
+        while True:
+            try:
+                value, self.pos = _decoder.raw_decode(self.buffer, self.pos)
+                return value
+
+            except json.JSONDecodeError as e:
+                truncated = e.msg.startswith('Unterminated string') or \
+                    len(self.buffer) - e.pos <= _max_partial_token
+                if not truncated or lookahead >= self.max_lookahead:
+                    raise
+                if not self._read_more():
+                    raise
+                lookahead += 1
+
+
+def _validate_entry(word, usages):
+    """Raise InvalidStructure unless usages is a str or a list of str.
+
+    :param word: str
+    :param usages: str or list
+    :return: None
+    """
+    if isinstance(usages, str):
+        return
+
+    if isinstance(usages, list) and \
+            all(isinstance(usage, str) for usage in usages):
+        return
+
+    raise InvalidStructure(f'invalid usages for word {word!r}')
+
+
+def iter_entries(chunks):
+    """Parse a json dictionary incrementally, one entry at a time.
+
+    The text of the dictionary is read from chunks, an iterable of str,
+    which may split the text at any position. The top-level json object
+    is walked entry by entry and a (word, usages) tuple is yielded for
+    each of its members as soon as the member has been read. The usages
+    of every entry are validated on the fly; they must be either a
+    str or a list of str.
+
+    :param chunks: iterable of str
+    :return: generator of (str, str or list) tuples
+    """
+    reader = _ChunkReader(chunks)
+
+    if reader.peek() == '\ufeff':
+        reader.pos += 1
+    reader.expect('{')
+
+    if reader.peek() == '}':
+        reader.pos += 1
+    else:
+        while True:
+            if reader.peek() != '"':
+                raise InvalidStructure('expected a word')
+            word = reader.decode()
+            reader.expect(':')
+            usages = reader.decode()
+            _validate_entry(word, usages)
+            yield word, usages
+
+            if reader.expect(',}') == '}':
+                break
+
+    if reader.peek():
+        raise InvalidStructure('unexpected data after the dictionary')
@@ -0,0 +1,172 @@
+import os
+import pickle
+from collections import OrderedDict
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+_cache_version = 1
+
+
+def _fingerprint(source):
+    """Identify the current contents of the dictionary file source.
+
+    Return the file's path, size, and modification time; for a source
+    that is not a local file (e.g. a url), return the source as is. For
+    a list of sources, return a tuple of their fingerprints.
+
+    :param source: str or list
+    :return: tuple
+    """
+    if isinstance(source, (list, tuple)):
+        return tuple(_fingerprint(file) for file in source)
+
+    try:
+        stat = os.stat(source)
+    except (OSError, ValueError):
+        return source,
+
+    return os.path.abspath(source), stat.st_size, stat.st_mtime_ns
+
+
+class LookupCache:
+    """Bounded, least-recently-used cache of lookup results.
+
+    Results are keyed by (operation name, word). Once maxsize results
+    are held, storing another result evicts the least recently used one.
+    The hits, misses, and evictions counters tally the cache's use.
+
+    When a file is given, the cache is loaded from it at creation and
+    written back to it by save(). The cache records the fingerprint of
+    its source dictionary file, and a cache whose source has changed
+    since (see validate) is emptied rather than reused, both when it is
+    loaded and when it is saved.
+    """
+    def __init__(self, maxsize=4096, file=None, source=None):
+        self.maxsize = maxsize
+        self.file = file
+        self.source = source
+        self.fingerprint = _fingerprint(source) if source else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+        if file:
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get(self, key, default=None):
+        """Return the result cached for key, or default on a miss.
+
+        :param key: tuple
+        :param default: object
+        :return: object
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return value
+
+    def put(self, key, value):
+        """Cache value as the result for key.
+
+        :param key: tuple
+        :param value: object
+        :return: None
+        """
+        if self.maxsize <= 0:
+            return
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, other):
+        """Cache every result held by other, as the most recently used.
+
+        :param other: LookupCache
+        :return: None
+        """
+        for key, value in other._entries.items():
+            self.put(key, value)
+
+    def stats(self):
+        """Return the cache's counters and current size.
+
+        :return: dict
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self._entries),
+                'maxsize': self.maxsize}
+
+    def validate(self):
+        """Empty the cache when its source dictionary file has changed.
+
+        Return whether the cached results were still valid.
+
+        :return: bool
+        """
+        if not self.source:
+            return True
+
+        fingerprint = _fingerprint(self.source)
+        if fingerprint == self.fingerprint:
+            return True
+
+        self.fingerprint = fingerprint
+        self.clear()
+
+        return False
+
+    def load(self):
+        """Read cached results from file, unless they are stale.
+
+        :return: None
+        """
+        self.validate()
+
+        try:
+            with open(self.file, 'rb') as fh:
+                version, fingerprint, entries = pickle.load(fh)
+
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return
+
+        if version != _cache_version or fingerprint != self.fingerprint:
+            return
+
+        self._entries = OrderedDict(entries)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        """Write cached results to file, replacing it atomically.
+
+        :return: None
+        """
+        if not self.file:
+            return
+
+        self.validate()
+        tmp_file = f'{self.file}.tmp'
+
+        with open(tmp_file, 'wb') as fh:
+            pickle.dump((_cache_version, self.fingerprint,
+                         list(self._entries.items())), fh)
+
+        os.replace(tmp_file, self.file)
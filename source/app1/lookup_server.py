@@ -0,0 +1,305 @@
+import json
+import socket
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import dictionary_lookup
+from near_match_index import NearMatchIndex
+from prefix_trie import PrefixTrie
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+# Wire protocol
+#
+#     Every request is one line of json text, and every request line is
+#     answered with exactly one line of json text, in the order in which
+#     the requests arrived. A client may therefore send any number of
+#     requests before it reads the responses (pipelining).
+#
+#     request     {"op": "find_word", "word": "bar"}
+#     response    {"result": ["bar", ["A business licensed ..."]]}
+#
+#     The ops are find_word, find_word_variants, find_near_matches,
+#     complete (whose word is a prefix, with an optional "limit"), and
+#     cache_stats (which takes no word).
+#     A request line may also hold a list of requests (a batch), which is
+#     answered with one line holding the list of responses. A request
+#     that cannot be answered gets {"error": "<reason>"}, as does a
+#     request line longer than the line limit, which is skipped.
+default_host = '127.0.0.1'
+default_port = 8737
+_pipeline_depth = 512
+_line_limit = 1 << 24
+
+
+class ServerError(Exception):
+    pass
+
+
+class _Lookup:
+    """Dictionary loaded once and shared by every connection."""
+    def __init__(self, files, shard_dir=None, cache=None, compact=False,
+                 reshard=False):
+        self.data = dictionary_lookup.load_data_files(
+            files=files, shard_dir=shard_dir, compact=compact,
+            reshard=reshard)
+        self.case_index = dictionary_lookup.build_case_index(
+            data=self.data)
+        self.near_index = NearMatchIndex(words=self.data.keys())
+        self.trie = PrefixTrie(words=self.data.keys())
+        self.cache = cache
+
+    def complete(self, prefix, limit=10):
+        return dictionary_lookup.find_completions(
+            self.data, prefix, index=self.trie, limit=limit)
+
+    def find_word(self, word):
+        return dictionary_lookup.find_word(
+            self.data, word, index=self.case_index, cache=self.cache)
+
+    def find_word_variants(self, word):
+        return dictionary_lookup.find_word_variants(
+            self.data, word, index=self.case_index, cache=self.cache)
+
+    def find_near_matches(self, word):
+        return dictionary_lookup.find_near_matches(
+            self.data, word, index=self.near_index, cache=self.cache)
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
+
+    def respond(self, request):
+        """Answer one request.
+
+        :param request: dict
+        :return: dict
+        """
+        if not isinstance(request, dict):
+            return {'error': 'request must be a json object'}
+
+        op = request.get('op')
+        word = request.get('word')
+
+        if op == 'cache_stats':
+            return {'result': self.cache_stats()}
+
+        if op == 'complete':
+            limit = request.get('limit', 10)
+            if not isinstance(word, str) or not isinstance(limit, int):
+                return {'error': 'word must be a string, limit an integer'}
+            return {'result': self.complete(word, limit=limit)}
+
+        if op not in ('find_word', 'find_word_variants', 'find_near_matches'):
+            return {'error': f'unknown op: {op!r}'}
+
+        if not isinstance(word, str):
+            return {'error': 'word must be a string'}
+
+        return {'result': getattr(self, op)(word)}
+
+
+def _answer(lookup, line):
+    """Answer one request line with one line of json text.
+
+    A line of None stands for a request line over the line limit.
+
+    :param lookup: _Lookup
+    :param line: bytes
+    :return: bytes
+    """
+    if line is None:
+        response = {'error': 'request line is too long'}
+    else:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {'error': 'request is not valid json'}
+        else:
+            if isinstance(request, list):
+                response = [lookup.respond(item) for item in request]
+            else:
+                response = lookup.respond(request)
+
+    return json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+async def _read_line(reader):
+    """Read one request line from reader.
+
+    Return b'' at the end of the stream, and None for a line longer than
+    the reader's limit, whose bytes are read and discarded.
+
+    :param reader: asyncio.StreamReader
+    :return: bytes
+    """
+    too_long = False
+
+    while True:
+        try:
+            line = await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            line = e.partial
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)
+            too_long = True
+            continue
+
+        return None if too_long else line
+
+
+async def _handle_connection(lookup, executor, reader, writer):
+    """Answer request lines from one client until it disconnects.
+
+    The requests are answered on executor, so that a slow lookup does
+    not hold up the event loop and the other connections.
+
+    :param lookup: _Lookup
+    :param executor: concurrent.futures.Executor
+    :param reader: asyncio.StreamReader
+    :param writer: asyncio.StreamWriter
+    :return: None
+    """
+    loop = asyncio.get_running_loop()
+
+    try:
+        while True:
+            line = await _read_line(reader)
+            if line == b'':
+                break
+
+            writer.write(await loop.run_in_executor(executor, _answer,
+                                                    lookup, line))
+            await writer.drain()
+
+    except ConnectionError:
+        pass
+
+    finally:
+        writer.close()
+
+
+async def _serve(lookup, path, host, port):
+    # A single lookup thread keeps the dictionary, its indexes and the
+    # cache, none of which are thread-safe, to one thread at a time.
+    executor = ThreadPoolExecutor(max_workers=1)
+    handler = functools.partial(_handle_connection, lookup, executor)
+
+    if path:
+        server = await asyncio.start_unix_server(handler, path=path,
+                                                 limit=_line_limit)
+    else:
+        server = await asyncio.start_server(handler, host=host, port=port,
+                                            limit=_line_limit)
+
+    try:
+        async with server:
+            await server.serve_forever()
+
+    finally:
+        executor.shutdown(wait=False)
+
+
+def serve(files, path=None, host=default_host, port=default_port,
+          shard_dir=None, cache=None, compact=False, reshard=False):
+    """Load the dictionary files once and answer lookups until interrupted.
+
+    Listen on the unix socket at path when one is given, otherwise on
+    host and port. When a LookupCache is given, it is shared by every
+    connection. With compact set, the dictionary is held in a
+    CompactDictionary. With reshard set, several files are split into
+    shard files again.
+
+    :param files: list
+    :param path: str
+    :param host: str
+    :param port: int
+    :param shard_dir: str
+    :param cache: LookupCache
+    :param compact: bool
+    :param reshard: bool
+    :return: None
+    """
+    lookup = _Lookup(files=files, shard_dir=shard_dir, cache=cache,
+                     compact=compact, reshard=reshard)
+
+    try:
+        asyncio.run(_serve(lookup=lookup, path=path, host=host, port=port))
+
+    except KeyboardInterrupt:
+        pass
+
+
+class LookupClient:
+    """Thin, blocking client for a running lookup server.
+
+    The lookup methods mirror the module-level functions of
+    dictionary_lookup, minus the data and index arguments.
+    """
+    def __init__(self, path=None, host=default_host, port=default_port):
+        if path:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(path)
+        else:
+            self._socket = socket.create_connection((host, port))
+        self._file = self._socket.makefile('rwb')
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def request(self, requests):
+        """Send requests, pipelined, and return their responses in order.
+
+        Requests are written in windows of up to _pipeline_depth lines,
+        and the responses to a window are read before the next window is
+        written, so neither side can stall on a full socket buffer.
+
+        :param requests: list of dict
+        :return: list of dict
+        """
+        responses = []
+
+        for start in range(0, len(requests), _pipeline_depth):
+            window = requests[start:start + _pipeline_depth]
+            for request in window:
+                self._file.write(json.dumps(request).encode('utf-8') + b'\n')
+            self._file.flush()
+
+            for _ in window:
+                line = self._file.readline()
+                if not line:
+                    raise ServerError('connection closed by the server')
+                responses.append(json.loads(line))
+
+        return responses
+
+    def _call(self, op, word):
+        response = self.request([{'op': op, 'word': word}])[0]
+        if 'error' in response:
+            raise ServerError(response['error'])
+
+        return response['result']
+
+    def find_word(self, word):
+        found_word, found_usages = self._call('find_word', word)
+        return found_word, found_usages
+
+    def find_word_variants(self, word):
+        return [tuple(variant)
+                for variant in self._call('find_word_variants', word)]
+
+    def find_near_matches(self, word):
+        return self._call('find_near_matches', word)
+
+    def complete(self, prefix, limit=10):
+        response = self.request([{'op': 'complete', 'word': prefix,
+                                  'limit': limit}])[0]
+        if 'error' in response:
+            raise ServerError(response['error'])
+
+        return response['result']
+
+    def cache_stats(self):
+        return self._call('cache_stats', None)
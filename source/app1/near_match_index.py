@@ -0,0 +1,305 @@
+import difflib
+import heapq
+from collections import Counter
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck
+Technique: Symmetric Delete spelling correction (SymSpell), Wolf Garbe"""
+
+_level_step = 0.2
+
+
+def _generate_deletes(word, max_distance):
+    """Generate every string reachable by deleting up to max_distance
+    characters from word, including word itself.
+
+    :param word: str
+    :param max_distance: int
+    :return: set
+    """
+    deletes = {word}
+    edge = {word}
+
+    for _ in range(max_distance):
+        next_edge = set()
+        for item in edge:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                next_edge.add(item[:i] + item[i + 1:])
+        next_edge -= deletes
+        deletes |= next_edge
+        edge = next_edge
+
+    return deletes
+
+
+def _letter_keys(word):
+    """Generate a (letter, n) pair for the n-th occurrence of every
+    letter of word.
+
+    :param word: str
+    :return: generator
+    """
+    for letter, count in Counter(word).items():
+        for n in range(1, count + 1):
+            yield letter, n
+
+
+def _least_matches(length, threshold):
+    """Return the fewest matching characters that give a ratio of at
+    least threshold for two words whose lengths sum to length.
+
+    :param length: int
+    :param threshold: float
+    :return: int
+    """
+    if not length:
+        return 0
+
+    matches = int(threshold * length / 2)
+
+    while matches > 0 and 2.0 * (matches - 1) / length >= threshold:
+        matches -= 1
+    while 2.0 * matches / length < threshold:
+        matches += 1
+
+    return matches
+
+
+class NearMatchIndex:
+    """Prebuilt similarity index over the words of a dictionary.
+
+    The suggestions are the ones difflib.get_close_matches() would
+    return from a scan over every word, in the same order; the index
+    only avoids scoring the words that cannot rank among them.
+
+    Likely suggestions are located first, with a symmetric-delete index:
+    every word is filed under each string that results from deleting up
+    to max_distance characters from its first prefix_length characters,
+    and a query probes the same deletions of the misspelled word. The
+    weakest of the best suggestions found so far sets the score that
+    any other word must reach.
+
+    The remaining words are then narrowed down without scoring them one
+    by one. For every letter of the dictionary, a bitset marks the words
+    that hold that letter at least once, twice, and so on; adding up the
+    bitsets of the query's letters gives, for every word at once, the
+    number of letters it shares with the query, which bounds its score
+    (as SequenceMatcher.quick_ratio() does). The words that pass are
+    checked against the length of their longest common subsequence with
+    the query, a tighter bound, and only those still in the running are
+    scored by difflib.SequenceMatcher.
+
+    max_distance and prefix_length trade the size of the deletion table
+    against the time a query takes; they do not change the suggestions.
+
+    The index is built on the first lookup.
+    """
+    def __init__(self, words, max_distance=1, prefix_length=7, cutoff=0.6):
+        self.words = words
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.cutoff = cutoff
+        self._deletes = None
+        self._by_length = None
+        self._spans = None
+        self._letters = None
+
+    def _build(self):
+        deletes = dict()
+        words = sorted(set(self.words), key=len)
+        spans = dict()
+        letters = dict()
+        size = (len(words) + 7) // 8
+
+        for i, word in enumerate(words):
+            prefix = word[:self.prefix_length]
+            for delete in _generate_deletes(prefix, self.max_distance):
+                deletes.setdefault(delete, []).append(word)
+
+            start = spans.get(len(word), (i, i))[0]
+            spans[len(word)] = (start, i + 1)
+
+            counts = dict()
+            for letter in word:
+                key = letter, counts.get(letter, 0) + 1
+                counts[letter] = key[1]
+                bits = letters.get(key)
+                if bits is None:
+                    bits = letters[key] = bytearray(size)
+                bits[i >> 3] |= 1 << (i & 7)
+
+        self._deletes = deletes
+        self._by_length = words
+        self._spans = {length: (((1 << (end - start)) - 1) << start)
+                       for length, (start, end) in spans.items()}
+        self._letters = {key: int.from_bytes(bits, 'little')
+                         for key, bits in letters.items()}
+
+    def __len__(self):
+        if self._deletes is None:
+            self._build()
+
+        return len(self._by_length)
+
+    def candidates(self, word):
+        """Collect indexed words that share a deletion with word.
+
+        :param word: str
+        :return: set
+        """
+        if self._deletes is None:
+            self._build()
+
+        prefix = word[:self.prefix_length]
+        found = set()
+
+        for delete in _generate_deletes(prefix, self.max_distance):
+            found.update(self._deletes.get(delete, ()))
+
+        return found
+
+    def _shared_letters(self, word):
+        """Count, for every indexed word at once, the letters it shares
+        with word.
+
+        Return the count as a list of bitsets over the words, in the
+        order of the index, the first holding the lowest binary digit of
+        every word's count.
+
+        :param word: str
+        :return: list
+        """
+        counts = []
+
+        for key in _letter_keys(word):
+            carry = self._letters.get(key, 0)
+            digit = 0
+            while carry:
+                if digit == len(counts):
+                    counts.append(carry)
+                    break
+                counts[digit], carry = counts[digit] ^ carry, \
+                    counts[digit] & carry
+                digit += 1
+
+        return counts
+
+    def _sharing(self, word, counts, threshold):
+        """Locate the words that share enough letters with word to score
+        at least threshold.
+
+        Return a bitset over the words, in the order of the index.
+
+        :param word: str
+        :param counts: list
+        :param threshold: float
+        :return: int
+        """
+        spans = dict()
+        for length, span in self._spans.items():
+            least = _least_matches(length=length + len(word),
+                                   threshold=threshold)
+            spans[least] = spans.get(least, 0) | span
+
+        found = 0
+        for least, span in spans.items():
+            if least >> len(counts):
+                continue
+            above, equal = 0, span
+            for digit in reversed(range(len(counts))):
+                if least >> digit & 1:
+                    equal &= counts[digit]
+                else:
+                    above |= equal & counts[digit]
+                    equal &= ~counts[digit]
+            found |= above | equal
+
+        return found
+
+    def get_close_matches(self, word, n=3, cutoff=None):
+        """Return a list of the best near-matches for word.
+
+        Return the same list as difflib.get_close_matches() over every
+        indexed word.
+
+        :param word: str
+        :param n: int
+        :param cutoff: float
+        :return: list
+        """
+        if cutoff is None:
+            cutoff = self.cutoff
+        if not n > 0:
+            raise ValueError(f'n must be > 0: {n!r}')
+
+        candidates = self.candidates(word)
+        result = []
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(word)
+
+        def threshold():
+            return result[0][0] if len(result) == n else cutoff
+
+        def consider(candidate):
+            matcher.set_seq1(candidate)
+            least = threshold()
+            if matcher.real_quick_ratio() < least or \
+                    matcher.quick_ratio() < least:
+                return
+            ratio = matcher.ratio()
+            if ratio < least:
+                return
+            if len(result) < n:
+                heapq.heappush(result, (ratio, candidate))
+            else:
+                heapq.heappushpop(result, (ratio, candidate))
+
+        for candidate in candidates:
+            consider(candidate)
+
+        # The bit-parallel longest common subsequence of H. Hyyrö: a bit
+        # of row is cleared for each character of word that is matched.
+        full_row = (1 << len(word)) - 1
+        positions = dict()
+        for i, letter in enumerate(word):
+            positions[letter] = positions.get(letter, 0) | 1 << i
+
+        # Words sharing the most letters with word are visited first, so
+        # that strong suggestions raise the threshold early. Once every
+        # word that could reach the threshold has been visited, no other
+        # word can rank among the suggestions.
+        counts = self._shared_letters(word=word)
+        level = 1.0
+        least = threshold()
+        visited = 0
+
+        while level > least:
+            level = max(level - _level_step, least)
+            found = self._sharing(word=word, counts=counts, threshold=level)
+            found, visited = found & ~visited, visited | found
+
+            found = bin(found)
+            last = len(found) - 1
+            i = found.find('1', 2)
+
+            while i != -1:
+                candidate = self._by_length[last - i]
+                i = found.find('1', i + 1)
+                if candidate in candidates:
+                    continue
+
+                row = full_row
+                for letter in candidate:
+                    matched = row & positions.get(letter, 0)
+                    row = ((row + matched) | (row - matched)) & full_row
+                common = len(word) - bin(row).count('1')
+                if 2.0 * common / (len(candidate) + len(word)) >= least:
+                    consider(candidate)
+                    least = threshold()
+
+        result = heapq.nlargest(n, result)
+
+        return [candidate for score, candidate in result]
@@ -0,0 +1,154 @@
+import bisect
+from array import array
+from collections import deque
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+
+class PrefixTrie:
+    """Radix tree (compressed trie) over the words of a dictionary,
+    stored in flat arrays.
+
+    Every node is identified by its position in the arrays. A node's
+    edge label is a slice of one shared string of labels, and the
+    children of a node occupy consecutive positions, in sorted order,
+    so a child is located by binary search over its siblings. Words are
+    not stored; they are spelled out by the labels along their path.
+
+    Completing a prefix walks down from the root along the prefix, then
+    visits nodes in lexicographic order until enough words are found,
+    so the time taken depends on the length of the prefix and on the
+    number of results, not on the number of words in the dictionary.
+
+    The arrays are built once, on the first lookup.
+    """
+    def __init__(self, words):
+        self.words = words
+        self._labels = None
+        self._label_start = array('I')
+        self._label_length = array('I')
+        self._child_start = array('I')
+        self._child_count = array('I')
+        self._terminal = bytearray()
+        self._count = 0
+
+    def _add_node(self, label_start, label_length):
+        self._label_start.append(label_start)
+        self._label_length.append(label_length)
+        self._child_start.append(0)
+        self._child_count.append(0)
+        self._terminal.append(0)
+
+        return len(self._terminal) - 1
+
+    def _build(self):
+        words = sorted(set(self.words))
+        labels = []
+        label_offset = 0
+        queue = deque([(self._add_node(0, 0), 0, len(words), 0)])
+
+        while queue:
+            node, lo, hi, depth = queue.popleft()
+
+            if lo < hi and len(words[lo]) == depth:
+                self._terminal[node] = 1
+                lo += 1
+
+            self._child_start[node] = len(self._terminal)
+
+            while lo < hi:
+                first = words[lo]
+                char = first[depth]
+                if char == '\U0010ffff':
+                    end = hi
+                else:
+                    end = bisect.bisect_left(
+                        words, first[:depth] + chr(ord(char) + 1), lo, hi)
+
+                last = words[end - 1]
+                stop = depth + 1
+                limit = min(len(first), len(last))
+                while stop < limit and first[stop] == last[stop]:
+                    stop += 1
+
+                label = first[depth:stop]
+                labels.append(label)
+                child = self._add_node(label_offset, len(label))
+                label_offset += len(label)
+                queue.append((child, lo, end, stop))
+                self._child_count[node] += 1
+                lo = end
+
+        self._labels = ''.join(labels)
+        self._count = len(words)
+
+    def _label(self, node):
+        start = self._label_start[node]
+        return self._labels[start:start + self._label_length[node]]
+
+    def _find_child(self, node, char):
+        lo = self._child_start[node]
+        hi = lo + self._child_count[node]
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._labels[self._label_start[mid]] < char:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < self._child_start[node] + self._child_count[node] and \
+                self._labels[self._label_start[lo]] == char:
+            return lo
+
+        return None
+
+    def __len__(self):
+        if self._labels is None:
+            self._build()
+
+        return self._count
+
+    def complete(self, prefix, limit=10):
+        """Return up to limit words that start with prefix, in sorted order.
+
+        :param prefix: str
+        :param limit: int
+        :return: list
+        """
+        if self._labels is None:
+            self._build()
+
+        node = 0
+        stem = []
+        pos = 0
+
+        while pos < len(prefix):
+            child = self._find_child(node, prefix[pos])
+            if child is None:
+                return []
+
+            label = self._label(child)
+            rest = prefix[pos:]
+            if not (rest.startswith(label) or label.startswith(rest)):
+                return []
+
+            stem.append(label)
+            pos += len(label)
+            node = child
+
+        words = []
+        stack = [(node, ''.join(stem))]
+
+        while stack and len(words) < limit:
+            node, word = stack.pop()
+            if self._terminal[node]:
+                words.append(word)
+
+            start = self._child_start[node]
+            for child in reversed(range(start, start + self._child_count[node])):
+                stack.append((child, word + self._label(child)))
+
+        return words
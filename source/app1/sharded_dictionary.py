@@ -0,0 +1,271 @@
+import os
+import json
+import zlib
+import shutil
+import time
+import hashlib
+import tempfile
+from collections.abc import Mapping
+import dictionary_source
+from dictionary_snapshot import DictionarySnapshot, is_snapshot
+from compact_store import CompactDictionary
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+default_shard_dir = f'{tempfile.gettempdir()}/interactive_dictionary_shards'
+_shard_format_version = 1
+_words_file = 'words.jsonl'
+url_shard_ttl = 24 * 60 * 60
+
+
+def _shard_id(word, shard_count):
+    """Assign word to a shard by hash of its casefolded spelling, so every
+    spelling of a word lands in the same shard.
+
+    :param word: str
+    :param shard_count: int
+    :return: int
+    """
+    return zlib.crc32(word.casefold().encode('utf-8')) % shard_count
+
+
+def _source_key(file, shard_count):
+    """Identify the current contents of source file, for naming its shards.
+
+    :param file: str
+    :param shard_count: int
+    :return: str
+    """
+    try:
+        stat = os.stat(file)
+        fingerprint = [os.path.abspath(file), stat.st_size, stat.st_mtime_ns]
+    except (OSError, ValueError):
+        fingerprint = [file]
+
+    fingerprint.extend([shard_count, _shard_format_version])
+
+    return hashlib.sha1(json.dumps(fingerprint).encode('utf-8')).hexdigest()
+
+
+def _iter_source(file):
+    """Yield the (word, usages) entries of a json file or a snapshot file.
+
+    :param file: str
+    :return: generator of tuples
+    """
+    if is_snapshot(file):
+        yield from DictionarySnapshot(file).items()
+    else:
+        yield from dictionary_source.iter_data_file(file=file)
+
+
+def _merge_usages(usages, more_usages):
+    """Combine the usages of one word from two sources, without duplicates.
+
+    :param usages: str or list
+    :param more_usages: str or list
+    :return: list
+    """
+    merged = list(usages) if isinstance(usages, list) else [usages]
+
+    if not isinstance(more_usages, list):
+        more_usages = [more_usages]
+
+    for usage in more_usages:
+        if usage not in merged:
+            merged.append(usage)
+
+    return merged
+
+
+def _is_split(directory, file, reshard):
+    """Determine whether directory holds a usable split of source file.
+
+    A split of a source that is not a local file (e.g. a url), whose
+    contents cannot be fingerprinted, is used for url_shard_ttl seconds.
+
+    :param directory: str
+    :param file: str
+    :param reshard: bool
+    :return: bool
+    """
+    if reshard or not os.path.isdir(directory):
+        return False
+
+    if os.path.isfile(file):
+        return True
+
+    return time.time() - os.path.getmtime(directory) < url_shard_ttl
+
+
+def split_source(file, shard_dir, shard_count, reshard=False):
+    """Split a dictionary source file into shard files, unless already split.
+
+    The entries of file are streamed into shard_count json-lines files,
+    kept in a directory named after the fingerprint of file, so a source
+    that has not changed since it was last split is not read again (see
+    _is_split); with reshard set, it is split again regardless. The
+    words of file are also listed in a words file of their own, so they
+    can be iterated without reading the shards.
+
+    The files are written to a directory of this process's own and then
+    moved into place, so several processes may split the same source at
+    once; whichever finishes first wins.
+
+    Return the directory holding the shard files.
+
+    :param file: str
+    :param shard_dir: str
+    :param shard_count: int
+    :param reshard: bool
+    :return: str
+    """
+    directory = f'{shard_dir}/{_source_key(file, shard_count)}'
+    if _is_split(directory=directory, file=file, reshard=reshard):
+        return directory
+
+    tmp_directory = f'{directory}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+
+    shard_files = [open(f'{tmp_directory}/{i:03d}.jsonl', 'w', encoding='utf-8')
+                   for i in range(shard_count)]
+    words_file = open(f'{tmp_directory}/{_words_file}', 'w', encoding='utf-8')
+
+    try:
+        for word, usages in _iter_source(file):
+            shard_file = shard_files[_shard_id(word, shard_count)]
+            shard_file.write(json.dumps([word, usages], ensure_ascii=False))
+            shard_file.write('\n')
+            words_file.write(json.dumps(word, ensure_ascii=False))
+            words_file.write('\n')
+
+    finally:
+        for shard_file in shard_files:
+            shard_file.close()
+        words_file.close()
+
+    if os.path.isdir(directory):
+        old_directory = f'{directory}.old-{os.getpid()}'
+        try:
+            os.replace(directory, old_directory)
+        except OSError:
+            pass
+        shutil.rmtree(old_directory, ignore_errors=True)
+
+    try:
+        os.replace(tmp_directory, directory)
+    except OSError:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+
+    return directory
+
+
+class _ShardedCaseIndex:
+    """Case index (casefolded word -> spellings) served shard by shard."""
+    def __init__(self, sharded):
+        self.sharded = sharded
+
+    def get(self, folded, default=None):
+        _, index = self.sharded.shard(folded)
+        return index.get(folded, default)
+
+
+class ShardedDictionary(Mapping):
+    """Dictionary combined from several sources, loaded shard by shard.
+
+    Every source is split once into shard_count shard files by a hash of
+    the casefolded word (see split_source). A shard is read into memory
+    only when a lookup first touches it; its words are then merged from
+    all of the sources, in the order of the sources, so the usages found
+    for a word are the combined usages from every source that has it.
+
+    Iterating over all of the words (e.g. to build a near-match index)
+    reads the words files written by the split, not the shards. With
+    compact set, each shard is held in a CompactDictionary once it has
+    been merged. With reshard set, every source is split again.
+    """
+    def __init__(self, files, shard_dir=None, shard_count=64, compact=False,
+                 reshard=False):
+        self.files = list(files)
+        self.shard_dir = shard_dir or default_shard_dir
+        self.shard_count = shard_count
+        self.compact = compact
+        self._directories = [split_source(file=file, shard_dir=self.shard_dir,
+                                          shard_count=shard_count,
+                                          reshard=reshard)
+                             for file in self.files]
+        self._shards = dict()
+        self.case_index = _ShardedCaseIndex(sharded=self)
+
+    def _materialize(self, shard_id):
+        data = dict()
+
+        for directory in self._directories:
+            entries = dict()
+            with open(f'{directory}/{shard_id:03d}.jsonl',
+                      encoding='utf-8') as fh:
+                for line in fh:
+                    word, usages = json.loads(line)
+                    entries[word] = usages
+
+            for word, usages in entries.items():
+                if word in data:
+                    data[word] = _merge_usages(data[word], usages)
+                else:
+                    data[word] = usages
+
+        if self.compact:
+            data = CompactDictionary(entries=data.items())
+            return data, data.case_index
+
+        index = dict()
+        for word in data:
+            index.setdefault(word.casefold(), []).append(word)
+
+        return data, index
+
+    @property
+    def materialized(self):
+        """Number of shards read into memory so far."""
+        return len(self._shards)
+
+    def shard(self, word):
+        """Return the (data, case index) pair of the shard holding word,
+        reading the shard into memory on first use.
+
+        :param word: str
+        :return: tuple
+        """
+        shard_id = _shard_id(word, self.shard_count)
+
+        if shard_id not in self._shards:
+            self._shards[shard_id] = self._materialize(shard_id)
+
+        return self._shards[shard_id]
+
+    def get(self, word, default=None):
+        data, _ = self.shard(word)
+        return data.get(word, default)
+
+    def __getitem__(self, word):
+        data, _ = self.shard(word)
+        return data[word]
+
+    def __contains__(self, word):
+        return isinstance(word, str) and word in self.shard(word)[0]
+
+    def __iter__(self):
+        seen = set()
+
+        for directory in self._directories:
+            with open(f'{directory}/{_words_file}', encoding='utf-8') as fh:
+                for line in fh:
+                    word = json.loads(line)
+                    if word not in seen:
+                        seen.add(word)
+                        yield word
+
+    def __len__(self):
+        return sum(1 for _ in self)
@@ -0,0 +1,35 @@
+import compact_store
+from compact_store import CompactDictionary
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+_entries = [('bar', ['a drink', 'a counter']), ('Bar', 'a name'),
+            ('food', ['a drink']), ('café', 'a drink'), ('bar', ['a name'])]
+
+
+def test_usages_and_spellings():
+    store = CompactDictionary(entries=iter(_entries))
+
+    assert dict(store.items()) == {'Bar': 'a name', 'bar': ['a name'],
+                                   'café': 'a drink', 'food': ['a drink']}
+    assert store.spellings('bar') == ['Bar', 'bar']
+    assert store.case_index.get('cafe') is None
+    assert not hasattr(store, '_text_ids')
+
+
+def test_repeated_texts_are_stored_once():
+    store = CompactDictionary(entries=iter(_entries))
+
+    assert bytes(store._texts) == 'a drinka countera name'.encode('utf-8')
+
+
+def test_texts_sharing_a_hash_are_kept_apart(monkeypatch):
+    monkeypatch.setattr(compact_store, 'hash', lambda encoded: 0,
+                        raising=False)
+    store = CompactDictionary(entries=iter(_entries))
+
+    assert store['bar'] == ['a name'] and store['food'] == ['a drink']
+    assert store['Bar'] == 'a name' and store['café'] == 'a drink'
+    assert bytes(store._texts) == 'a drinka countera name'.encode('utf-8')
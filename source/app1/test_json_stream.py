@@ -0,0 +1,74 @@
+import json
+import pytest
+import dictionary_source
+from json_stream import InvalidStructure, iter_entries
+from dictionary_source import InvalidFileStructure, iter_data_file
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+_text = "\ufeff" + """ {
+  "bar": ["a drink", "a counter"],
+  "say \\"hi\\"": "a greeting",
+  "back\\\\slash": [],
+  "caf\\u00e9": "a caf\\u00e9 \\ud83d\\ude00",
+  "null": "true, false or null"
+}
+"""
+_entries = [('bar', ['a drink', 'a counter']), ('say "hi"', 'a greeting'),
+            ('back\\slash', []), ('café', 'a café \U0001f600'),
+            ('null', 'true, false or null')]
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 7, 16, 1024])
+def test_entries_split_across_chunks(size):
+    assert list(iter_entries(_chunks(_text, size))) == _entries
+
+
+def test_every_split_position():
+    for i in range(len(_text)):
+        assert list(iter_entries([_text[:i], '', _text[i:]])) == _entries
+
+
+def test_empty_dictionary():
+    assert list(iter_entries(['  {', ' } \n'])) == []
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    '[]',
+    '{"bar" "a drink"}',
+    '{"bar": "a drink",}',
+    '{"bar": "a drink"',
+    '{"bar": "a drink"} {}',
+    '{bar: "a drink"}',
+    '{"bar": 1}',
+    '{"bar": ["a drink", null]}',
+    '{"bar": {"a": "drink"}}',
+    '{"bar": "a \\x drink"}',
+    '{"bar": "a drink}',
+    '{"bar": tru}',
+])
+def test_malformed_input_raises(text):
+    for size in (1, 4, 1024):
+        with pytest.raises((InvalidStructure, json.JSONDecodeError)):
+            list(iter_entries(_chunks(text, size)))
+
+
+def test_malformed_file_raises_invalid_file_structure(tmp_path, monkeypatch):
+    monkeypatch.setattr(dictionary_source, '_chunk_size', 4)
+    file = tmp_path / 'data.json'
+
+    file.write_text(_text, encoding='utf-8')
+    assert list(iter_data_file(file=str(file))) == _entries
+
+    file.write_text('{"bar": "a drink", "food": 1}', encoding='utf-8')
+    entries = iter_data_file(file=str(file))
+    assert next(entries) == ('bar', 'a drink')
+    with pytest.raises(InvalidFileStructure):
+        next(entries)
@@ -0,0 +1,79 @@
+import difflib
+import random
+import pytest
+from near_match_index import NearMatchIndex
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+_letters = 'etaoinshrdlucmfwyp'
+
+
+def _words(count, rng):
+    words = set()
+
+    while len(words) < count:
+        word = ''.join(rng.choices(_letters, k=rng.randint(2, 14)))
+        words.add(word.title() if rng.random() < 0.1 else word)
+
+    return sorted(words)
+
+
+def _misspell(word, rng):
+    i = rng.randrange(len(word))
+    edit = rng.randrange(3)
+
+    if edit == 0 and len(word) > 2:
+        return word[:i] + word[i + 1:]
+    if edit == 1:
+        return word[:i] + rng.choice(_letters) + word[i:]
+
+    return word[:i] + rng.choice(_letters) + word[i + 1:]
+
+
+@pytest.fixture(scope='module')
+def words():
+    return _words(count=3000, rng=random.Random(0))
+
+
+def test_suggestions_match_difflib(words):
+    rng = random.Random(1)
+    index = NearMatchIndex(words=words)
+
+    for _ in range(80):
+        word = _misspell(rng.choice(words), rng)
+        if rng.random() < 0.5:
+            word = _misspell(word, rng)
+        for guess in (word.lower(), word.upper(), word.title()):
+            assert index.get_close_matches(guess) == \
+                difflib.get_close_matches(guess, words)
+
+
+@pytest.mark.parametrize('max_distance', [0, 1, 2])
+@pytest.mark.parametrize('n, cutoff', [(1, 0.6), (5, 0.4), (10, 0.8)])
+def test_settings_match_difflib(words, max_distance, n, cutoff):
+    rng = random.Random(2)
+    index = NearMatchIndex(words=words, max_distance=max_distance)
+
+    for _ in range(20):
+        word = _misspell(rng.choice(words), rng)
+        assert index.get_close_matches(word, n=n, cutoff=cutoff) == \
+            difflib.get_close_matches(word, words, n=n, cutoff=cutoff)
+
+
+def test_unusual_queries_match_difflib(words):
+    index = NearMatchIndex(words=words)
+
+    for word in ['', 'e', 'eeeeeeeeeeeeeeeeeeee', 'zzzz', words[0] * 3]:
+        assert index.get_close_matches(word) == \
+            difflib.get_close_matches(word, words)
+
+
+def test_index_is_built_on_first_lookup(words):
+    index = NearMatchIndex(words=words)
+    assert index._deletes is None
+
+    index.get_close_matches('tahe')
+    assert index._deletes is not None
+    assert len(index) == len(words)
@@ -0,0 +1,50 @@
+import random
+import pytest
+from prefix_trie import PrefixTrie
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+
+def _complete(words, prefix, limit):
+    return sorted(word for word in set(words) if word.startswith(prefix))[:limit]
+
+
+@pytest.fixture(scope='module')
+def words():
+    rng = random.Random(0)
+    words = [''.join(rng.choices('abcé', k=rng.randint(1, 8)))
+             for _ in range(2000)]
+
+    return words + ['', 'A', 'Zoo', 'zoo', 'z\U0010ffff', 'z\U0010ffffa']
+
+
+def test_completions_match_a_scan(words):
+    trie = PrefixTrie(words=words)
+    rng = random.Random(1)
+    prefixes = ['', 'a', 'z', 'zo', 'zoo', 'zook', 'q', 'z\U0010ffff'] + \
+        [rng.choice(words)[:rng.randint(0, 8)] for _ in range(300)]
+
+    for prefix in prefixes:
+        for limit in (1, 3, 10, 5000):
+            assert trie.complete(prefix, limit=limit) == \
+                _complete(words, prefix, limit)
+
+
+def test_limit(words):
+    trie = PrefixTrie(words=words)
+
+    assert trie.complete('ab', limit=0) == []
+    assert len(trie.complete('ab', limit=4)) == 4
+    assert trie.complete('ab') == _complete(words, 'ab', 10)
+    assert trie.complete('', limit=3) == ['', 'A', 'Zoo']
+
+
+def test_trie_is_built_on_first_lookup(words):
+    trie = PrefixTrie(words=words)
+    assert trie._labels is None
+
+    assert trie.complete('zoo') == ['zoo']
+    assert len(trie) == len(set(words))
+    assert PrefixTrie(words=[]).complete('') == []
@@ -0,0 +1,52 @@
+import json
+import pytest
+import dictionary_lookup
+from near_match_index import NearMatchIndex
+from prefix_trie import PrefixTrie
+from sharded_dictionary import ShardedDictionary
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    first = tmp_path / 'first.json'
+    second = tmp_path / 'second.json'
+    first.write_text(json.dumps({'bar': ['a drink'], 'Bar': 'a name',
+                                 'foot': 'a limb'}))
+    second.write_text(json.dumps({'bar': ['a counter', 'a drink'],
+                                  'food': ['a meal']}))
+
+    return ShardedDictionary(files=[str(first), str(second)],
+                             shard_dir=str(tmp_path / 'shards'),
+                             shard_count=8)
+
+
+def test_usages_are_merged_from_every_source(sharded):
+    assert sharded['bar'] == ['a drink', 'a counter']
+    assert sharded['food'] == ['a meal']
+    assert sorted(sharded) == ['Bar', 'bar', 'food', 'foot']
+
+
+def test_startup_reads_no_shards_and_builds_no_index(sharded):
+    near_index = NearMatchIndex(words=sharded.keys())
+    trie = PrefixTrie(words=sharded.keys())
+    case_index = dictionary_lookup.build_case_index(data=sharded)
+
+    assert sharded.materialized == 0
+    assert near_index._deletes is None and trie._labels is None
+
+    assert dictionary_lookup.find_word(sharded, 'BAR', index=case_index) == \
+        ('bar', ['a drink', 'a counter'])
+    assert sharded.materialized == 1
+    assert near_index._deletes is None and trie._labels is None
+
+
+def test_near_matches_read_the_words_files_only(sharded):
+    near_index = NearMatchIndex(words=sharded.keys())
+
+    assert dictionary_lookup.find_near_matches(
+        sharded, 'fooz', index=near_index) == ['foot', 'food']
+    assert sharded.materialized == 0
@@ -0,0 +1,428 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck
+Techniques: Douglas-Peucker line simplification; TopoJSON topology
+(https://github.com/topojson/topojson-specification)"""
+_schema_version = 1
+_object_name = 'countries'
+
+# Topology layout, as built by build_topology:
+#
+#     transform       scale and translate of the quantized coordinates:
+#                     x = translate[0] + qx * scale[0], likewise for y
+#     arcs            lists of quantized [qx, qy] points; every boundary
+#                     line shared by two rings is stored once
+#     geometries      the features, with their rings given as lists of
+#                     arc indices (~i for arc i traversed in reverse)
+#
+# Rings are cut into arcs at their junctions: the points where the rings
+# that pass through them part ways. Arcs are simplified one at a time,
+# with their end points fixed, so neighbouring polygons keep a common
+# border and no gaps or overlaps open up between them.
+
+
+class SimplifyError(Exception):
+    pass
+
+
+def _polygons(geometry):
+    """Return the polygons of a Polygon or MultiPolygon geometry.
+
+    :param geometry: dict
+    :return: list
+    """
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+
+    raise SimplifyError(f"unsupported geometry type: {geometry['type']}")
+
+
+def _quantize_ring(ring, translate, scale):
+    """Quantize the points of a ring, dropping repeated points.
+
+    Return the ring as a list of (qx, qy) tuples, without its closing
+    point, or None when fewer than 3 distinct points remain.
+
+    :param ring: list
+    :param translate: tuple
+    :param scale: tuple
+    :return: list
+    """
+    points = np.asarray(ring, dtype='float64')[:, :2]
+    quantized = np.rint((points - translate) / scale).astype('int64')
+    keep = np.ones(len(quantized), dtype=bool)
+    keep[1:] = np.any(quantized[1:] != quantized[:-1], axis=1)
+    quantized = quantized[keep]
+
+    if len(quantized) > 1 and tuple(quantized[0]) == tuple(quantized[-1]):
+        quantized = quantized[:-1]
+
+    if len(quantized) < 3:
+        return None
+
+    return [tuple(point) for point in quantized.tolist()]
+
+
+def _find_junctions(rings):
+    """Find the points where the rings that pass through them part ways.
+
+    A point is a junction when it is visited with more than one pair of
+    neighbouring points, in either direction.
+
+    :param rings: list
+    :return: set
+    """
+    neighbours = dict()
+    junctions = set()
+
+    for ring in rings:
+        count = len(ring)
+        for i, point in enumerate(ring):
+            previous, following = ring[i - 1], ring[(i + 1) % count]
+            pair = (previous, following) if previous < following \
+                else (following, previous)
+            known = neighbours.setdefault(point, pair)
+            if known != pair:
+                junctions.add(point)
+
+    return junctions
+
+
+def _cut_ring(ring, junctions):
+    """Cut a ring into arcs at its junctions.
+
+    A ring without junctions becomes one closed arc, started at its
+    smallest point, so that rings which trace the same path yield the
+    same arc.
+
+    :param ring: list
+    :param junctions: set
+    :return: list
+    """
+    cuts = [i for i, point in enumerate(ring) if point in junctions]
+
+    if not cuts:
+        start = ring.index(min(ring))
+        return [ring[start:] + ring[:start + 1]]
+
+    ring = ring[cuts[0]:] + ring[:cuts[0]]
+    cuts = [i - cuts[0] for i in cuts] + [len(ring)]
+    ring = ring + ring[:1]
+
+    return [ring[start:end + 1] for start, end in zip(cuts, cuts[1:])]
+
+
+def build_topology(collection, quantization=100000):
+    """Build a quantized topology from a GeoJSON FeatureCollection of
+    Polygon and MultiPolygon features.
+
+    The coordinates are snapped to a grid of quantization steps across
+    the bounding box of the collection, and every shared boundary line
+    is stored once, as an arc.
+
+    :param collection: dict
+    :param quantization: int
+    :return: dict
+    """
+    points = np.array([point[:2] for feature in collection['features']
+                       for polygon in _polygons(feature['geometry'])
+                       for ring in polygon for point in ring],
+                      dtype='float64')
+    translate = points.min(axis=0)
+    extent = points.max(axis=0) - translate
+    scale = np.where(extent > 0, extent / (quantization - 1), 1.0)
+
+    features = []
+    for feature in collection['features']:
+        polygons = []
+        for polygon in _polygons(feature['geometry']):
+            rings = [_quantize_ring(ring=ring, translate=translate,
+                                    scale=scale) for ring in polygon]
+            if rings[0] is not None:
+                polygons.append([ring for ring in rings if ring is not None])
+        features.append((feature, polygons))
+
+    junctions = _find_junctions(rings=[ring for _, polygons in features
+                                       for polygon in polygons
+                                       for ring in polygon])
+    arcs = []
+    arc_ids = dict()
+
+    def arc_id(arc):
+        key = tuple(arc)
+        if key not in arc_ids:
+            reverse = key[::-1]
+            if reverse in arc_ids:
+                return ~arc_ids[reverse]
+            arc_ids[key] = len(arcs)
+            arcs.append(arc)
+        return arc_ids[key]
+
+    geometries = []
+    for feature, polygons in features:
+        geometries.append({
+            'type': 'MultiPolygon', 'properties': feature.get('properties'),
+            'arcs': [[[arc_id(arc=arc) for arc in _cut_ring(
+                ring=ring, junctions=junctions)] for ring in polygon]
+                for polygon in polygons]})
+
+    return {'transform': {'scale': scale.tolist(),
+                          'translate': translate.tolist()},
+            'arcs': arcs, 'geometries': geometries}
+
+
+def _douglas_peucker(points, tolerance):
+    """Select the points of a line to keep, by Douglas-Peucker.
+
+    :param points: numpy.ndarray
+    :param tolerance: float
+    :return: numpy.ndarray of bool
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        start, end = points[first], points[last]
+        inner = points[first + 1:last]
+        chord = end - start
+        length = np.hypot(chord[0], chord[1])
+        if length:
+            offsets = inner - start
+            distances = np.abs(chord[0] * offsets[:, 1] -
+                               chord[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(inner[:, 0] - start[0],
+                                 inner[:, 1] - start[1])
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return keep
+
+
+def _corner_points(points):
+    """Select the two points of a line that Douglas-Peucker would keep
+    first: the point farthest from the start, and the point farthest
+    from the line through both.
+
+    :param points: numpy.ndarray
+    :return: numpy.ndarray of bool
+    """
+    offsets = points - points[0]
+    far = int(np.argmax(np.hypot(offsets[:, 0], offsets[:, 1])))
+    chord = offsets[far]
+    keep = np.zeros(len(points), dtype=bool)
+    keep[far] = True
+    keep[int(np.argmax(np.abs(chord[0] * offsets[:, 1] -
+                              chord[1] * offsets[:, 0])))] = True
+
+    return keep
+
+
+def _ring_points(topology, ring):
+    """Join the arcs of a ring into its list of quantized points.
+
+    :param topology: dict
+    :param ring: list
+    :return: list
+    """
+    points = []
+
+    for arc_index in ring:
+        arc = topology['arcs'][arc_index] if arc_index >= 0 \
+            else topology['arcs'][~arc_index][::-1]
+        points.extend(arc if not points else arc[1:])
+
+    return points
+
+
+def simplify_topology(topology, tolerance):
+    """Simplify every arc of a topology in place, with its end points
+    fixed. The tolerance is given in coordinate units (degrees).
+
+    A ring that is left with fewer than 3 distinct points keeps the
+    corner points of its longest arc as well (see _corner_points), so
+    that small features, such as enclaves and islands, do not vanish.
+
+    :param topology: dict
+    :param tolerance: float
+    :return: dict
+    """
+    scale = np.asarray(topology['transform']['scale'])
+    arcs = topology['arcs']
+    original = list(arcs)
+    masks = []
+
+    for i, arc in enumerate(original):
+        points = np.asarray(arc, dtype='float64') * scale
+        keep = _douglas_peucker(points=points, tolerance=tolerance)
+        masks.append(keep)
+        arcs[i] = [point for point, kept in zip(arc, keep.tolist()) if kept]
+
+    for geometry in topology['geometries']:
+        for polygon in geometry['arcs']:
+            for ring in polygon:
+                if len(set(_ring_points(topology=topology, ring=ring))) >= 3:
+                    continue
+                i = max((arc if arc >= 0 else ~arc for arc in ring),
+                        key=lambda arc: len(original[arc]))
+                points = np.asarray(original[i], dtype='float64') * scale
+                masks[i] |= _corner_points(points=points)
+                arcs[i] = [point for point, kept in
+                           zip(original[i], masks[i].tolist()) if kept]
+
+    return topology
+
+
+def to_geojson(topology, collection, decimals):
+    """Convert a topology back into a GeoJSON FeatureCollection.
+
+    Rings with fewer than 3 distinct points left are dropped, along with
+    polygons whose outer ring is dropped. The other members of
+    collection (such as its crs) are copied over.
+
+    :param topology: dict
+    :param collection: dict
+    :param decimals: int
+    :return: dict
+    """
+    scale = np.asarray(topology['transform']['scale'])
+    translate = np.asarray(topology['transform']['translate'])
+    features = []
+
+    for geometry in topology['geometries']:
+        polygons = []
+        for polygon in geometry['arcs']:
+            rings = []
+            for ring in polygon:
+                points = _ring_points(topology=topology, ring=ring)
+                if len(set(points)) < 3:
+                    if not rings:
+                        break
+                    continue
+                coordinates = np.round(np.asarray(points) * scale + translate,
+                                       decimals)
+                rings.append(coordinates.tolist())
+            if rings:
+                polygons.append(rings)
+
+        features.append({'type': 'Feature',
+                         'properties': geometry['properties'],
+                         'geometry': {'type': 'MultiPolygon',
+                                      'coordinates': polygons}})
+
+    converted = {key: value for key, value in collection.items()
+                 if key != 'features'}
+    converted['features'] = features
+
+    return converted
+
+
+def to_topojson(topology):
+    """Encode a topology as a TopoJSON Topology, with its arcs delta
+    encoded, and its features as the 'countries' object.
+
+    :param topology: dict
+    :return: dict
+    """
+    arcs = []
+    for arc in topology['arcs']:
+        points = np.asarray(arc, dtype='int64')
+        points[1:] -= points[:-1].copy()
+        arcs.append(points.tolist())
+
+    return {'type': 'Topology', 'transform': topology['transform'],
+            'objects': {_object_name: {'type': 'GeometryCollection',
+                                       'geometries': topology['geometries']}},
+            'arcs': arcs}
+
+
+def _cache_path(directory, file, key):
+    """Return the path of the cached simplification of file, under key.
+
+    :param directory: str
+    :param file: str
+    :param key: dict
+    :return: str
+    """
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode('utf-8'))
+    stem = os.path.splitext(os.path.basename(file))[0]
+
+    return f'{directory}/{stem}-simplified-{digest.hexdigest()[:12]}.json'
+
+
+def simplify_file(file, tolerance=0.01, quantization=100000, topojson=False,
+                  cache_dir=None):
+    """Simplify the GeoJSON FeatureCollection in file, and return it as
+    json text.
+
+    The polygons are quantized (see build_topology), and their shared
+    arcs are simplified by Douglas-Peucker at tolerance, in degrees (see
+    simplify_topology). The result is a GeoJSON FeatureCollection, or,
+    with topojson set, a TopoJSON Topology with the features as its
+    'countries' object.
+
+    The result is cached in cache_dir (by default, the directory of
+    file), keyed by the hash of file and the parameters, so it is
+    generated only once for each file and set of parameters.
+
+    :param file: str
+    :param tolerance: float
+    :param quantization: int
+    :param topojson: bool
+    :param cache_dir: str
+    :return: str
+    """
+    with open(file, 'rb') as infile:
+        content = infile.read()
+
+    key = {'schema_version': _schema_version,
+           'source': hashlib.sha1(content).hexdigest(),
+           'tolerance': tolerance, 'quantization': quantization,
+           'topojson': bool(topojson)}
+    cache_path = _cache_path(directory=cache_dir or os.path.dirname(file) or '.',
+                             file=file, key=key)
+
+    try:
+        with open(cache_path, encoding='utf-8') as infile:
+            return infile.read()
+
+    except OSError:
+        pass
+
+    collection = json.loads(content.decode('utf-8-sig'))
+    topology = build_topology(collection=collection, quantization=quantization)
+    simplify_topology(topology=topology, tolerance=tolerance)
+
+    if topojson:
+        simplified = to_topojson(topology=topology)
+    else:
+        scale = min(topology['transform']['scale'])
+        decimals = max(int(np.ceil(-np.log10(scale))), 0) + 1
+        simplified = to_geojson(topology=topology, collection=collection,
+                                decimals=decimals)
+
+    text = json.dumps(simplified, separators=(',', ':'))
+
+    with open(f'{cache_path}.tmp', 'w', encoding='utf-8') as outfile:
+        outfile.write(text)
+    os.replace(f'{cache_path}.tmp', cache_path)
+
+    return text
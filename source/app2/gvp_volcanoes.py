@@ -1,13 +1,50 @@
 import os
+import re
 import sys
+import json
+import codecs
+import hashlib
 import os.path
+import warnings
 import requests
-import xml.sax
+import glob
 import pandas as pd
-from excel_xml_handler import ExcelXMLHandler
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from excel_xml_handler import backends, iter_rows
+from volcano_index import VolcanoIndex
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 _path_to_config = '..'
+_asset_urls = [
+    'https://volcano.si.edu/database/list_volcano_holocene_excel.cfm',
+    'https://volcano.si.edu/database/list_volcano_pleistocene_excel.cfm']
+_asset_files = ['GVP_Volcano_List_Holocene-cleaned.xls',
+                'GVP_Volcano_List_Pleistocene-cleaned.xls']
+_asset_epochs = [{'Epoch': 'Holocene', 'Data Status': 'Accepted'},
+                 {'Epoch': 'Pleistocene', 'Data Status': 'Preliminary'}]
+_validators_file = 'GVP_Volcano_List-validators.json'
+_chunk_size = 1 << 16
+_timeout = (10, 60)
+_retries = 3
+_imperfections = re.compile(r'\(< ?|\(lt  |\(> ?|\(gt  ')
+_imperfection_span = 5
+_dataframe_cache = 'GVP_Volcano_List-dataframe'
+_dataframe_schema_version = 2
+_spatial_index_cache = 'GVP_Volcano_List-index.npz'
+_spatial_index_columns = ['Latitude', 'Longitude']
+_float_columns = ['Latitude', 'Longitude', 'Elevation (m)']
+_integer_columns = ['Volcano Number']
+_categorical_columns = ['Country', 'Primary Volcano Type', 'Activity Evidence',
+                        'Last Known Eruption', 'Region', 'Subregion',
+                        'Dominant Rock Type', 'Tectonic Setting', 'Epoch',
+                        'Data Status']
 _file_meta = """\
 Project Repo: https://github.com/zero2cx/tpmc.git
 Author: David Schenck"""
@@ -22,7 +59,9 @@ Detail
     The initial step is to download and/or parse two Microsoft Excel
     XML-format dataset files. Then minor format issues in the data are
     patched. Finally, the records from each file are processed and
-    combined into one Pandas DataFrame.
+    combined into one Pandas DataFrame, with typed columns: float32
+    coordinates and elevations (NaN where missing), int32 volcano
+    numbers, and categorical text columns.
 
 Data Caching
     The Dataset Generator's initial execution will download the GVP's
@@ -31,6 +70,24 @@ Data Caching
     local filesystem. Second-run script executions will generate the
     Pandas DataFrame from these cached local files.
 
+    Both files are downloaded at once, over one pooled connection
+    session that retries failed requests. Each download is streamed
+    to its file in chunks, patched on the way, and moved into place
+    only once it is complete.
+
+    The generated DataFrame is cache-stored as well, in a columnar
+    binary file (feather, when pyarrow is installed and can store
+    its column types, otherwise pickle). It is keyed by the size,
+    modification time, and hash of the dataset files, so it is
+    regenerated whenever those change or a download is forced.
+
+    With the --refresh option, each dataset file is requested only if
+    it changed on the server since the last download (by its ETag or
+    Last-Modified validators). The records of a changed file are
+    matched with the cached DataFrame by volcano number, and only the
+    inserted, updated, and deleted records are applied; a summary of
+    those changes is printed.
+
 Notes
     Holocene data records are accepted as academically vetted, per
     consensus. Pleistocene data records are classified as provisional.
@@ -65,65 +122,206 @@ def _load_from_config(path):
         sys.path = sys.path[1:]
 
 
-def _download_url(url):
-    """Download web page at url.
+def _create_session():
+    """Create a pooled connection session that retries failed requests.
+
+    Return the session.
+
+    :return: requests.Session
+    """
+    # The default set of retried methods already includes GET. It is
+    # left as is, because its keyword was renamed from method_whitelist
+    # to allowed_methods in urllib3 1.26, after the pinned requests.
+    retry = Retry(total=_retries, backoff_factor=0.5,
+                  status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=len(_asset_urls))
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-agent'] = (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+        'AppleWebKit/537.36 (KHTML, like Gecko) '
+        'Chrome/72.0.3626.121 Safari/537.36')
+
+    return session
+
+
+def _decode_content(response):
+    """Read the body of a streamed response, one chunk at a time.
+
+    Yield the content of the web page as decoded text chunks.
+
+    :param response: requests.Response
+    :return: generator of str
+    """
+    decoder = codecs.getincrementaldecoder('windows-1252')()
+
+    for chunk in response.iter_content(chunk_size=_chunk_size):
+        yield decoder.decode(chunk)
+
+    yield decoder.decode(b'', final=True)
+
+
+def _download_url(url, session, directory, file, validators=None):
+    """Download web page at url, patch it, and save it as file.
 
-     Return the content of the web page.
+    With the validators (ETag and Last-Modified values) saved from an
+    earlier download of url, the request is conditional, and a page
+    that has not changed since is not downloaded again.
+
+    Return the validators of the downloaded page, or None when the page
+    has not changed.
 
     :param url: str
-    :return: str
+    :param session: requests.Session
+    :param directory: str
+    :param file: str
+    :param validators: dict
+    :return: dict
     """
-    req_headers = {'User-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                                 'AppleWebKit/537.36 (KHTML, like Gecko) '
-                                 'Chrome/72.0.3626.121 Safari/537.36'}
-    response = requests.get(url=url, headers=req_headers)
-    content = response.content.decode(encoding='windows-1252')
+    headers = dict()
+
+    if validators and validators.get('url') == url:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    with session.get(url=url, headers=headers, stream=True,
+                     timeout=_timeout) as response:
+        if response.status_code == 304:
+            return None
+
+        response.raise_for_status()
+        content = _decode_content(response=response)
+        content = _patch_imperfections(chunks=content)
+        _write_asset_file(directory=directory, file=file, content=content)
 
-    return content
+        return {'url': url, 'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')}
 
 
-def _patch_imperfections(content):
-    """Replace problematic characters in content.
+def _patch_imperfections(chunks):
+    """Replace problematic characters in a stream of content chunks.
 
-    Return the patched content.
+    Every imperfection is patched in a single pass. A chunk that ends
+    within reach of a possible imperfection is held back from its last
+    few characters on, until the next chunk completes them.
 
-    :param content: str
-    :return: str
+    Yield the patched content chunks.
+
+    :param chunks: iterable of str
+    :return: generator of str
     """
-    content = content.replace('(<', '(lt ').replace('(lt  ', '(lt ')
-    content = content.replace('(>', '(gt ').replace('(gt  ', '(gt ')
+    def patch(match):
+        return '(lt ' if match.group()[1] in '<l' else '(gt '
+
+    pending = ''
+
+    for chunk in chunks:
+        content = pending + chunk
+        start = max(len(content) - _imperfection_span + 1, 0)
+        cut = content.find('(', start)
+        if cut < 0:
+            cut = len(content)
+        pending = content[cut:]
+        yield _imperfections.sub(patch, content[:cut])
 
-    return content
+    yield _imperfections.sub(patch, pending)
 
 
 def _write_asset_file(directory, file, content):
-    """Save content to local filesystem.
+    """Save streamed content to local filesystem.
+
+    The content is written under a temporary name and then moved into
+    place, so an interrupted download never leaves a partial file.
 
     :param directory: str
     :param file: str
-    :param content: str
+    :param content: iterable of str
+    :return: None
+    """
+    path = f'{directory}/{file}'
+    tmp_path = f'{path}.tmp'
+
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as outfile:
+            for chunk in content:
+                outfile.write(chunk)
+
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, path)
+
+
+def _read_validators(directory):
+    """Load the validators saved for each asset file.
+
+    :param directory: str
+    :return: dict
+    """
+    try:
+        with open(f'{directory}/{_validators_file}') as infile:
+            return json.load(infile)
+
+    except (OSError, ValueError):
+        return dict()
+
+
+def _write_validators(directory, validators):
+    """Save the validators of each asset file.
+
+    :param directory: str
+    :param validators: dict
     :return: None
     """
-    with open(f'{directory}/{file}', 'w') as outfile:
-        outfile.write(content)
+    path = f'{directory}/{_validators_file}'
+
+    with open(f'{path}.tmp', 'w') as outfile:
+        json.dump(validators, outfile)
+
+    os.replace(f'{path}.tmp', path)
 
 
-def _generate_asset_files(directory, files):
+def _generate_asset_files(directory, files, urls=None, conditional=False):
     """Fetch the asset files, patch formatting errors, and save files locally.
 
+    The files are downloaded concurrently, one thread per file, over a
+    shared connection session. The validators of each downloaded file
+    are saved, and with conditional set, a file that has not changed
+    since it was last downloaded is skipped (see _download_url).
+
+    Return the files that were downloaded.
+
     :param directory: str
     :param files: list
-    :return: None
+    :param urls: list
+    :param conditional: bool
+    :return: list
     """
-    urls = ['https://volcano.si.edu/database/list_volcano_holocene_excel.cfm',
-            'https://volcano.si.edu/database/list_volcano_pleistocene_excel.cfm']
+    urls = urls or _asset_urls
+    validators = _read_validators(directory=directory)
 
     os.makedirs(directory, exist_ok=True)
 
-    for url, file in zip(urls, files):
-        content = _download_url(url=url)
-        content = _patch_imperfections(content=content)
-        _write_asset_file(directory=directory, file=file, content=content)
+    with _create_session() as session, \
+            ThreadPoolExecutor(max_workers=len(files)) as executor:
+        futures = [executor.submit(
+            _download_url, url=url, session=session, directory=directory,
+            file=file, validators=validators.get(file) if conditional else None)
+            for url, file in zip(urls, files)]
+        results = [future.result() for future in futures]
+
+    downloaded = [file for file, result in zip(files, results) if result]
+    for file, result in zip(files, results):
+        if result:
+            validators[file] = result
+    _write_validators(directory=directory, validators=validators)
+
+    return downloaded
 
 
 def _locate_asset_files(directory, files):
@@ -144,58 +342,106 @@ def _locate_asset_files(directory, files):
 
 
 def _fill_dead_cells(dataframe):
-    """Fill all empty cells in dataframe with 'no-data' string value.
+    """Fill all empty cells in the text columns of dataframe with
+    'no-data' string value.
 
     Return the modified DataFrame.
 
     :param dataframe: pandas.DataFrame
     :return: pandas.DataFrame
     """
-    for column_name in dataframe.columns:
-        dataframe[column_name] = dataframe[column_name].replace('', 'no-data')
+    text_columns = [column_name for column_name in dataframe.columns
+                    if column_name not in _float_columns + _integer_columns]
+    dataframe[text_columns] = dataframe[text_columns].fillna('').replace(
+        '', 'no-data')
 
     return dataframe
 
 
-def _add_new_column(dataframe, name, content):
-    """Add new column of cells to DataFrame with each cell containing content.
+def _assign_dtypes(dataframe):
+    """Convert the columns of dataframe from strings to compact dtypes.
+
+    Latitude, longitude, and elevation become float32, the volcano
+    number becomes int32, and repeated text columns become categorical.
+    A coordinate or elevation that cannot be read becomes NaN; every
+    record has a volcano number.
 
     Return the modified DataFrame.
 
     :param dataframe: pandas.DataFrame
-    :param name: str
-    :param content: str
     :return: pandas.DataFrame
     """
-    dataframe[name] = [content] * len(dataframe)
+    for column_name in dataframe.columns:
+        if column_name in _float_columns:
+            dataframe[column_name] = pd.to_numeric(
+                dataframe[column_name], errors='coerce').astype('float32')
+        elif column_name in _integer_columns:
+            dataframe[column_name] = pd.to_numeric(
+                dataframe[column_name]).astype('int32')
+        elif column_name in _categorical_columns:
+            dataframe[column_name] = dataframe[column_name].astype('category')
 
     return dataframe
 
 
-def _parse_asset_files(directory, files):
+def _parse_asset_file(directory, file, new_column, columns=None,
+                      backend='auto'):
+    """Generate an untyped DataFrame from the records of one asset file.
+
+    Return the generated DataFrame, with the constant columns of
+    new_column added (see _parse_asset_files).
+
+    :param directory: str
+    :param file: str
+    :param new_column: dict
+    :param columns: list
+    :param backend: str
+    :return: pandas.DataFrame
+    """
+    file_columns = None
+    if columns is not None:
+        file_columns = [column_name for column_name in columns
+                        if column_name not in new_column]
+
+    rows = iter_rows(source=f'{directory}/{file}', header_row=1,
+                     columns=file_columns, backend=backend)
+    dataframe = pd.DataFrame(columns=next(rows, []), data=list(rows))
+
+    for column_name, cell_data in new_column.items():
+        if columns is None or column_name in columns:
+            dataframe[column_name] = cell_data
+
+    return dataframe
+
+
+def _parse_asset_files(directory, files, columns=None, backend='auto'):
     """Generate DataFrame from records contained in asset files.
 
-    Return the generated DataFrame.
+    Return the generated DataFrame. The records are streamed from the
+    first table of each file, row by row, by the named XML parser
+    backend (see excel_xml_handler.iter_rows). With a columns list,
+    only those columns are read, and the DataFrame holds them in that
+    order. The records of all files are combined at once, and the
+    columns are then given typed dtypes (see _assign_dtypes).
 
     :param directory: str
     :param files: list
+    :param columns: list
+    :param backend: str
     :return: pandas.DataFrame
     """
-    new_columns = [{'Epoch': 'Holocene', 'Data Status': 'Accepted'},
-                   {'Epoch': 'Pleistocene', 'Data Status': 'Preliminary'}]
-
-    dataframe = pd.DataFrame()
-
-    for file, new_column in zip(files, new_columns):
-        parser = ExcelXMLHandler()
-        xml.sax.parse(source=f'{directory}/{file}', handler=parser)
-        new_dataframe = pd.DataFrame(data=parser.tables[0][2:],
-                                     columns=parser.tables[0][1])
-        new_dataframe = _fill_dead_cells(dataframe=new_dataframe)
-        for column_name, cell_data in new_column.items():
-            new_dataframe = _add_new_column(dataframe=new_dataframe,
-                                            name=column_name, content=cell_data)
-        dataframe = dataframe.append(new_dataframe, ignore_index=True)
+    dataframes = [_parse_asset_file(directory=directory, file=file,
+                                    new_column=new_column, columns=columns,
+                                    backend=backend)
+                  for file, new_column in zip(files, _asset_epochs)]
+
+    dataframe = pd.concat(dataframes, ignore_index=True, sort=False)
+
+    if columns is not None:
+        dataframe = dataframe[list(columns)]
+
+    dataframe = _fill_dead_cells(dataframe=dataframe)
+    dataframe = _assign_dtypes(dataframe=dataframe)
 
     return dataframe
 
@@ -208,37 +454,448 @@ def _remove_asset_files(directory, files):
     :return: None
     """
     for file in files:
-        os.remove(f'{directory}/{file}')
+        if os.path.isfile(f'{directory}/{file}'):
+            os.remove(f'{directory}/{file}')
+
+
+def _hash_file(path):
+    """Compute the sha1 hash of the file at path, one chunk at a time.
+
+    :param path: str
+    :return: str
+    """
+    digest = hashlib.sha1()
+
+    with open(path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(_chunk_size), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _fingerprint_asset_files(directory, files, known=None):
+    """Identify the current contents of the asset files.
+
+    Return one [file, size, mtime, hash] entry per file. A file whose
+    size and modification time match its entry in known is not hashed
+    again; the known hash is reused.
+
+    :param directory: str
+    :param files: list
+    :param known: list
+    :return: list
+    """
+    known = {entry[0]: entry for entry in known or []}
+    fingerprint = []
+
+    for file in files:
+        stat = os.stat(f'{directory}/{file}')
+        entry = known.get(file)
+        if entry and entry[1:3] == [stat.st_size, stat.st_mtime_ns]:
+            file_hash = entry[3]
+        else:
+            file_hash = _hash_file(path=f'{directory}/{file}')
+        fingerprint.append([file, stat.st_size, stat.st_mtime_ns, file_hash])
+
+    return fingerprint
+
+
+def _cache_formats():
+    """Return the file formats the DataFrame cache can be stored in, the
+    preferred format first.
+
+    :return: list
+    """
+    return ['feather', 'pickle'] if pyarrow else ['pickle']
 
 
-def load_dataframe(data_dir=None, force_download=False):
+def _cache_paths(directory, columns=None, cache_format=None):
+    """Return the paths of the DataFrame cache file and its key file.
+
+    A DataFrame of selected columns is cached apart from the full
+    DataFrame, under a name derived from its columns. The cache file
+    is named for cache_format (by default, the preferred format).
+
+    :param directory: str
+    :param columns: list
+    :param cache_format: str
+    :return: tuple
+    """
+    name = _dataframe_cache
+    if columns is not None:
+        digest = hashlib.sha1(json.dumps(list(columns)).encode('utf-8'))
+        name = f'{name}-{digest.hexdigest()[:12]}'
+
+    return (f'{directory}/{name}.{cache_format or _cache_formats()[0]}',
+            f'{directory}/{name}.json')
+
+
+def _read_cached_dataframe(directory, files, columns=None):
+    """Load the cached DataFrame, if it was generated from the current
+    asset files under the current schema version.
+
+    Return the DataFrame, or None when the cache is missing or stale.
+    A file whose size and modification time are unchanged is taken to
+    be unchanged; any other file is hashed, so asset files that were
+    merely touched do not invalidate the cache. Their new size and
+    modification time are then recorded in the key, so they are not
+    hashed again on the next load.
+
+    :param directory: str
+    :param files: list
+    :param columns: list
+    :return: pandas.DataFrame
+    """
+    _, key_path = _cache_paths(directory=directory, columns=columns)
+
+    try:
+        with open(key_path) as infile:
+            key = json.load(infile)
+
+    except (OSError, ValueError):
+        return None
+
+    if key.get('schema_version') != _dataframe_schema_version or \
+            key.get('format') not in _cache_formats() or \
+            key.get('columns') != (None if columns is None else list(columns)):
+        return None
+
+    fingerprint = _fingerprint_asset_files(directory=directory, files=files,
+                                           known=key.get('sources'))
+    if [(entry[0], entry[3]) for entry in fingerprint] != \
+            [(entry[0], entry[3]) for entry in key.get('sources', [])]:
+        return None
+
+    cache_path, _ = _cache_paths(directory=directory, columns=columns,
+                                 cache_format=key['format'])
+
+    try:
+        if key['format'] == 'feather':
+            dataframe = pd.read_feather(cache_path)
+        else:
+            dataframe = pd.read_pickle(cache_path)
+
+    except (OSError, ValueError):
+        return None
+
+    if fingerprint != key['sources']:
+        key['sources'] = fingerprint
+        _write_cache_key(key_path=key_path, key=key)
+
+    return dataframe
+
+
+def _write_cache_key(key_path, key):
+    """Save the key of the DataFrame cache, replacing it atomically.
+
+    :param key_path: str
+    :param key: dict
+    :return: None
+    """
+    with open(f'{key_path}.tmp', 'w') as outfile:
+        json.dump(key, outfile)
+    os.replace(f'{key_path}.tmp', key_path)
+
+
+def _write_cached_dataframe(directory, files, dataframe, columns=None):
+    """Save dataframe to the DataFrame cache, along with its key.
+
+    Both files are written under a temporary name and then moved into
+    place, the key file last. Should the installed pyarrow be unable to
+    store the dtypes of dataframe in a feather file, it is stored as a
+    pickle instead, with a warning.
+
+    :param directory: str
+    :param files: list
+    :param dataframe: pandas.DataFrame
+    :param columns: list
+    :return: None
+    """
+    key = {'schema_version': _dataframe_schema_version,
+           'columns': None if columns is None else list(columns),
+           'sources': _fingerprint_asset_files(directory=directory,
+                                               files=files)}
+
+    for cache_format in _cache_formats():
+        cache_path, key_path = _cache_paths(directory=directory,
+                                            columns=columns,
+                                            cache_format=cache_format)
+
+        try:
+            if cache_format == 'feather':
+                dataframe.to_feather(f'{cache_path}.tmp')
+            else:
+                dataframe.to_pickle(f'{cache_path}.tmp')
+            break
+
+        except (TypeError, ValueError, NotImplementedError) as e:
+            if os.path.exists(f'{cache_path}.tmp'):
+                os.remove(f'{cache_path}.tmp')
+            warnings.warn(f'DataFrame cache not stored as {cache_format} '
+                          f'({e}); storing it as a pickle instead.')
+
+    key['format'] = cache_format
+    os.replace(f'{cache_path}.tmp', cache_path)
+    _write_cache_key(key_path=key_path, key=key)
+
+
+def _remove_cached_dataframe(directory):
+    """If found, delete all DataFrame cache files from directory.
+
+    :param directory: str
+    :return: None
+    """
+    for path in glob.glob(f'{glob.escape(directory)}/{_dataframe_cache}*'):
+        os.remove(path)
+
+
+def load_dataframe(data_dir=None, force_download=False, urls=None,
+                   columns=None, backend='auto'):
     """Generate DataFrame from asset files.
 
-    Return the generated DataFrame.
+    Return the generated DataFrame. The asset files are downloaded from
+    urls (by default, the GVP website) when not found in data_dir. With
+    a columns list, the DataFrame holds only those columns, and the
+    cells of all other columns are skipped while parsing. The asset
+    files are parsed by the named XML parser backend: 'lxml', 'sax',
+    or 'auto' (lxml when installed, otherwise sax).
+
+    The DataFrame is loaded from its cache in data_dir when the cache
+    is current; otherwise it is generated and the cache is replaced.
 
     :param data_dir: str
     :param force_download: bool
+    :param urls: list
+    :param columns: list
+    :param backend: str
     :return: pandas.DataFrame
     """
     if not data_dir:
         data_dir = '.'
 
-    filenames = ['GVP_Volcano_List_Holocene-cleaned.xls',
-                 'GVP_Volcano_List_Pleistocene-cleaned.xls']
+    filenames = _asset_files
 
     if force_download:
         _remove_asset_files(directory=data_dir, files=filenames)
+        _remove_cached_dataframe(directory=data_dir)
 
     found = _locate_asset_files(directory=data_dir, files=filenames)
 
     if not found:
-        _generate_asset_files(directory=data_dir, files=filenames)
+        _generate_asset_files(directory=data_dir, files=filenames, urls=urls)
+
+    dataframe = _read_cached_dataframe(directory=data_dir, files=filenames,
+                                       columns=columns)
 
-    dataframe = _parse_asset_files(directory=data_dir, files=filenames)
+    if dataframe is None:
+        dataframe = _parse_asset_files(directory=data_dir, files=filenames,
+                                       columns=columns, backend=backend)
+        _write_cached_dataframe(directory=data_dir, files=filenames,
+                                dataframe=dataframe, columns=columns)
 
     return dataframe
 
 
+def fingerprint_asset_files(data_dir=None, known=None):
+    """Identify the current contents of the asset files in data_dir.
+
+    Return one [file, size, mtime, hash] entry per asset file, so that
+    data derived from the asset files can be kept until they change. A
+    file whose size and modification time match its entry in known (an
+    earlier fingerprint) is not hashed again. OSError is raised when an
+    asset file is missing.
+
+    :param data_dir: str
+    :param known: list
+    :return: list
+    """
+    return _fingerprint_asset_files(directory=data_dir or '.',
+                                    files=_asset_files, known=known)
+
+
+def load_index(data_dir=None, force_download=False, urls=None,
+               columns=None, backend='auto'):
+    """Generate DataFrame from asset files, along with a spatial index
+    over its Latitude and Longitude columns.
+
+    Return the DataFrame (see load_dataframe) and a VolcanoIndex, whose
+    within_bbox, within_radius_km, and nearest_k queries return
+    positions of the DataFrame's records. The index is saved next to
+    the DataFrame cache in data_dir, keyed by the hashes of the asset
+    files and by a hash of the indexed coordinates in row order, and is
+    rebuilt only when those change (e.g. when refresh_dataframe has
+    rewritten the DataFrame cache with its records in a new order).
+
+    :param data_dir: str
+    :param force_download: bool
+    :param urls: list
+    :param columns: list
+    :param backend: str
+    :return: tuple
+    """
+    if not data_dir:
+        data_dir = '.'
+
+    dataframe = load_dataframe(data_dir=data_dir, force_download=force_download,
+                               urls=urls, columns=columns, backend=backend)
+    _, key_path = _cache_paths(directory=data_dir, columns=columns)
+
+    try:
+        with open(key_path) as infile:
+            known = json.load(infile).get('sources')
+
+    except (OSError, ValueError):
+        known = None
+
+    fingerprint = _fingerprint_asset_files(directory=data_dir,
+                                           files=_asset_files, known=known)
+    coordinates = dataframe
+    if columns is not None and not set(_spatial_index_columns) <= set(columns):
+        coordinates = load_dataframe(data_dir=data_dir, urls=urls,
+                                     columns=_spatial_index_columns,
+                                     backend=backend)
+    rows = hashlib.sha1()
+    for column_name in _spatial_index_columns:
+        rows.update(coordinates[column_name].to_numpy(dtype='float64')
+                    .tobytes())
+    key = json.dumps({'sources': [(entry[0], entry[3])
+                                  for entry in fingerprint],
+                      'rows': rows.hexdigest()})
+    index_path = f'{data_dir}/{_spatial_index_cache}'
+
+    try:
+        index = VolcanoIndex.load(file=index_path)
+        if index.key == key:
+            return dataframe, index
+
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index = VolcanoIndex(latitudes=coordinates['Latitude'],
+                         longitudes=coordinates['Longitude'])
+    index.save(file=f'{index_path}.tmp', key=key)
+    os.replace(f'{index_path}.tmp', index_path)
+
+    return dataframe, index
+
+
+def _diff_records(old, new):
+    """Apply the changes between two versions of one epoch's records.
+
+    Records are matched by volcano number. Return the old records
+    patched with the changes, along with a count of each change: the
+    deleted records are dropped, the updated records are overwritten
+    with their new values, and the inserted records are appended. The
+    records that did not change are kept as they are. The categorical
+    columns of the patched records hold plain objects, so that new
+    values fit in; their dtypes are to be assigned again.
+
+    :param old: pandas.DataFrame
+    :param new: pandas.DataFrame
+    :return: tuple
+    """
+    old = old.set_index('Volcano Number')
+    new = new.set_index('Volcano Number')
+
+    if not (old.index.is_unique and new.index.is_unique):
+        # Records cannot be matched one to one; replace them all.
+        return new.reset_index(), {'inserted': len(new), 'updated': 0,
+                                   'deleted': len(old)}
+
+    deleted = old.index[~old.index.isin(new.index)]
+    inserted = new.index[~new.index.isin(old.index)]
+    kept = old.index[old.index.isin(new.index)]
+    before = old.loc[kept].reindex(columns=new.columns).astype(object)
+    after = new.loc[kept].astype(object)
+    differs = (before != after) & ~(before.isna() & after.isna())
+    updated = kept[differs.any(axis=1).values]
+
+    columns = list(old.columns) + [column_name for column_name in new.columns
+                                   if column_name not in old.columns]
+    patched = old.drop(index=deleted).reindex(columns=columns)
+    patched = patched.astype({column_name: object for column_name in columns
+                              if patched[column_name].dtype.name == 'category'})
+    patched.loc[updated] = new.loc[updated].reindex(columns=columns)
+    patched = pd.concat([patched, new.loc[inserted].reindex(columns=columns)],
+                        sort=False)
+
+    return patched.reset_index(), {'inserted': len(inserted),
+                                   'updated': len(updated),
+                                   'deleted': len(deleted)}
+
+
+def refresh_dataframe(data_dir=None, urls=None, backend='auto'):
+    """Bring the asset files, and the DataFrame generated from them, up
+    to date with the files available from urls.
+
+    Each asset file is requested conditionally (see _download_url), so
+    an unchanged file is neither downloaded nor parsed again. The
+    records of a changed file are compared with the records of the
+    cached DataFrame by volcano number, and only the inserted, updated,
+    and deleted records are applied to it. When no asset files are
+    found locally, everything is downloaded, as by load_dataframe.
+
+    Return the refreshed DataFrame and a summary of the changes, keyed
+    by epoch.
+
+    :param data_dir: str
+    :param urls: list
+    :param backend: str
+    :return: tuple
+    """
+    if not data_dir:
+        data_dir = '.'
+
+    filenames = _asset_files
+
+    if not _locate_asset_files(directory=data_dir, files=filenames):
+        dataframe = load_dataframe(data_dir=data_dir, force_download=True,
+                                   urls=urls, backend=backend)
+        summary = {new_column['Epoch']: {
+            'status': 'downloaded', 'updated': 0, 'deleted': 0,
+            'inserted': int((dataframe['Epoch'] == new_column['Epoch']).sum())}
+            for new_column in _asset_epochs}
+
+        return dataframe, summary
+
+    dataframe = load_dataframe(data_dir=data_dir, backend=backend)
+    downloaded = _generate_asset_files(directory=data_dir, files=filenames,
+                                       urls=urls, conditional=True)
+    summary = dict()
+    epochs = []
+
+    for file, new_column in zip(filenames, _asset_epochs):
+        epoch = new_column['Epoch']
+        old = dataframe[dataframe['Epoch'] == epoch]
+
+        if file not in downloaded:
+            summary[epoch] = {'status': 'unchanged', 'inserted': 0,
+                              'updated': 0, 'deleted': 0}
+            epochs.append(old)
+            continue
+
+        new = _parse_asset_file(directory=data_dir, file=file,
+                                new_column=new_column, backend=backend)
+        new = _assign_dtypes(dataframe=_fill_dead_cells(dataframe=new))
+        patched, changes = _diff_records(old=old, new=new)
+        summary[epoch] = dict(status='changed', **changes)
+        epochs.append(patched)
+
+    if not downloaded:
+        return dataframe, summary
+
+    columns = list(dataframe.columns)
+    dataframe = pd.concat(epochs, ignore_index=True, sort=False)
+    columns += [column_name for column_name in dataframe.columns
+                if column_name not in columns]
+    dataframe = _fill_dead_cells(dataframe=dataframe[columns])
+    dataframe = _assign_dtypes(dataframe=dataframe)
+    _write_cached_dataframe(directory=data_dir, files=filenames,
+                            dataframe=dataframe)
+
+    return dataframe, summary
+
+
 def _parse_args():
     """Parse and validate command line arguments.
 
@@ -251,6 +908,16 @@ def _parse_args():
                             formatter_class=RawDescriptionHelpFormatter)
     parser.add_argument('-d', '--data', type=str, default=data_dir,
                         help='Directory to use for local data assets.')
+    parser.add_argument('-f', '--force-download', action='store_true',
+                        help='Download the dataset files again, even when '
+                             'cached locally.')
+    parser.add_argument('-r', '--refresh', action='store_true',
+                        help='Download only the dataset files that changed, '
+                             'and apply only the records that changed.')
+    parser.add_argument('-b', '--backend', type=str, default='auto',
+                        choices=backends,
+                        help='XML parser to read the dataset files with. '
+                             '[DEFAULT: lxml when installed, otherwise sax]')
     return parser.parse_args()
 
 
@@ -260,6 +927,18 @@ if __name__ == '__main__':
     args = _parse_args()
     data_dir = args.data
 
-    dataframe = load_dataframe(data_dir=data_dir)
+    if args.refresh:
+        dataframe, summary = refresh_dataframe(data_dir=data_dir,
+                                               backend=args.backend)
+        for epoch, changes in summary.items():
+            print(f"{epoch}: {changes['status']}, "
+                  f"{changes['inserted']} inserted, "
+                  f"{changes['updated']} updated, "
+                  f"{changes['deleted']} deleted")
+
+    else:
+        dataframe = load_dataframe(data_dir=data_dir,
+                                   force_download=args.force_download,
+                                   backend=args.backend)
 
     print(dataframe)
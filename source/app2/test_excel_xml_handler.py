@@ -0,0 +1,98 @@
+import pytest
+import excel_xml_handler
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+_workbook = """\
+<?xml version="1.0"?>
+<Workbook xmlns="urn:schemas-microsoft-com:office:spreadsheet"
+ xmlns:ss="urn:schemas-microsoft-com:office:spreadsheet"
+ xmlns:html="http://www.w3.org/TR/REC-html40">
+<Worksheet ss:Name="first"><Table>
+<Row><Cell><Data ss:Type="String">Title</Data></Cell></Row>
+<Row><Cell><Data ss:Type="String">Name</Data></Cell><Cell><Data
+ ss:Type="String">Country</Data></Cell><Cell><Data
+ ss:Type="String">Elevation</Data></Cell></Row>
+<Row><Cell><Data ss:Type="String">Fuji</Data></Cell><Cell><Data
+ ss:Type="String">Japan</Data></Cell><Cell><Data
+ ss:Type="Number">3776</Data></Cell></Row>
+<Row><Cell><Data ss:Type="String">Etna</Data></Cell><Cell
+ ss:Index="3"><Data ss:Type="Number">3357</Data></Cell></Row>
+<Row><Cell><Data ss:Type="String"></Data></Cell><Cell><ss:Data
+ ss:Type="String"><html:B>Ice</html:B>land</ss:Data></Cell></Row>
+<Row><Cell>
+ <Data ss:Type="String">Hekla</Data>
+</Cell><!-- a comment --><Cell><Data ss:Type="String">Iceland</Data><Comment
+ ><Data>noted</Data></Comment></Cell></Row>
+</Table></Worksheet>
+<Worksheet ss:Name="second"><Table>
+<Row><Cell><Data ss:Type="String">Other</Data></Cell></Row>
+</Table></Worksheet>
+</Workbook>
+"""
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / 'workbook.xls'
+    path.write_text(_workbook)
+
+    return str(path)
+
+
+def _backends():
+    if excel_xml_handler.etree is None:
+        return ['sax']
+
+    return ['sax', 'lxml']
+
+
+@pytest.mark.parametrize('backend', _backends())
+def test_rows_are_placed_by_cell_index(workbook, backend):
+    rows = list(excel_xml_handler.iter_rows(source=workbook, header_row=1,
+                                            backend=backend))
+
+    assert rows[0] == ['Name', 'Country', 'Elevation']
+    assert rows[1] == ['Fuji', 'Japan', '3776']
+    assert rows[2] == ['Etna', '', '3357']
+    assert rows[3] == ['', 'Iceland', '']
+
+
+@pytest.mark.parametrize('columns', [None, ['Elevation', 'Name']])
+def test_backends_yield_identical_rows(workbook, columns):
+    if excel_xml_handler.etree is None:
+        pytest.skip('the lxml backend requires the lxml package')
+
+    rows = [list(excel_xml_handler.iter_rows(
+        source=workbook, header_row=1, columns=columns, backend=backend))
+        for backend in _backends()]
+
+    assert rows[0] == rows[1]
+    assert len(rows[0]) == 5
+
+
+@pytest.mark.parametrize('backend', _backends())
+def test_projected_columns_are_yielded_in_order(workbook, backend):
+    rows = list(excel_xml_handler.iter_rows(
+        source=workbook, header_row=1, columns=['Elevation', 'Name'],
+        backend=backend))
+
+    assert rows[:3] == [['Elevation', 'Name'], ['3776', 'Fuji'],
+                        ['3357', 'Etna']]
+
+
+@pytest.mark.parametrize('backend', _backends())
+def test_missing_columns_are_reported(workbook, backend):
+    with pytest.raises(excel_xml_handler.MissingColumns):
+        list(excel_xml_handler.iter_rows(source=workbook, header_row=1,
+                                         columns=['Region'], backend=backend))
+
+
+@pytest.mark.parametrize('backend', _backends())
+def test_other_tables_can_be_selected(workbook, backend):
+    rows = list(excel_xml_handler.iter_rows(source=workbook, header_row=0,
+                                            table=1, backend=backend))
+
+    assert rows == [['Other']]
@@ -0,0 +1,127 @@
+import json
+import geo_simplify
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+
+def _feature(name, *polygons):
+    return {'type': 'Feature', 'properties': {'name': name},
+            'geometry': {'type': 'MultiPolygon', 'coordinates': list(polygons)}}
+
+
+def _border(steps, wiggle):
+    """Return the points of a slightly wiggly border from (2, 0) to (2, 4).
+
+    :param steps: int
+    :param wiggle: float
+    :return: list
+    """
+    return [[2 + (wiggle if i % 2 else 0), 4 * i / steps]
+            for i in range(steps + 1)]
+
+
+def _neighbours(wiggle=0.0, steps=40):
+    """Return two squares side by side, sharing a wiggly border.
+
+    :param wiggle: float
+    :param steps: int
+    :return: dict
+    """
+    border = _border(steps=steps, wiggle=wiggle)
+    west = [[0, 0]] + border + [[0, 4], [0, 0]]
+    east = [[4, 0], [4, 4]] + border[::-1] + [[4, 0]]
+
+    return {'type': 'FeatureCollection',
+            'features': [_feature('west', [west]), _feature('east', [east])]}
+
+
+def _enclave():
+    """Return a square with a hole, filled exactly by a second feature.
+
+    :return: dict
+    """
+    hole = [[1, 1], [1, 3], [3, 3], [3, 1], [1, 1]]
+    host = [[0, 0], [4, 0], [4, 4], [0, 4], [0, 0]]
+
+    return {'type': 'FeatureCollection',
+            'features': [_feature('host', [host, hole]),
+                         _feature('enclave', [hole[::-1]])]}
+
+
+def _points(ring):
+    return {(round(x, 6), round(y, 6)) for x, y in ring}
+
+
+def _round_trip(collection, tolerance):
+    topology = geo_simplify.build_topology(collection=collection,
+                                           quantization=4001)
+    geo_simplify.simplify_topology(topology=topology, tolerance=tolerance)
+    simplified = geo_simplify.to_geojson(topology=topology,
+                                         collection=collection, decimals=6)
+
+    return topology, simplified
+
+
+def test_round_trip_without_tolerance_keeps_every_point():
+    collection = _neighbours(wiggle=0.001)
+    _, simplified = _round_trip(collection=collection, tolerance=0)
+
+    for before, after in zip(collection['features'], simplified['features']):
+        assert _points(after['geometry']['coordinates'][0][0]) == \
+            _points(before['geometry']['coordinates'][0][0])
+
+
+def test_shared_border_is_stored_once_and_simplified_alike():
+    topology, simplified = _round_trip(collection=_neighbours(wiggle=0.001),
+                                       tolerance=0.01)
+    west, east = (feature['geometry']['coordinates'][0][0]
+                  for feature in simplified['features'])
+
+    assert len(topology['arcs']) == 3
+    assert _points(west) & _points(east) == {(2, 0), (2, 4)}
+    assert _points(west) == {(0, 0), (2, 0), (2, 4), (0, 4)}
+    assert _points(east) == {(4, 0), (4, 4), (2, 4), (2, 0)}
+
+
+def test_shared_border_survives_simplification_without_gaps():
+    _, simplified = _round_trip(collection=_neighbours(wiggle=0.05),
+                                tolerance=0.01)
+    west, east = (feature['geometry']['coordinates'][0][0]
+                  for feature in simplified['features'])
+
+    border = {point for point in _points(west) if 1.9 < point[0] < 2.1}
+    assert border == {point for point in _points(east)
+                      if 1.9 < point[0] < 2.1}
+    assert len(border) > 2
+
+
+def test_enclave_matches_the_hole_of_its_host():
+    topology, simplified = _round_trip(collection=_enclave(), tolerance=0.5)
+    host, enclave = (feature['geometry']['coordinates']
+                     for feature in simplified['features'])
+
+    assert len(host) == 1 and len(host[0]) == 2
+    assert len(enclave) == 1 and len(enclave[0]) == 1
+    assert _points(host[0][1]) == _points(enclave[0][0])
+    assert len(_points(enclave[0][0])) >= 3
+    assert len(topology['arcs']) == 2
+
+
+def test_topojson_round_trips_through_json():
+    topology, _ = _round_trip(collection=_enclave(), tolerance=0)
+    encoded = json.loads(json.dumps(geo_simplify.to_topojson(
+        topology=topology)))
+
+    assert encoded['type'] == 'Topology'
+    geometries = encoded['objects']['countries']['geometries']
+    assert [geometry['properties']['name'] for geometry in geometries] == \
+        ['host', 'enclave']
+    for encoded_arc, arc in zip(encoded['arcs'], topology['arcs']):
+        x = y = 0
+        decoded = []
+        for dx, dy in encoded_arc:
+            x, y = x + dx, y + dy
+            decoded.append([x, y])
+        assert decoded == [list(point) for point in arc]
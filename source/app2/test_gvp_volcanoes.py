@@ -0,0 +1,144 @@
+import os
+import numpy as np
+import pandas as pd
+import gvp_volcanoes as gvp
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+
+class _Response:
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        assert self.status_code == 200
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), 3):
+            yield self.body[i:i + 3]
+
+
+class _Session:
+    """Serve one response for every url, and record the requests."""
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def get(self, url, headers, stream, timeout):
+        self.requests.append((url, headers))
+
+        return self.responses[url]
+
+
+def _records(rows):
+    dataframe = pd.DataFrame(rows, columns=['Volcano Number', 'Volcano Name',
+                                            'Country', 'Elevation (m)'])
+    dataframe['Country'] = dataframe['Country'].astype('category')
+
+    return dataframe
+
+
+def test_diff_records_applies_each_change():
+    old = _records([[1, 'Fuji', 'Japan', 3776.0],
+                    [2, 'Etna', 'Italy', np.nan],
+                    [3, 'Hekla', 'Iceland', 1490.0]])
+    new = _records([[1, 'Fuji', 'Japan', 3776.0],
+                    [2, 'Etna', 'Italia', np.nan],
+                    [4, 'Katla', 'Iceland', 1490.0]])
+
+    patched, changes = gvp._diff_records(old=old, new=new)
+
+    assert changes == {'inserted': 1, 'updated': 1, 'deleted': 1}
+    assert list(patched['Volcano Number']) == [1, 2, 4]
+    assert list(patched['Country']) == ['Japan', 'Italia', 'Iceland']
+    assert list(patched['Volcano Name']) == ['Fuji', 'Etna', 'Katla']
+    assert patched['Elevation (m)'].isna().tolist() == [False, True, False]
+
+
+def test_diff_records_without_changes():
+    old = _records([[1, 'Fuji', 'Japan', 3776.0], [2, 'Etna', 'Italy', np.nan]])
+
+    patched, changes = gvp._diff_records(old=old, new=old.copy())
+
+    assert changes == {'inserted': 0, 'updated': 0, 'deleted': 0}
+    assert patched.astype(object).equals(old.astype(object))
+
+
+def test_diff_records_replaces_records_that_cannot_be_matched():
+    old = _records([[1, 'Fuji', 'Japan', 3776.0], [1, 'Etna', 'Italy', 3357.0]])
+    new = _records([[1, 'Fuji', 'Japan', 3776.0]])
+
+    patched, changes = gvp._diff_records(old=old, new=new)
+
+    assert changes == {'inserted': 1, 'updated': 0, 'deleted': 2}
+    assert list(patched['Volcano Name']) == ['Fuji']
+
+
+def test_download_sends_validators_and_skips_an_unchanged_page(tmp_path):
+    session = _Session({'http://gvp/list': _Response(status_code=304)})
+    validators = {'url': 'http://gvp/list', 'etag': '"abc"',
+                  'last_modified': 'Mon, 01 Apr 2019 00:00:00 GMT'}
+
+    assert gvp._download_url(url='http://gvp/list', session=session,
+                             directory=str(tmp_path), file='list.xls',
+                             validators=validators) is None
+    assert session.requests == [('http://gvp/list', {
+        'If-None-Match': '"abc"',
+        'If-Modified-Since': 'Mon, 01 Apr 2019 00:00:00 GMT'})]
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_download_saves_a_changed_page(tmp_path):
+    body = 'Fuji (> 3000 m), caf\xe9'.encode('windows-1252')
+    session = _Session({'http://gvp/list': _Response(
+        status_code=200, body=body, headers={'ETag': '"def"'})})
+
+    validators = gvp._download_url(url='http://gvp/list', session=session,
+                                   directory=str(tmp_path), file='list.xls',
+                                   validators={'url': 'http://gvp/old',
+                                               'etag': '"abc"'})
+
+    assert session.requests == [('http://gvp/list', {})]
+    assert validators == {'url': 'http://gvp/list', 'etag': '"def"',
+                          'last_modified': None}
+    with open(str(tmp_path / 'list.xls'), encoding='utf-8') as infile:
+        assert infile.read() == 'Fuji (gt 3000 m), caf\xe9'
+
+
+def test_conditional_fetch_keeps_validators_of_unchanged_files(tmp_path,
+                                                               monkeypatch):
+    session = _Session({
+        'http://gvp/a': _Response(status_code=304),
+        'http://gvp/b': _Response(status_code=200, body=b'new',
+                                  headers={'ETag': '"b2"'})})
+    monkeypatch.setattr(gvp, '_create_session', lambda: session)
+    directory = str(tmp_path)
+    gvp._write_validators(directory=directory, validators={
+        'a.xls': {'url': 'http://gvp/a', 'etag': '"a1"', 'last_modified': None},
+        'b.xls': {'url': 'http://gvp/b', 'etag': '"b1"', 'last_modified': None}})
+
+    downloaded = gvp._generate_asset_files(
+        directory=directory, files=['a.xls', 'b.xls'],
+        urls=['http://gvp/a', 'http://gvp/b'], conditional=True)
+
+    assert downloaded == ['b.xls']
+    assert not os.path.exists(str(tmp_path / 'a.xls'))
+    assert gvp._read_validators(directory=directory) == {
+        'a.xls': {'url': 'http://gvp/a', 'etag': '"a1"', 'last_modified': None},
+        'b.xls': {'url': 'http://gvp/b', 'etag': '"b2"', 'last_modified': None}}
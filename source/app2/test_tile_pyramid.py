@@ -0,0 +1,129 @@
+import json
+import pytest
+import tile_pyramid
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+
+def _square(west, south, east, north):
+    return [(west, south), (east, south), (east, north), (west, north)]
+
+
+def _collection(*rings):
+    return {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'name': f'polygon {i}'},
+         'geometry': {'type': 'Polygon', 'coordinates': [
+             [list(point) for point in ring + ring[:1]]]}}
+        for i, ring in enumerate(rings)]}
+
+
+def _read(directory, zoom, column, row):
+    with open(f'{directory}/{zoom}/{column}/{row}.json') as infile:
+        return json.load(infile)
+
+
+def _decode_ring(ring):
+    points, x, y = [], 0, 0
+    for dx, dy in zip(ring[::2], ring[1::2]):
+        x, y = x + dx, y + dy
+        points.append((x, y))
+    return points
+
+
+def test_clip_ring_keeps_the_part_within_the_band():
+    ring = _square(west=0.2, south=0.2, east=0.8, north=0.6)
+    clipped = tile_pyramid._clip_ring(ring=ring, axis=0, low=0.0, high=0.5)
+
+    assert set(clipped) == {(0.2, 0.2), (0.5, 0.2), (0.5, 0.6), (0.2, 0.6)}
+    assert abs(tile_pyramid._ring_area(ring=clipped)) == \
+        pytest.approx(0.3 * 0.4)
+
+
+def test_clip_ring_outside_the_band_leaves_nothing():
+    ring = _square(west=0.6, south=0.2, east=0.8, north=0.6)
+
+    assert tile_pyramid._clip_ring(ring=ring, axis=0, low=0.0, high=0.5) == []
+
+
+def test_split_polygon_covers_each_tile_once():
+    polygon = [_square(west=0.25, south=0.25, east=0.75, north=0.75)]
+    parts = dict(tile_pyramid._split_polygon(polygon=polygon, zoom=1))
+
+    assert sorted(parts) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    for (column, row), part in parts.items():
+        xs = [x for x, _ in part[0]]
+        ys = [y for _, y in part[0]]
+        assert column / 2 <= min(xs) and max(xs) <= (column + 1) / 2
+        assert row / 2 <= min(ys) and max(ys) <= (row + 1) / 2
+    assert sum(abs(tile_pyramid._ring_area(ring=part[0]))
+               for part in parts.values()) == pytest.approx(0.25)
+
+
+def test_split_polygon_clips_holes_with_their_outer_ring():
+    outer = _square(west=0.1, south=0.1, east=0.9, north=0.9)
+    hole = _square(west=0.4, south=0.4, east=0.6, north=0.45)[::-1]
+    parts = dict(tile_pyramid._split_polygon(polygon=[outer, hole], zoom=1))
+
+    assert [len(parts[tile]) for tile in sorted(parts)] == [2, 1, 2, 1]
+
+
+def test_polygon_tiles_are_clipped_to_their_tiles(tmp_path):
+    directory = str(tmp_path / 'tiles')
+    counts = tile_pyramid.write_polygon_tiles(
+        directory=directory,
+        collection=_collection(_square(west=-20, south=-20, east=20,
+                                       north=20)),
+        max_zoom=1, pixel_tolerance=0)
+
+    assert counts == {0: 1, 1: 4}
+    for column in (0, 1):
+        for row in (0, 1):
+            tile = _read(directory=directory, zoom=1, column=column, row=row)
+            ring = tile['features'][0]['geometry']['coordinates'][0][0]
+            lons = [lon for lon, _ in ring]
+            lats = [lat for _, lat in ring]
+            assert sorted({min(lons), max(lons)}) == \
+                ([-20, 0] if column == 0 else [0, 20])
+            assert sorted({round(min(lats), 6), round(max(lats), 6)}) == \
+                ([0, 20] if row == 0 else [-20, 0])
+
+
+def test_compact_polygon_tiles_stay_within_the_extent(tmp_path):
+    directory = str(tmp_path / 'tiles')
+    tile_pyramid.write_polygon_tiles(
+        directory=directory,
+        collection=_collection(_square(west=-20, south=-20, east=20,
+                                       north=20)),
+        max_zoom=1, tile_format='compact', pixel_tolerance=0, extent=4096)
+
+    for column in (0, 1):
+        for row in (0, 1):
+            tile = _read(directory=directory, zoom=1, column=column, row=row)
+            points = _decode_ring(tile['features'][0]['polygons'][0][0])
+            assert all(0 <= x <= 4096 and 0 <= y <= 4096 for x, y in points)
+            assert (4096 * (1 - column), 4096 * (1 - row)) in points
+
+
+def test_point_tiles_file_each_point_under_its_tile(tmp_path):
+    directory = str(tmp_path / 'tiles')
+    counts = tile_pyramid.write_point_tiles(
+        directory=directory, lons=[-90.0, 90.0, float('nan')],
+        lats=[45.0, -45.0, 0.0], rows=[['a'], ['b'], ['c']],
+        columns=['name'], max_zoom=1)
+
+    assert counts == {0: 1, 1: 2}
+    west = _read(directory=directory, zoom=1, column=0, row=0)
+    east = _read(directory=directory, zoom=1, column=1, row=1)
+    assert [feature['properties']['name']
+            for feature in west['features']] == ['a']
+    assert [feature['properties']['name']
+            for feature in east['features']] == ['b']
+
+
+def test_unknown_tile_format_is_rejected(tmp_path):
+    with pytest.raises(tile_pyramid.TileFormatError):
+        tile_pyramid.write_point_tiles(directory=str(tmp_path), lons=[],
+                                       lats=[], rows=[], columns=[],
+                                       tile_format='mvt')
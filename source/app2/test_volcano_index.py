@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+import volcano_index
+from volcano_index import VolcanoIndex
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+
+@pytest.fixture(scope='module')
+def points():
+    rng = np.random.RandomState(0)
+    latitudes = rng.uniform(-90, 90, 3000)
+    longitudes = rng.uniform(-180, 180, 3000)
+    latitudes[:4] = [10.0, -10.0, 52.0, np.nan]
+    longitudes[:4] = [179.5, -179.5, 180.0, 0.0]
+
+    return latitudes, longitudes
+
+
+def _distances(points, latitude, longitude):
+    latitudes, longitudes = points
+
+    return volcano_index._haversine_km(
+        latitude=latitude, longitude=longitude, latitudes=latitudes,
+        longitudes=longitudes)
+
+
+@pytest.mark.parametrize('cell_size', [1.0, 7.0])
+@pytest.mark.parametrize('south, west, north, east', [
+    (-20, -30, 40, 60),
+    (-20, 170, 20, -170),
+    (-90, -180, 90, 180),
+    (0, 350, 30, 370),
+    (51, 179, 53, 181),
+    (40, 10, 45, 10),
+])
+def test_within_bbox(points, cell_size, south, west, north, east):
+    latitudes, longitudes = points
+    index = VolcanoIndex(latitudes=latitudes, longitudes=longitudes,
+                         cell_size=cell_size)
+    longitudes = (longitudes + 180) % 360 - 180
+    left, right = (west + 180) % 360 - 180, (east + 180) % 360 - 180
+    if east - west >= 360:
+        left, right = -180, 180
+    elif right == -180 and left != -180:
+        right = 180
+    inside = (latitudes >= south) & (latitudes <= north)
+    if left <= right:
+        inside &= (longitudes >= left) & (longitudes <= right)
+    else:
+        inside &= (longitudes >= left) | (longitudes <= right)
+
+    found = index.within_bbox(south=south, west=west, north=north, east=east)
+    assert found.tolist() == np.flatnonzero(inside).tolist()
+
+
+def test_bbox_across_the_antimeridian(points):
+    index = VolcanoIndex(latitudes=points[0], longitudes=points[1])
+
+    found = index.within_bbox(south=-15, west=179, north=15, east=-179)
+    assert {0, 1} <= set(found.tolist())
+    assert 2 in index.within_bbox(south=51, west=-180.5, north=53, east=-179)
+
+
+@pytest.mark.parametrize('latitude, longitude, radius_km', [
+    (0, 0, 500),
+    (0, 179.9, 300),
+    (-5, -179.9, 1500),
+    (89, 40, 400),
+    (-60, 100, 3000),
+    (20, 30, 25000),
+])
+def test_within_radius_km(points, latitude, longitude, radius_km):
+    index = VolcanoIndex(latitudes=points[0], longitudes=points[1],
+                         cell_size=2.0)
+    distances = _distances(points, latitude, longitude)
+    inside = np.flatnonzero(distances <= radius_km)
+    expected = inside[np.lexsort((inside, distances[inside]))]
+
+    positions, found = index.within_radius_km(
+        latitude=latitude, longitude=longitude, radius_km=radius_km)
+
+    assert positions.tolist() == expected.tolist()
+    assert np.allclose(found, distances[expected])
+
+
+def test_radius_across_the_antimeridian(points):
+    index = VolcanoIndex(latitudes=points[0], longitudes=points[1])
+
+    positions, distances = index.within_radius_km(
+        latitude=0, longitude=180, radius_km=1600)
+
+    assert {0, 1} <= set(positions.tolist())
+    assert np.all(np.diff(distances) >= 0)
+
+
+@pytest.mark.parametrize('latitude, longitude, k', [
+    (0, 0, 1),
+    (10, 179.9, 5),
+    (-10, -180, 2),
+    (-89, 0, 20),
+    (45, 45, 2999),
+])
+def test_nearest_k(points, latitude, longitude, k):
+    index = VolcanoIndex(latitudes=points[0], longitudes=points[1])
+    distances = _distances(points, latitude, longitude)
+    located = np.flatnonzero(~np.isnan(distances))
+    expected = located[np.lexsort((located, distances[located]))][:k]
+
+    positions, found = index.nearest_k(latitude=latitude, longitude=longitude,
+                                       k=k)
+
+    assert positions.tolist() == expected.tolist()
+    assert np.allclose(found, distances[expected])
+
+
+def test_nearest_k_across_the_antimeridian():
+    index = VolcanoIndex(latitudes=[0.5, -0.5, 0.0, 0.0],
+                         longitudes=[179.8, -179.9, 175.0, -176.0])
+
+    positions, distances = index.nearest_k(latitude=0, longitude=180, k=3)
+
+    assert positions.tolist() == [1, 0, 3]
+    assert np.all(np.diff(distances) >= 0)
+
+
+def test_points_without_coordinates_are_left_out(points, tmp_path):
+    index = VolcanoIndex(latitudes=points[0], longitudes=points[1])
+    file = str(tmp_path / 'index.npz')
+    index.save(file=file, key='abc')
+    loaded = VolcanoIndex.load(file=file)
+
+    assert len(index) == len(loaded) == 2999
+    assert loaded.key == 'abc'
+    assert 3 not in index.nearest_k(latitude=0, longitude=0, k=3000)[0]
+    assert loaded.within_bbox(south=-20, west=170, north=20,
+                              east=-170).tolist() == \
+        index.within_bbox(south=-20, west=170, north=20, east=-170).tolist()
@@ -0,0 +1,18 @@
+import os
+import sys
+import webmap
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+
+
+def test_every_generator_module_is_hashed():
+    here = os.path.dirname(os.path.abspath(webmap.__file__))
+    hashed = {os.path.abspath(path) for path in webmap._generator_files}
+
+    for name, module in list(sys.modules.items()):
+        path = os.path.abspath(getattr(module, '__file__', None) or '')
+        if os.path.dirname(path) == here and '.' not in name and \
+                not name.startswith(('test_', 'conftest')):
+            assert path in hashed, name
@@ -0,0 +1,479 @@
+import os
+import json
+import math
+import shutil
+import numpy as np
+import geo_simplify
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck
+Techniques: Web Mercator z/x/y tiling; Sutherland-Hodgman polygon
+clipping"""
+_max_latitude = 85.0511287798
+_tile_size = 256
+_metadata_file = 'metadata.json'
+formats = ('geojson', 'compact')
+
+# Tile pyramid layout, as written by write_point_tiles and
+# write_polygon_tiles:
+#
+#     metadata.json   format, zoom range, and extent of the tiles
+#     {z}/{x}/{y}.json
+#                     one tile, for every tile of zoom levels 0 through
+#                     max_zoom that holds any data; empty tiles are not
+#                     written
+#
+# Tiles are numbered as by OpenStreetMap and Leaflet: at zoom z, the Web
+# Mercator square of the world is divided into 2^z by 2^z tiles, with
+# x increasing eastward from the antimeridian and y increasing southward
+# from latitude 85.0511.
+#
+# A 'geojson' tile is a GeoJSON FeatureCollection in longitude and
+# latitude. A 'compact' tile holds integer coordinates local to its tile,
+# quantized to extent steps across the tile, with x increasing eastward
+# and y southward:
+#
+#     points          {"extent": E, "columns": [...],
+#                      "rows": [[x, y, value, ...], ...]}
+#     polygons        {"extent": E, "features": [{"properties": {...},
+#                      "polygons": [[ring, ...], ...]}, ...]}
+#
+# where each ring is a flat list [x0, y0, dx1, dy1, ...] of its first
+# point followed by the differences between consecutive points.
+
+
+class TileFormatError(Exception):
+    pass
+
+
+def _project(lons, lats):
+    """Project longitudes and latitudes onto the unit Web Mercator
+    square, and return the x and y coordinates.
+
+    :param lons: numpy.ndarray
+    :param lats: numpy.ndarray
+    :return: tuple
+    """
+    lats = np.radians(np.clip(np.asarray(lats, dtype='float64'),
+                              -_max_latitude, _max_latitude))
+    xs = (np.asarray(lons, dtype='float64') + 180.0) / 360.0
+    ys = (1.0 - np.log(np.tan(lats) + 1.0 / np.cos(lats)) / math.pi) / 2.0
+
+    return np.clip(xs, 0.0, 1.0), ys
+
+
+def _unproject(xs, ys):
+    """Return the longitudes and latitudes of points on the unit Web
+    Mercator square (see _project).
+
+    :param xs: numpy.ndarray
+    :param ys: numpy.ndarray
+    :return: tuple
+    """
+    lons = np.asarray(xs, dtype='float64') * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(
+        math.pi * (1.0 - 2.0 * np.asarray(ys, dtype='float64')))))
+
+    return lons, lats
+
+
+def _clip_ring(ring, axis, low, high):
+    """Clip a ring to the band between low and high along one axis
+    (Sutherland-Hodgman), and return the clipped ring.
+
+    :param ring: list of tuples
+    :param axis: int
+    :param low: float
+    :param high: float
+    :return: list of tuples
+    """
+    for bound, sign in ((low, 1.0), (high, -1.0)):
+        if not ring:
+            break
+
+        clipped = []
+        previous = ring[-1]
+        previous_inside = (previous[axis] - bound) * sign >= 0
+
+        for point in ring:
+            inside = (point[axis] - bound) * sign >= 0
+            if inside != previous_inside:
+                t = (bound - previous[axis]) / (point[axis] - previous[axis])
+                other = previous[1 - axis] + \
+                    t * (point[1 - axis] - previous[1 - axis])
+                clipped.append((bound, other) if axis == 0 else (other, bound))
+            if inside:
+                clipped.append(point)
+            previous, previous_inside = point, inside
+
+        ring = clipped
+
+    return ring
+
+
+def _ring_area(ring):
+    """Return the signed area of a ring (shoelace formula).
+
+    :param ring: list of tuples
+    :return: float
+    """
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1)
+               in zip(ring, ring[1:] + ring[:1])) / 2.0
+
+
+def _clip_polygon(polygon, axis, low, high):
+    """Clip the rings of a polygon to the band between low and high
+    along one axis. Return the clipped polygon, or None when nothing of
+    its outer ring is left within the band.
+
+    :param polygon: list of rings
+    :param axis: int
+    :param low: float
+    :param high: float
+    :return: list of rings
+    """
+    rings = []
+
+    for ring in polygon:
+        values = [point[axis] for point in ring]
+        if min(values) < low or max(values) > high:
+            ring = _clip_ring(ring=ring, axis=axis, low=low, high=high)
+        if len(ring) >= 3 and _ring_area(ring=ring) != 0:
+            rings.append(ring)
+        elif not rings:
+            return None
+
+    return rings
+
+
+def _split_polygon(polygon, zoom):
+    """Clip a polygon, in unit Web Mercator coordinates, to each of the
+    tiles of zoom that it overlaps. Yield the (x, y) of each tile and
+    the part of the polygon within it.
+
+    The polygon is clipped to each column of tiles first, and each of
+    those strips to the rows of the column, so that every point is
+    clipped against few tiles.
+
+    :param polygon: list of rings
+    :param zoom: int
+    :return: generator of tuples
+    """
+    tiles = 2 ** zoom
+
+    def tile_range(rings, axis):
+        values = [point[axis] for point in rings[0]]
+        return (max(int(math.floor(min(values) * tiles)), 0),
+                min(int(math.floor(max(values) * tiles)), tiles - 1))
+
+    first_column, last_column = tile_range(rings=polygon, axis=0)
+
+    for column in range(first_column, last_column + 1):
+        strip = _clip_polygon(polygon=polygon, axis=0, low=column / tiles,
+                              high=(column + 1) / tiles)
+        if strip is None:
+            continue
+
+        first_row, last_row = tile_range(rings=strip, axis=1)
+
+        for row in range(first_row, last_row + 1):
+            part = _clip_polygon(polygon=strip, axis=1, low=row / tiles,
+                                 high=(row + 1) / tiles)
+            if part is not None:
+                yield (column, row), part
+
+
+def _decimals(zoom):
+    """Return the number of decimal places that resolve a tenth of a
+    pixel or better at zoom.
+
+    :param zoom: int
+    :return: int
+    """
+    pixel_degrees = 360.0 / (_tile_size * 2 ** zoom)
+
+    return max(int(math.ceil(-math.log10(pixel_degrees))), 0) + 1
+
+
+def _quantize_ring(ring, zoom, column, row, extent):
+    """Quantize a ring to integer coordinates local to its tile, and
+    return it as a flat list of its first point and the differences
+    between consecutive points, or None when fewer than 3 points are
+    left.
+
+    :param ring: list of tuples
+    :param zoom: int
+    :param column: int
+    :param row: int
+    :param extent: int
+    :return: list
+    """
+    tiles = 2 ** zoom
+    points = np.rint((np.asarray(ring) * tiles - (column, row)) *
+                     extent).astype('int64')
+    moved = np.any(points != np.roll(points, 1, axis=0), axis=1)
+    points = points[moved]
+
+    if len(points) < 3:
+        return None
+
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype='int64'))
+
+    return deltas.ravel().tolist()
+
+
+def _encode_polygon_tile(parts, zoom, column, row, tile_format, extent):
+    """Encode the features of one tile of polygons, and return the tile.
+
+    :param parts: list of tuples of properties and polygons
+    :param zoom: int
+    :param column: int
+    :param row: int
+    :param tile_format: str
+    :param extent: int
+    :return: dict
+    """
+    if tile_format == 'compact':
+        features = []
+        for properties, polygons in parts:
+            quantized = []
+            for polygon in polygons:
+                rings = [_quantize_ring(ring=ring, zoom=zoom, column=column,
+                                        row=row, extent=extent)
+                         for ring in polygon]
+                if rings[0] is not None:
+                    quantized.append([ring for ring in rings
+                                      if ring is not None])
+            if quantized:
+                features.append({'properties': properties,
+                                 'polygons': quantized})
+
+        return {'extent': extent, 'features': features} if features else None
+
+    decimals = _decimals(zoom=zoom)
+    features = []
+
+    for properties, polygons in parts:
+        coordinates = []
+        for polygon in polygons:
+            rings = []
+            for ring in polygon:
+                points = np.asarray(ring + ring[:1])
+                lons, lats = _unproject(xs=points[:, 0], ys=points[:, 1])
+                rings.append(np.round(np.column_stack((lons, lats)),
+                                      decimals).tolist())
+            coordinates.append(rings)
+        features.append({'type': 'Feature', 'properties': properties,
+                         'geometry': {'type': 'MultiPolygon',
+                                      'coordinates': coordinates}})
+
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def _write_tile(directory, zoom, column, row, tile):
+    """Write one tile to its z/x/y file under directory.
+
+    :param directory: str
+    :param zoom: int
+    :param column: int
+    :param row: int
+    :param tile: dict
+    :return: None
+    """
+    tile_dir = f'{directory}/{zoom}/{column}'
+    os.makedirs(tile_dir, exist_ok=True)
+
+    with open(f'{tile_dir}/{row}.json', 'w', encoding='utf-8') as outfile:
+        outfile.write(json.dumps(tile, separators=(',', ':')))
+
+
+def _start_pyramid(directory):
+    """Create an empty staging directory for a pyramid that is to
+    replace directory, and return its path.
+
+    :param directory: str
+    :return: str
+    """
+    staging = f'{directory}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    return staging
+
+
+def _finish_pyramid(staging, directory, metadata):
+    """Write the metadata of a staged pyramid, and move it into place
+    of directory, replacing any earlier pyramid there.
+
+    :param staging: str
+    :param directory: str
+    :param metadata: dict
+    :return: None
+    """
+    with open(f'{staging}/{_metadata_file}', 'w', encoding='utf-8') as outfile:
+        json.dump(metadata, outfile, indent=2)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+
+
+def _check_format(tile_format):
+    """Raise TileFormatError for a tile_format that is not supported.
+
+    :param tile_format: str
+    :return: None
+    """
+    if tile_format not in formats:
+        raise TileFormatError(f'unknown tile format: {tile_format}')
+
+
+def write_point_tiles(directory, lons, lats, rows, columns, max_zoom=6,
+                      tile_format='geojson', cell_pixels=16, extent=65536):
+    """Write a set of points, with their rows of values, into a tile
+    pyramid in directory, replacing any pyramid already there.
+
+    Below max_zoom, the points are thinned: of all the points that fall
+    within the same cell_pixels square of a zoom level, only the first
+    one given is kept, so that the caller decides which points take
+    precedence by their order. At max_zoom, every point is kept. Points
+    without coordinates are left out. The default extent keeps compact
+    points to within about 10m at zoom level 6.
+
+    Return the number of tiles written, by zoom level.
+
+    :param directory: str
+    :param lons: list of float
+    :param lats: list of float
+    :param rows: list of lists
+    :param columns: list
+    :param max_zoom: int
+    :param tile_format: str
+    :param cell_pixels: int
+    :param extent: int
+    :return: dict
+    """
+    _check_format(tile_format=tile_format)
+
+    lons = np.asarray(lons, dtype='float64')
+    lats = np.asarray(lats, dtype='float64')
+    located = np.flatnonzero(~(np.isnan(lons) | np.isnan(lats)))
+    xs, ys = _project(lons=lons[located], lats=lats[located])
+    staging = _start_pyramid(directory=directory)
+    counts = dict()
+
+    for zoom in range(max_zoom + 1):
+        pixels = np.column_stack((xs, ys)) * (_tile_size * 2 ** zoom)
+        kept = np.arange(len(located))
+
+        if zoom < max_zoom:
+            cells = np.floor(pixels / cell_pixels).astype('int64')
+            _, first = np.unique(cells, axis=0, return_index=True)
+            kept = np.sort(first)
+
+        tiles = dict()
+        tile_coords = np.floor(pixels[kept] / _tile_size).astype('int64')
+        tile_coords = np.minimum(tile_coords, 2 ** zoom - 1)
+        for i, (column, row) in zip(kept.tolist(), tile_coords.tolist()):
+            tiles.setdefault((column, row), []).append(i)
+
+        for (column, row), members in tiles.items():
+            if tile_format == 'compact':
+                local = np.rint((pixels[members] / _tile_size -
+                                 (column, row)) * extent).astype('int64')
+                tile = {'extent': extent, 'columns': list(columns),
+                        'rows': [point + list(rows[located[i]]) for point, i
+                                 in zip(local.tolist(), members)]}
+            else:
+                tile = {'type': 'FeatureCollection', 'features': [
+                    {'type': 'Feature',
+                     'properties': dict(zip(columns, rows[located[i]])),
+                     'geometry': {'type': 'Point', 'coordinates': [
+                         float(lons[located[i]]), float(lats[located[i]])]}}
+                    for i in members]}
+            _write_tile(directory=staging, zoom=zoom, column=column, row=row,
+                        tile=tile)
+
+        counts[zoom] = len(tiles)
+
+    _finish_pyramid(staging=staging, directory=directory, metadata={
+        'format': tile_format, 'geometry': 'points', 'minzoom': 0,
+        'maxzoom': max_zoom, 'extent': extent, 'columns': list(columns),
+        'tiles': '{z}/{x}/{y}.json'})
+
+    return counts
+
+
+def write_polygon_tiles(directory, collection, max_zoom=6,
+                        tile_format='geojson', pixel_tolerance=1.0,
+                        quantization=100000, extent=4096):
+    """Write the polygons of a GeoJSON FeatureCollection into a tile
+    pyramid in directory, replacing any pyramid already there.
+
+    The polygons are quantized into a topology once (see
+    geo_simplify.build_topology), and simplified anew for each zoom
+    level, to pixel_tolerance pixels of that level, so that shared
+    borders stay seamless at every level. Each polygon is then clipped
+    to the tiles it overlaps, and every feature is written to each of
+    those tiles with its part of the polygons.
+
+    Return the number of tiles written, by zoom level.
+
+    :param directory: str
+    :param collection: dict
+    :param max_zoom: int
+    :param tile_format: str
+    :param pixel_tolerance: float
+    :param quantization: int
+    :param extent: int
+    :return: dict
+    """
+    _check_format(tile_format=tile_format)
+
+    topology = geo_simplify.build_topology(collection=collection,
+                                           quantization=quantization)
+    staging = _start_pyramid(directory=directory)
+    counts = dict()
+
+    for zoom in range(max_zoom + 1):
+        simplified = dict(topology, arcs=list(topology['arcs']))
+        geo_simplify.simplify_topology(
+            topology=simplified,
+            tolerance=pixel_tolerance * 360.0 / (_tile_size * 2 ** zoom))
+        features = geo_simplify.to_geojson(topology=simplified,
+                                           collection=collection,
+                                           decimals=15)['features']
+        tiles = dict()
+
+        for index, feature in enumerate(features):
+            for polygon in feature['geometry']['coordinates']:
+                projected = []
+                for ring in polygon:
+                    points = np.asarray(ring[:-1], dtype='float64')
+                    xs, ys = _project(lons=points[:, 0], lats=points[:, 1])
+                    projected.append(list(zip(xs.tolist(), ys.tolist())))
+                for tile, part in _split_polygon(polygon=projected,
+                                                 zoom=zoom):
+                    tiles.setdefault(tile, dict()).setdefault(
+                        index, []).append(part)
+
+        written = 0
+        for (column, row), parts in tiles.items():
+            tile = _encode_polygon_tile(
+                parts=[(features[index]['properties'], polygons)
+                       for index, polygons in sorted(parts.items())],
+                zoom=zoom, column=column, row=row, tile_format=tile_format,
+                extent=extent)
+            if tile is not None:
+                _write_tile(directory=staging, zoom=zoom, column=column,
+                            row=row, tile=tile)
+                written += 1
+
+        counts[zoom] = written
+
+    _finish_pyramid(staging=staging, directory=directory, metadata={
+        'format': tile_format, 'geometry': 'polygons', 'minzoom': 0,
+        'maxzoom': max_zoom, 'extent': extent,
+        'tiles': '{z}/{x}/{y}.json'})
+
+    return counts
@@ -0,0 +1,243 @@
+import math
+import numpy as np
+
+_file_meta = """\
+Project Repo: https://github.com/zero2cx/tpmc.git
+Author: David Schenck"""
+_earth_radius_km = 6371.0088
+
+"""Grid index layout:
+
+    latitudes       latitude of every point, by position
+    longitudes      longitude of every point, by position, in [-180, 180)
+    order           positions of the points, sorted by grid cell
+    offsets         position of every cell's points within order, plus
+                    the end
+
+The grid cells are cell_size degrees square, numbered row by row from
+(-90, -180). The cells of one grid row are numbered consecutively, so
+any run of cells along a row is a single slice of order. Points without
+coordinates are left out of order, and are never returned."""
+
+
+def _normalize_longitude(longitude):
+    return (np.asarray(longitude, dtype='float64') + 180.0) % 360.0 - 180.0
+
+
+def _haversine_km(latitude, longitude, latitudes, longitudes):
+    """Return the great-circle distance, in km, from one point to each of
+    a number of points.
+
+    :param latitude: float
+    :param longitude: float
+    :param latitudes: numpy.ndarray
+    :param longitudes: numpy.ndarray
+    :return: numpy.ndarray
+    """
+    phi, lam = math.radians(latitude), math.radians(longitude)
+    phis, lams = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((phis - phi) / 2) ** 2 + \
+        math.cos(phi) * np.cos(phis) * np.sin((lams - lam) / 2) ** 2
+
+    return 2 * _earth_radius_km * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class VolcanoIndex:
+    """Spatial index over a set of points, such as the volcano sites of
+    the GVP dataset.
+
+    The points are filed into a grid of cells, cell_size degrees square,
+    and a query reads only the cells that overlap its bounding box
+    before checking the points found there exactly. Queries therefore
+    take time proportional to the number of cells and points near the
+    query, rather than to the number of points overall.
+
+    Queries return positions: the row numbers of the points as given,
+    so that dataframe.iloc[positions] selects the matching records.
+    """
+    def __init__(self, latitudes, longitudes, cell_size=1.0):
+        self.cell_size = float(cell_size)
+        self.key = None
+        self.latitudes = np.asarray(latitudes, dtype='float64')
+        self.longitudes = _normalize_longitude(longitudes)
+        self._rows = int(math.ceil(180.0 / self.cell_size))
+        self._columns = int(math.ceil(360.0 / self.cell_size))
+
+        located = np.flatnonzero(~(np.isnan(self.latitudes) |
+                                   np.isnan(self.longitudes)))
+        cells = self._row_of(self.latitudes[located]) * self._columns + \
+            self._column_of(self.longitudes[located])
+        ranking = np.argsort(cells, kind='stable')
+        self._order = located[ranking]
+        self._offsets = np.searchsorted(
+            cells[ranking], np.arange(self._rows * self._columns + 1))
+
+    def __len__(self):
+        return len(self._order)
+
+    def _row_of(self, latitudes):
+        rows = np.floor((np.asarray(latitudes) + 90.0) / self.cell_size)
+        return np.clip(rows, 0, self._rows - 1).astype('int64')
+
+    def _column_of(self, longitudes):
+        columns = np.floor((np.asarray(longitudes) + 180.0) / self.cell_size)
+        return np.clip(columns, 0, self._columns - 1).astype('int64')
+
+    def _candidates(self, south, west, north, east):
+        """Return the positions of all points filed in the cells that
+        overlap a bounding box. A box whose west edge lies east of its
+        east edge crosses the antimeridian.
+
+        :param south: float
+        :param west: float
+        :param north: float
+        :param east: float
+        :return: numpy.ndarray
+        """
+        first_row = int(self._row_of(max(south, -90.0)))
+        last_row = int(self._row_of(min(north, 90.0)))
+        west_column = int(self._column_of(west))
+        east_column = int(self._column_of(east))
+
+        if west <= east:
+            spans = [(west_column, east_column)]
+        elif east_column >= west_column:
+            spans = [(0, self._columns - 1)]
+        else:
+            spans = [(west_column, self._columns - 1), (0, east_column)]
+
+        slices = []
+        for row in range(first_row, last_row + 1):
+            for first_column, last_column in spans:
+                first_cell = row * self._columns + first_column
+                last_cell = row * self._columns + last_column
+                slices.append(self._order[self._offsets[first_cell]:
+                                          self._offsets[last_cell + 1]])
+
+        return np.concatenate(slices) if slices else self._order[:0]
+
+    def within_bbox(self, south, west, north, east):
+        """Return the positions of the points within a bounding box, in
+        ascending order. Longitudes are taken modulo 360, and a box whose
+        west edge lies east of its east edge crosses the antimeridian.
+
+        :param south: float
+        :param west: float
+        :param north: float
+        :param east: float
+        :return: numpy.ndarray
+        """
+        if east - west >= 360.0:
+            west, east = -180.0, 180.0
+        else:
+            west, east = (float(_normalize_longitude(west)),
+                          float(_normalize_longitude(east)))
+            if east == -180.0 and west != -180.0:
+                east = 180.0
+
+        positions = self._candidates(south=south, west=west, north=north,
+                                     east=east)
+        latitudes = self.latitudes[positions]
+        longitudes = self.longitudes[positions]
+        inside = (latitudes >= south) & (latitudes <= north)
+
+        if west <= east:
+            inside &= (longitudes >= west) & (longitudes <= east)
+        else:
+            inside &= (longitudes >= west) | (longitudes <= east)
+
+        return np.sort(positions[inside])
+
+    def within_radius_km(self, latitude, longitude, radius_km):
+        """Return the positions of the points within radius_km of a point,
+        and their great-circle distances from it, nearest first.
+
+        :param latitude: float
+        :param longitude: float
+        :param radius_km: float
+        :return: tuple
+        """
+        angle = radius_km / _earth_radius_km
+        south = latitude - math.degrees(angle)
+        north = latitude + math.degrees(angle)
+        spread = math.sin(angle) / max(math.cos(math.radians(latitude)), 1e-12)
+
+        if south <= -90.0 or north >= 90.0 or angle >= math.pi / 2 or \
+                spread >= 1.0:
+            west, east = -180.0, 180.0
+        else:
+            span = math.degrees(math.asin(spread))
+            west = float(_normalize_longitude(longitude - span))
+            east = float(_normalize_longitude(longitude + span))
+
+        positions = self._candidates(south=south, west=west, north=north,
+                                     east=east)
+        distances = _haversine_km(latitude=latitude, longitude=longitude,
+                                  latitudes=self.latitudes[positions],
+                                  longitudes=self.longitudes[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        ranking = np.lexsort((positions, distances))
+
+        return positions[ranking], distances[ranking]
+
+    def nearest_k(self, latitude, longitude, k):
+        """Return the positions of the k points nearest to a point, and
+        their great-circle distances from it, nearest first.
+
+        The search radius starts at one cell and doubles until at least
+        k points lie within it.
+
+        :param latitude: float
+        :param longitude: float
+        :param k: int
+        :return: tuple
+        """
+        radius_km = math.radians(self.cell_size) * _earth_radius_km
+        half_circumference_km = math.pi * _earth_radius_km
+
+        while True:
+            positions, distances = self.within_radius_km(
+                latitude=latitude, longitude=longitude, radius_km=radius_km)
+            if len(positions) >= k or radius_km >= half_circumference_km:
+                return positions[:k], distances[:k]
+            radius_km *= 2
+
+    def save(self, file, key=None):
+        """Save the index to a numpy .npz file.
+
+        The optional key string is saved along with the index, for the
+        caller to check when the index is loaded again.
+
+        :param file: str
+        :param key: str
+        :return: None
+        """
+        with open(file, 'wb') as outfile:
+            np.savez(outfile, cell_size=self.cell_size,
+                     latitudes=self.latitudes, longitudes=self.longitudes,
+                     order=self._order, offsets=self._offsets,
+                     key=np.array('' if key is None else key))
+
+    @classmethod
+    def load(cls, file):
+        """Load an index saved by save(). Its key is set as the key
+        attribute.
+
+        :param file: str
+        :return: VolcanoIndex
+        """
+        index = cls.__new__(cls)
+
+        with np.load(file) as arrays:
+            index.cell_size = float(arrays['cell_size'])
+            index.latitudes = arrays['latitudes']
+            index.longitudes = arrays['longitudes']
+            index._order = arrays['order']
+            index._offsets = arrays['offsets']
+            index.key = str(arrays['key'])
+
+        index._rows = int(math.ceil(180.0 / index.cell_size))
+        index._columns = int(math.ceil(360.0 / index.cell_size))
+
+        return index
@@ -1,10 +1,223 @@
 import os
 import sys
+import json
+import hashlib
 import folium
+import numpy as np
+import pandas as pd
+import geo_simplify
+import tile_pyramid
+import volcano_index
+import excel_xml_handler
 import gvp_volcanoes as gvp
+from folium.map import Layer
+from folium.plugins import FastMarkerCluster
+from jinja2 import Template
+from branca.element import Element, JavascriptLink
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
 
 _path_to_config = '..'
+_elevation_bins = [0, 500, 1000, 1500, 2000, 2500, 3000, 4000]
+_elevation_colors = np.array(['beige', 'lightgray', 'pink', 'orange', 'green',
+                              'blue', 'purple', 'darkred', 'red'])
+_popup_template = """\
+        <iframe frameborder="0" scrolling="no" style="border: 1px solid black"
+          height="{height}" width="{width}" marginheight="0" marginwidth="0"
+          src="{embed_url}?bbox={bbox}&amp;layer={layer_type}"></iframe><br/>
+                <strong style="float: left;">{name} ({elev}m)</strong>
+        <em style="float: right;"><a href="{detail_url}" target="_blank" 
+          rel="noopener noreferrer">Site detail</a></em><br/>"""
+_population_bins = [10000000, 20000000]
+_population_styles = [{'weight': 0, 'fillColor': 'yellow'},
+                      {'weight': 0, 'fillColor': 'orange'},
+                      {'weight': 0, 'fillColor': 'red'}]
+_population_cache = dict()
+_topojson_url = \
+    'https://cdnjs.cloudflare.com/ajax/libs/topojson/1.6.9/topojson.min.js'
+_sidecar_file = 'webmap-volcanoes.js'
+_sidecar_variable = 'gvpVolcanoes'
+_marker_icon_function = """\
+function (color) {
+        return L.divIcon({
+            className: 'volcano-marker', iconSize: [14, 12],
+            html: '<div style="width: 0; height: 0; ' +
+                'border-left: 7px solid transparent; ' +
+                'border-right: 7px solid transparent; ' +
+                'border-bottom: 12px solid ' + color + ';"></div>'});
+    }"""
+_cluster_marker_callback = """\
+(function () {
+    var colors = %(colors)s;
+    var tooltips = %(tooltips)s;
+    var popups = %(popups)s;
+    var markerIcon = %(marker_icon)s;
+    return function (row) {
+        var marker = L.marker([row[0], row[1]],
+                              {icon: markerIcon(colors[row[2]])});
+        marker.options.elevationClass = row[2];
+        marker.bindTooltip(tooltips[row[3]]);
+        marker.bindPopup(popups[row[3]], {maxWidth: 650});
+        return marker;
+    };
+})()"""
+_sidecar_marker_callback = """\
+(function () {
+    var colors = %(colors)s;
+    var template = %(template)s;
+    var markerIcon = %(marker_icon)s;
+    var popup = function (row, elev) {
+        var fields = {
+            name: row[1], elev: elev,
+            detail_url: 'https://volcano.si.edu/volcano.cfm?vn=' + row[0] +
+                '&vtab=GeneralInfo',
+            bbox: [row[4] - %(lon_diff)s, row[3] - %(lat_diff)s,
+                   row[4] + %(lon_diff)s, row[3] + %(lat_diff)s].join('%%2C')};
+        return template.replace(/{(\\w+)}/g, function (match, field) {
+            return fields[field];
+        });
+    };
+    return function (row) {
+        var elev = row[2] === null ? 'no-data' : row[2];
+        var marker = L.marker([row[3], row[4]],
+                              {icon: markerIcon(colors[row[5]])});
+        marker.options.elevationClass = row[5];
+        marker.bindTooltip(row[1] + ' (' + elev + 'm)');
+        marker.bindPopup(function () { return popup(row, elev); },
+                         {maxWidth: 650});
+        return marker;
+    };
+})()"""
+_cluster_icon_function = """\
+function (cluster) {
+    var colors = %(colors)s;
+    var markers = cluster.getAllChildMarkers();
+    var counts = colors.map(function () { return 0; });
+    for (var i = 0; i < markers.length; i++) {
+        counts[markers[i].options.elevationClass] += 1;
+    }
+    var stops = [];
+    var start = 0;
+    for (var c = 0; c < colors.length; c++) {
+        if (counts[c]) {
+            var end = start + 100 * counts[c] / markers.length;
+            stops.push(colors[c] + ' ' + start + '%% ' + end + '%%');
+            start = end;
+        }
+    }
+    var size = 30 + Math.min(Math.round(4 * Math.log(markers.length)), 30);
+    return L.divIcon({
+        className: 'volcano-cluster', iconSize: [size, size],
+        html: '<div style="width: 100%%; height: 100%%; border-radius: 50%%; ' +
+            'border: 1px solid white; box-sizing: border-box; ' +
+            'display: flex; align-items: center; justify-content: center; ' +
+            'background: conic-gradient(' + stops.join(', ') + ');">' +
+            '<span style="background: white; border-radius: 8px; ' +
+            'padding: 0 4px; font: bold 11px sans-serif;">' +
+            markers.length + '</span></div>'});
+}"""
+_tile_dir = 'webmap-tiles'
+_build_dir = 'webmap-build'
+_build_manifest = 'manifest.json'
+_build_schema_version = 1
+_build_stages = ['population', 'volcanoes', 'page']
+_generator_files = [__file__, geo_simplify.__file__, tile_pyramid.__file__,
+                    volcano_index.__file__, excel_xml_handler.__file__,
+                    gvp.__file__]
+_generator_hashes = dict()
+_tiled_layer_script = """\
+(function () {
+    var url = %(url)s;
+    var draw = %(draw)s;
+    var group = L.featureGroup();
+    var tiles = {};
+    var layers = {};
+    var key = function (coords) {
+        return coords.z + '/' + coords.x + '/' + coords.y;
+    };
+    var TileGrid = L.GridLayer.extend({
+        createTile: function (coords, done) {
+            var tile = document.createElement('div');
+            var tileKey = key(coords);
+            tiles[tileKey] = tile;
+            fetch(L.Util.template(url, coords)).then(function (response) {
+                return response.ok ? response.json() : null;
+            }).then(function (data) {
+                if (data && tiles[tileKey] === tile) {
+                    layers[tileKey] = draw(data, coords);
+                    group.addLayer(layers[tileKey]);
+                }
+                done(null, tile);
+            }, function (error) {
+                done(error, tile);
+            });
+            return tile;
+        }
+    });
+    var grid = new TileGrid({maxNativeZoom: %(max_zoom)s, noWrap: true});
+    grid.on('tileunload', function (event) {
+        var tileKey = key(event.coords);
+        delete tiles[tileKey];
+        if (layers[tileKey]) {
+            group.removeLayer(layers[tileKey]);
+            delete layers[tileKey];
+        }
+    });
+    return L.layerGroup([grid, group]);
+})()"""
+_tiled_volcano_draw = """\
+(function () {
+    var marker = %(callback)s;
+    return function (data, coords) {
+        var layer = L.featureGroup();
+        if (data.type === 'FeatureCollection') {
+            data.features.forEach(function (feature) {
+                var p = feature.properties;
+                var point = feature.geometry.coordinates;
+                marker([p.number, p.name, p.elevation, point[1], point[0],
+                        p.elevation_class]).addTo(layer);
+            });
+        } else {
+            data.rows.forEach(function (row) {
+                var latlng = L.CRS.EPSG3857.pointToLatLng(L.point(
+                    (coords.x + row[0] / data.extent) * 256,
+                    (coords.y + row[1] / data.extent) * 256), coords.z);
+                marker([row[2], row[3], row[4], latlng.lat, latlng.lng,
+                        row[5]]).addTo(layer);
+            });
+        }
+        return layer;
+    };
+})()"""
+_tiled_population_draw = """\
+(function () {
+    var styles = %(styles)s;
+    var style = function (feature) {
+        return styles[feature.properties.pop_class];
+    };
+    return function (data, coords) {
+        if (data.type === 'FeatureCollection') {
+            return L.geoJson(data, {style: style});
+        }
+        var latlng = function (x, y) {
+            return L.CRS.EPSG3857.pointToLatLng(L.point(
+                (coords.x + x / data.extent) * 256,
+                (coords.y + y / data.extent) * 256), coords.z);
+        };
+        return L.featureGroup(data.features.map(function (feature) {
+            return L.polygon(feature.polygons.map(function (polygon) {
+                return polygon.map(function (ring) {
+                    var latlngs = [];
+                    for (var i = 0, x = 0, y = 0; i < ring.length; i += 2) {
+                        x += ring[i];
+                        y += ring[i + 1];
+                        latlngs.push(latlng(x, y));
+                    }
+                    return latlngs;
+                });
+            }), style(feature));
+        }));
+    };
+})()"""
 _file_meta = """\
 Project Repo: https://github.com/zero2cx/tpmc.git
 Author: David Schenck
@@ -25,11 +238,55 @@ Detail
 
   - Population by Country (2005 data), assign a color code to
     each country determined by comparison with three population
-    thresholds.
+    thresholds. Each country is classified once, and the page
+    holds one shared style per class rather than a style per
+    country. Within one process, such as a long-running service,
+    the classified countries are reused by every map generated
+    until world.json is modified.
 
   - Volcanoes of the World (GVP data), place map markers at all
     sites around the world that show or have shown volcanic
-    activity. GVP refers to the Global Volcanism Program."""
+    activity. GVP refers to the Global Volcanism Program.
+
+  With the --cluster option, nearby volcano markers are grouped
+  into clusters in the browser, drawn as pie charts of the
+  elevation classes of their volcanoes. The markers are then
+  written to the page as one compact data array and created by
+  the browser, so the page stays light for large datasets.
+
+  With the --sidecar option, the volcano data is saved once, as
+  compact json, to a sidecar script (webmap-volcanoes.js) next to
+  the page, rather than into the page. Each popup is filled in
+  from one shared template when it is opened.
+
+  With the --simplify option, the country borders are simplified
+  (Douglas-Peucker) to the given tolerance, and their coordinates
+  are quantized, before they are embedded. Shared borders are
+  simplified once, so neighbouring countries stay seamless. With
+  the --topojson option, the borders are embedded as TopoJSON,
+  which stores each shared border once. Simplified borders are
+  cached next to world.json, by its hash and the options used.
+
+  With the --tiles option, both layers are exported as tile
+  pyramids (webmap-tiles, next to the page), and the page holds
+  no data of its own: it fetches only the z/x/y tiles in view.
+  The country borders are simplified for each zoom level, and
+  below the highest zoom level (--max-zoom) the volcanoes are
+  thinned to the highest of those that lie close together. The
+  tiles are written as GeoJSON, or, with --tile-format compact,
+  as integer coordinates local to their tile. The page must be
+  served over http along with its tiles, for example by running
+  python -m http.server in the save directory.
+
+  The page is built incrementally. A build manifest, kept in
+  webmap-build next to the page, records a content hash of each
+  input (world.json, the GVP asset files, and the options used),
+  and of each layer fragment and file written. When nothing has
+  changed, the page is left as it is, and nothing is loaded. When
+  something has, only the layers whose inputs changed are
+  generated again; the others are reused, as rendered, from the
+  build cache. With the --rebuild option, every layer is
+  generated again."""
 __doc__ = f"""\
 {_description}
 {_epilog}"""
@@ -53,85 +310,77 @@ def _load_from_config(path):
         sys.path = sys.path[1:]
 
 
-def _generate_color_string(elevation):
-    """Determine appropriate color-string based on elevation, and return it.
+def _generate_color_strings(elevations):
+    """Determine appropriate color-strings based on elevations, and return
+    them.
 
-    :param elevation: str
-    :return: str
+    The elevations are classified all at once (see _classify_elevations).
+
+    :param elevations: pandas.Series
+    :return: numpy.ndarray
     """
     """List of valid color strings for folium markers:
     red, darkred, lightred, orange, beige, green, darkgreen, lightgreen,
     blue, darkblue, lightblue, cadetblue, purple, darkpurple, pink,
     white, gray, lightgray, black"""
-    try:
-        elevation = int(elevation)
-    except ValueError:
-        elevation = 0
-
-    if elevation < 0:
-        return 'beige'
+    return _elevation_colors[_classify_elevations(elevations=elevations)]
 
-    elif 0 <= elevation < 500:
-        return 'lightgray'
 
-    elif 500 <= elevation < 1000:
-        return 'pink'
+def _classify_elevations(elevations):
+    """Determine the elevation class of each of elevations, by binning
+    them against the class boundaries, and return the classes.
 
-    elif 1000 <= elevation < 1500:
-        return 'orange'
+    A missing elevation is treated as sea level.
 
-    elif 1500 <= elevation < 2000:
-        return 'green'
-
-    elif 2000 <= elevation < 2500:
-        return 'blue'
-
-    elif 2500 <= elevation < 3000:
-        return 'purple'
+    :param elevations: pandas.Series
+    :return: numpy.ndarray
+    """
+    elevations = pd.to_numeric(elevations, errors='coerce').astype(float)
 
-    elif 3000 <= elevation < 4000:
-        return 'darkred'
+    return np.digitize(elevations.fillna(0).values, bins=_elevation_bins)
 
-    else:
-        return 'red'
 
+def _generate_popups(names, elevs, detail_urls, bboxes, height, width,
+                     embed_url, layer_type):
+    """Generate html iframes, add captions, and return them.
 
-def _generate_popup(name, elev, detail_url, height, width,
-                    embed_url, bbox, layer_type):
-    """Generate html iframe, add a caption, and return it.
+    The fields that every popup shares are filled into the popup
+    template once; the per-marker fields are then filled in one pass
+    over their columns.
 
-    :param name: str
-    :param elev: str
-    :param detail_url: str
+    :param names: list
+    :param elevs: list
+    :param detail_urls: list
+    :param bboxes: list
     :param height: str
     :param width: str
     :param embed_url: str
-    :param bbox: str
     :param layer_type: str
-    :return: str
+    :return: list
     """
-    popup_caption = f"""\
-        <strong style="float: left;">{name} ({elev}m)</strong>
-        <em style="float: right;"><a href="{detail_url}" target="_blank" 
-          rel="noopener noreferrer">Site detail</a></em><br/>"""
-    popup = f"""\
-        <iframe frameborder="0" scrolling="no" style="border: 1px solid black"
-          height="{height}" width="{width}" marginheight="0" marginwidth="0"
-          src="{embed_url}?bbox={bbox}&amp;layer={layer_type}"></iframe><br/>
-        {popup_caption}"""
+    template = _popup_template.format(
+        height=height, width=width, embed_url=embed_url,
+        layer_type=layer_type, name='{0}', elev='{1}', detail_url='{2}',
+        bbox='{3}')
 
-    return popup
+    return list(map(template.format, names, elevs, detail_urls, bboxes))
 
 
-def _generate_volcano_layer(nums, names, elevs, lats, lons):
-    """Generate "Volcanoes of the World" FeatureGroup layer, and return it.
+def _generate_marker_attributes(dataframe):
+    """Generate the attributes of every volcano marker, and return them.
 
-    :param nums: list
-    :param names: list
-    :param elevs: list
-    :param lats: list
-    :param lons: list
-    :return: pandas.FeatureGroup
+    Every attribute is generated column-wise, for all of the volcanoes
+    at once: the fill colors by binning the elevations, the bbox
+    coordinates by array arithmetic, and each of the strings by one
+    formatting pass over its columns. A missing elevation is captioned
+    as 'no-data', and the float32 coordinates are rounded to 4 decimal
+    places (about 10m), within their precision.
+
+    Return the latitudes, longitudes, fill colors, tooltips, and popups
+    of the markers, as a tuple of lists.
+
+    :param dataframe: pandas.DataFrame
+    :return: tuple
     """
     embed_url = 'https://www.openstreetmap.org/export/embed.html'
     height = '400'
@@ -139,20 +388,46 @@ def _generate_volcano_layer(nums, names, elevs, lats, lons):
     layer_type = 'cyclemap'
     lat_diff = 0.088
     lon_diff = 0.160
-    fgv = folium.FeatureGroup(name="Volcanoes of the World (via GVP)")
 
-    for num, name, elev, lat, lon in zip(nums, names, elevs, lats, lons):
-        lat = float(lat)
-        lon = float(lon)
-        fill_color = _generate_color_string(elevation=elev)
-        tooltip = f'{name} ({elev}m)'
+    nums = dataframe["Volcano Number"].tolist()
+    names = dataframe["Volcano Name"].tolist()
+    elevations = dataframe["Elevation (m)"]
+    elevs = elevations.fillna(0).astype('int32').astype(object).where(
+        elevations.notna(), 'no-data').tolist()
+    lats = dataframe["Latitude"].to_numpy(dtype=float).round(4)
+    lons = dataframe["Longitude"].to_numpy(dtype=float).round(4)
 
-        bbox = f'{lon-lon_diff}%2C{lat-lat_diff}%2C{lon+lon_diff}%2C{lat+lat_diff}'
-        detail_url = f'https://volcano.si.edu/volcano.cfm?vn={num}&vtab=GeneralInfo'
-        popup = _generate_popup(name=name, elev=elev, detail_url=detail_url,
-                                height=height, width=width, embed_url=embed_url,
-                                bbox=bbox, layer_type=layer_type)
+    fill_colors = _generate_color_strings(
+        elevations=dataframe["Elevation (m)"]).tolist()
+    tooltips = list(map('{} ({}m)'.format, names, elevs))
+    bboxes = list(map('{}%2C{}%2C{}%2C{}'.format, (lons - lon_diff).tolist(),
+                      (lats - lat_diff).tolist(), (lons + lon_diff).tolist(),
+                      (lats + lat_diff).tolist()))
+    detail_urls = list(map(
+        'https://volcano.si.edu/volcano.cfm?vn={}&vtab=GeneralInfo'.format,
+        nums))
+    popups = _generate_popups(names=names, elevs=elevs,
+                              detail_urls=detail_urls, bboxes=bboxes,
+                              height=height, width=width, embed_url=embed_url,
+                              layer_type=layer_type)
+
+    return lats.tolist(), lons.tolist(), fill_colors, tooltips, popups
+
+
+def _generate_volcano_layer(lats, lons, fill_colors, tooltips, popups):
+    """Generate "Volcanoes of the World" FeatureGroup layer, and return it.
+
+    :param lats: list of float
+    :param lons: list of float
+    :param fill_colors: list
+    :param tooltips: list
+    :param popups: list
+    :return: folium.FeatureGroup
+    """
+    fgv = folium.FeatureGroup(name="Volcanoes of the World (via GVP)")
 
+    for lat, lon, fill_color, tooltip, popup in zip(lats, lons, fill_colors,
+                                                    tooltips, popups):
         fgv.add_child(child=folium.RegularPolygonMarker(
             location=[lat, lon], color='white', radius=10, weight=1,
             number_of_sides=3, rotation=30, fill_opacity=0.7,
@@ -161,71 +436,726 @@ def _generate_volcano_layer(nums, names, elevs, lats, lons):
     return fgv
 
 
-def _parse_volcano_data(dataframe):
-    """Parse columns of data from dataframe.
+class _VolcanoMarkers(FastMarkerCluster):
+    """FastMarkerCluster that also applies an icon_create_function to its
+    cluster icons, or, without clustering, adds its markers to a plain
+    feature group.
+
+    The data may be given as a javascript expression rather than a
+    list, such as a variable defined by a sidecar script; the sidecar
+    attribute then holds the data for that script (see write_webmap).
+    """
+    _template = Template(u"""
+            {% macro script(this, kwargs) %}
+
+            var {{ this.get_name() }} = (function(){
+                {{this._callback}}
+
+                var data = {{ this._data }};
+                {%- if this.cluster %}
+                var cluster = L.markerClusterGroup({{ this.options }});
+                cluster.options.iconCreateFunction =
+                    {{ this.icon_create_function.strip() }};
+                {%- else %}
+                var cluster = L.featureGroup();
+                {%- endif %}
+
+                for (var i = 0; i < data.length; i++) {
+                    var row = data[i];
+                    var marker = callback(row);
+                    marker.addTo(cluster);
+                }
 
-    Return selected column data as a tuple of lists.
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+            {% endmacro %}""")
+
+    def __init__(self, data, callback, icon_create_function=None,
+                 cluster=True, sidecar=None, name=None):
+        super(_VolcanoMarkers, self).__init__(
+            data=[] if isinstance(data, str) else data, callback=callback,
+            name=name)
+        if isinstance(data, str):
+            self._data = data
+        self.icon_create_function = icon_create_function
+        self.cluster = cluster
+        self.sidecar = sidecar
+
+    def render(self, **kwargs):
+        """Renders the HTML representation of the element."""
+        super(_VolcanoMarkers, self).render(**kwargs)
+
+        if self.sidecar is not None:
+            self.get_root().header.add_child(
+                JavascriptLink(url=_sidecar_file), name='volcano_sidecar')
+
+
+def _to_script_json(values):
+    """Encode values as json text that is safe within an html script tag.
+
+    :param values: list
+    :return: str
+    """
+    return json.dumps(values).replace('</', '<\\/')
+
+
+def _generate_volcano_cluster_layer(lats, lons, elevation_classes, tooltips,
+                                    popups):
+    """Generate "Volcanoes of the World" marker cluster layer, and return it.
+
+    Rather than one folium marker object per volcano, the markers are
+    written to the page as rows of [lat, lon, elevation class, number],
+    along with arrays of their tooltips and popups, and are created in
+    the browser. Each cluster icon is drawn as a pie chart of the
+    elevation classes of its markers, colored as the markers are.
+
+    :param lats: list of float
+    :param lons: list of float
+    :param elevation_classes: list of int
+    :param tooltips: list
+    :param popups: list
+    :return: folium.plugins.FastMarkerCluster
+    """
+    colors = _to_script_json(values=_elevation_colors.tolist())
+    callback = _cluster_marker_callback % {
+        'colors': colors, 'tooltips': _to_script_json(values=tooltips),
+        'popups': _to_script_json(values=popups),
+        'marker_icon': _marker_icon_function}
+    icon_create_function = _cluster_icon_function % {'colors': colors}
+    data = [list(row) for row in zip(lats, lons, elevation_classes,
+                                     range(len(lats)))]
+
+    return _VolcanoMarkers(data=data, callback=callback,
+                           icon_create_function=icon_create_function,
+                           name="Volcanoes of the World (via GVP)")
+
+
+def _generate_volcano_sidecar(dataframe):
+    """Collect the attributes of every volcano for a sidecar script, and
+    return them.
+
+    Return a dict of column names and rows of [number, name, elevation,
+    lat, lon, elevation class]. A missing elevation is null, and the
+    float32 coordinates are rounded to 4 decimal places (about 10m).
 
     :param dataframe: pandas.DataFrame
-    :return: tuple
+    :return: dict
+    """
+    elevations = dataframe["Elevation (m)"]
+    rows = zip(dataframe["Volcano Number"].tolist(),
+               dataframe["Volcano Name"].tolist(),
+               elevations.fillna(0).astype('int32').astype(object).where(
+                   elevations.notna(), None).tolist(),
+               dataframe["Latitude"].to_numpy(dtype=float).round(4).tolist(),
+               dataframe["Longitude"].to_numpy(dtype=float).round(4).tolist(),
+               _classify_elevations(elevations=elevations).tolist())
+
+    return {'columns': ['number', 'name', 'elevation', 'lat', 'lon',
+                        'elevation_class'],
+            'rows': [list(row) for row in rows]}
+
+
+def _generate_sidecar_marker_callback():
+    """Generate the javascript function that creates a volcano marker
+    from a sidecar row (see _generate_volcano_sidecar), and return it.
+
+    :return: str
+    """
+    template = _popup_template.format(
+        height='400', width='600',
+        embed_url='https://www.openstreetmap.org/export/embed.html',
+        layer_type='cyclemap', name='{name}', elev='{elev}',
+        detail_url='{detail_url}', bbox='{bbox}')
+
+    return _sidecar_marker_callback % {
+        'colors': _to_script_json(values=_elevation_colors.tolist()),
+        'template': _to_script_json(values=template),
+        'marker_icon': _marker_icon_function, 'lat_diff': 0.088,
+        'lon_diff': 0.160}
+
+
+def _generate_volcano_sidecar_layer(sidecar, cluster):
+    """Generate "Volcanoes of the World" layer of markers that are created
+    in the browser from a sidecar script, and return it.
+
+    The page holds no per-volcano data: the markers are created from
+    the rows of the sidecar (see _generate_volcano_sidecar), and their
+    popups are filled in from one shared template when opened. With
+    cluster set, the markers are grouped into clusters, as by
+    _generate_volcano_cluster_layer.
+
+    :param sidecar: dict
+    :param cluster: bool
+    :return: folium.plugins.FastMarkerCluster
+    """
+    colors = _to_script_json(values=_elevation_colors.tolist())
+    icon_create_function = _cluster_icon_function % {'colors': colors}
+
+    return _VolcanoMarkers(data=f'{_sidecar_variable}.rows',
+                           callback=_generate_sidecar_marker_callback(),
+                           icon_create_function=icon_create_function,
+                           cluster=cluster, sidecar=sidecar,
+                           name="Volcanoes of the World (via GVP)")
+
+
+def _classify_populations(populations):
+    """Determine the population class of each of populations, by binning
+    them against the population thresholds, and return the classes.
+
+    :param populations: list
+    :return: numpy.ndarray
+    """
+    return np.digitize(np.asarray(populations, dtype=float),
+                       bins=_population_bins)
+
+
+def _load_population_data(file, tolerance=None, topojson=False):
+    """Load the country polygons of file, classify them by population,
+    and return them as json text for the page.
+
+    Each feature is given a pop_class property, its population class
+    (see _classify_populations), for the layer's shared style lookup.
+    With a tolerance, or with topojson set, the polygons are simplified
+    first (see geo_simplify.simplify_file).
+
+    The json text is kept in a process-level cache, by the path of file
+    and the options used, and is reused for as long as the modification
+    time of file is unchanged, so repeated maps neither re-read nor
+    re-classify the polygons.
+
+    :param file: str
+    :param tolerance: float
+    :param topojson: bool
+    :return: str
+    """
+    key = (os.path.abspath(file), tolerance, topojson)
+    mtime = os.stat(file).st_mtime_ns
+    cached = _population_cache.get(key)
+
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    if tolerance is None and not topojson:
+        with open(file, 'r', encoding='utf-8-sig') as infile:
+            data = json.load(infile)
+        features = data['features']
+    else:
+        data = json.loads(geo_simplify.simplify_file(
+            file=file, tolerance=tolerance or 0, topojson=topojson))
+        features = data['features'] if not topojson \
+            else data['objects']['countries']['geometries']
+
+    classes = _classify_populations(populations=[
+        feature['properties']['POP2005'] for feature in features])
+
+    for feature, pop_class in zip(features, classes.tolist()):
+        feature['properties']['pop_class'] = pop_class
+
+    text = _to_script_json(values=data)
+    _population_cache[key] = (mtime, text)
+
+    return text
+
+
+class _PopulationPolygons(Layer):
+    """Layer of country polygons, as GeoJSON or TopoJSON text, styled in
+    the browser by their pop_class property.
+
+    Rather than one style dict per feature, the page holds one list of
+    styles, indexed by population class, that all features share.
     """
-    numbers = list(dataframe["Volcano Number"])
-    names = list(dataframe["Volcano Name"])
-    elevations = list(dataframe["Elevation (m)"])
-    latitudes = list(dataframe["Latitude"])
-    longitudes = list(dataframe["Longitude"])
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }}_styles = {{ this.styles }};
+        var {{ this.get_name() }}_data = {{ this.data }};
+        var {{ this.get_name() }} = L.geoJson(
+            {%- if this.topojson %}
+            topojson.feature({{ this.get_name() }}_data,
+                             {{ this.get_name() }}_data.objects.countries),
+            {%- else %}
+            {{ this.get_name() }}_data,
+            {%- endif %}
+            {style: function (feature) {
+                return {{ this.get_name() }}_styles[
+                    feature.properties.pop_class];
+            }}
+        ).addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+        """)
+
+    def __init__(self, data, styles, topojson=False, name=None):
+        super(_PopulationPolygons, self).__init__(name=name)
+        self._name = 'PopulationPolygons'
+        self.data = data
+        self.styles = _to_script_json(values=styles)
+        self.topojson = topojson
 
-    return numbers, names, elevations, latitudes, longitudes
+    def render(self, **kwargs):
+        """Renders the HTML representation of the element."""
+        super(_PopulationPolygons, self).render(**kwargs)
 
+        if self.topojson:
+            self.get_root().header.add_child(
+                JavascriptLink(url=_topojson_url), name='topojson')
 
-def _generate_population_layer(file):
+
+def _generate_population_layer(file, tolerance=None, topojson=False):
     """Generate "Population by Country" FeatureGroup layer and return it.
 
+    The countries are classified by population once, and are styled in
+    the browser from one shared list of styles (see
+    _load_population_data). With a tolerance (in degrees), or with
+    topojson set, the country polygons are simplified and quantized
+    first, and the result is cached next to file (see
+    geo_simplify.simplify_file). With topojson set, they are embedded
+    as TopoJSON, with shared borders stored once.
+
     :param file: str
+    :param tolerance: float
+    :param topojson: bool
     :return: folium.FeatureGroup
     """
     fgp = folium.FeatureGroup(name="Population by Country (2005 data)")
+    data = _load_population_data(file=file, tolerance=tolerance,
+                                 topojson=topojson)
+    fgp.add_child(child=_PopulationPolygons(data=data,
+                                            styles=_population_styles,
+                                            topojson=topojson))
+
+    return fgp
 
-    layer = folium.GeoJson(data=open(file, 'r', encoding='utf-8-sig').read(),
-        style_function=lambda x: {'weight': 0, 'fillColor':
-            'yellow' if x['properties']['POP2005'] < 10000000
-            else 'orange' if 10000000 <= x['properties']['POP2005'] < 20000000
-            else 'red'}
-    )
 
-    fgp.add_child(child=layer)
+class _TiledLayer(Layer):
+    """Layer that fetches the tiles of a tile pyramid (see tile_pyramid)
+    as the map shows them, and draws the data of each tile with a draw
+    function, until the tile leaves the view.
 
-    return fgp
+    The tiles are tracked by a Leaflet GridLayer, so only the tiles
+    within the visible viewport, at the zoom level of the map (or at
+    max_zoom, beyond it), are fetched. Empty tiles are not written, and
+    are skipped when their fetch fails.
+    """
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = {{ this.script }}.addTo(
+            {{ this._parent.get_name() }});
+        {% endmacro %}
+        """)
+
+    def __init__(self, url, draw, max_zoom, name=None):
+        super(_TiledLayer, self).__init__(name=name, overlay=True)
+        self._name = 'TiledLayer'
+        self.script = _tiled_layer_script % {
+            'url': _to_script_json(values=url), 'draw': draw,
+            'max_zoom': max_zoom}
+
+
+def generate_tiled_webmap(data_dir, save_dir, max_zoom=6,
+                          tile_format='geojson'):
+    """Export the two layers as tile pyramids under save_dir, generate a
+    folium.Map that loads them tile by tile, and return it.
+
+    The population polygons are simplified for each zoom level and
+    clipped to its tiles (see tile_pyramid.write_polygon_tiles). The
+    volcano points are thinned below max_zoom, keeping the highest
+    volcanoes (see tile_pyramid.write_point_tiles). The tile_format is
+    one of tile_pyramid.formats. The page must be served over http,
+    along with the tiles, for the browser to fetch them.
+
+    :param data_dir: str
+    :param save_dir: str
+    :param max_zoom: int
+    :param tile_format: str
+    :return: folium.Map
+    """
+    webmap = folium.Map(location=[38.000, -99.000], tiles="Mapbox Bright")
+    population = json.loads(_load_population_data(
+        file=f'{data_dir}/world.json'))
+    collection = dict(population, features=[
+        {'type': 'Feature', 'geometry': feature['geometry'], 'properties': {
+            'NAME': feature['properties']['NAME'],
+            'pop_class': feature['properties']['pop_class']}}
+        for feature in population['features']])
+    tile_pyramid.write_polygon_tiles(
+        directory=f'{save_dir}/{_tile_dir}/population', collection=collection,
+        max_zoom=max_zoom, tile_format=tile_format)
+
+    dataframe = gvp.load_dataframe(data_dir=data_dir, columns=[
+        'Volcano Number', 'Volcano Name', 'Elevation (m)', 'Latitude',
+        'Longitude'])
+    rows = sorted(_generate_volcano_sidecar(dataframe=dataframe)['rows'],
+                  key=lambda row: (row[2] is None, -(row[2] or 0)))
+    tile_pyramid.write_point_tiles(
+        directory=f'{save_dir}/{_tile_dir}/volcanoes',
+        lons=[row[4] for row in rows], lats=[row[3] for row in rows],
+        rows=[[row[0], row[1], row[2], row[5]] for row in rows],
+        columns=['number', 'name', 'elevation', 'elevation_class'],
+        max_zoom=max_zoom, tile_format=tile_format)
+
+    webmap.add_child(child=_TiledLayer(
+        url=f'{_tile_dir}/population/{{z}}/{{x}}/{{y}}.json',
+        draw=_tiled_population_draw % {
+            'styles': _to_script_json(values=_population_styles)},
+        max_zoom=max_zoom, name="Population by Country (2005 data)"))
+    webmap.add_child(child=_TiledLayer(
+        url=f'{_tile_dir}/volcanoes/{{z}}/{{x}}/{{y}}.json',
+        draw=_tiled_volcano_draw % {
+            'callback': _generate_sidecar_marker_callback()},
+        max_zoom=max_zoom, name="Volcanoes of the World (via GVP)"))
+    webmap.add_child(child=folium.LayerControl())
+
+    return webmap
+
+
+def _load_volcano_layer(data_dir, cluster=False, sidecar=False):
+    """Load the GVP dataset, generate "Volcanoes of the World" layer, and
+    return it.
+
+    With cluster set, the volcano markers are grouped into clusters in
+    the browser (see _generate_volcano_cluster_layer). With sidecar
+    set, the volcano data is left out of the page, to be written to a
+    sidecar script by write_webmap (see _generate_volcano_sidecar_layer).
+
+    :param data_dir: str
+    :param cluster: bool
+    :param sidecar: bool
+    :return: folium.map.Layer
+    """
+    dataframe = gvp.load_dataframe(data_dir=data_dir, columns=[
+        'Volcano Number', 'Volcano Name', 'Elevation (m)', 'Latitude',
+        'Longitude'])
+
+    if sidecar:
+        return _generate_volcano_sidecar_layer(
+            sidecar=_generate_volcano_sidecar(dataframe=dataframe),
+            cluster=cluster)
+
+    lats, lons, fill_colors, tooltips, popups = _generate_marker_attributes(
+        dataframe=dataframe)
+
+    if cluster:
+        elevation_classes = _classify_elevations(
+            elevations=dataframe["Elevation (m)"]).tolist()
+        return _generate_volcano_cluster_layer(
+            lats=lats, lons=lons, elevation_classes=elevation_classes,
+            tooltips=tooltips, popups=popups)
+
+    return _generate_volcano_layer(lats=lats, lons=lons,
+                                   fill_colors=fill_colors, tooltips=tooltips,
+                                   popups=popups)
 
 
-def generate_webmap(data_dir):
+def generate_webmap(data_dir, cluster=False, sidecar=False, tolerance=None,
+                    topojson=False):
     """Generate a folium.Map, add two FeatureGroup layers, and return it.
 
+    The options select how the volcano layer (see _load_volcano_layer)
+    and the population layer (see _generate_population_layer) are
+    generated.
+
     :param data_dir: str
+    :param cluster: bool
+    :param sidecar: bool
+    :param tolerance: float
+    :param topojson: bool
     :return: folium.Map
     """
     webmap = folium.Map(location=[38.000, -99.000], tiles="Mapbox Bright")
-    population_layer = _generate_population_layer(file=f'{data_dir}/world.json')
+    population_layer = _generate_population_layer(
+        file=f'{data_dir}/world.json', tolerance=tolerance, topojson=topojson)
     webmap.add_child(child=population_layer)
-    dataframe = gvp.load_dataframe(data_dir=data_dir)
-    nums, names, elevs, lats, lons = _parse_volcano_data(dataframe=dataframe)
-    volcano_layer = _generate_volcano_layer(nums=nums, names=names, elevs=elevs,
-                                            lats=lats, lons=lons)
+    volcano_layer = _load_volcano_layer(data_dir=data_dir, cluster=cluster,
+                                        sidecar=sidecar)
     webmap.add_child(child=volcano_layer)
     webmap.add_child(child=folium.LayerControl())
 
     return webmap
 
 
+class _RenderedElement(Element):
+    """Element that renders as the text it was given, such as an element
+    of a page fragment that was rendered by an earlier build.
+    """
+    def __init__(self, text):
+        super(_RenderedElement, self).__init__()
+        self.text = text
+
+    def render(self, **kwargs):
+        """Renders the HTML representation of the element."""
+        return self.text
+
+
+class _LayerFragment(Layer):
+    """Stand-in for a layer of a built page (see build_webmap).
+
+    Given a layer, the layer is rendered in place of the stand-in, and
+    every element that it adds to the header, html, and script of the
+    page is captured, as rendered, into the fragment attribute. Given a
+    fragment instead, its elements are added to the page as they were
+    rendered, without the layer being generated at all.
+    """
+    _sections = ('header', 'html', 'script')
+
+    def __init__(self, layer=None, fragment=None):
+        self.layer = layer
+        self.fragment = fragment
+        options = fragment['options'] if fragment else {
+            'name': layer.layer_name, 'overlay': layer.overlay,
+            'control': layer.control, 'show': layer.show}
+        super(_LayerFragment, self).__init__(**options)
+
+    def get_name(self):
+        """Return the javascript name of the layer."""
+        return self.fragment['name'] if self.fragment \
+            else self.layer.get_name()
+
+    @property
+    def sidecar(self):
+        """Return the sidecar data of the layer, once rendered, if any."""
+        return self.fragment.get('sidecar') if self.fragment else None
+
+    def render(self, **kwargs):
+        """Renders the HTML representation of the element."""
+        figure = self.get_root()
+
+        if self.fragment is not None:
+            for section, name, text in self.fragment['elements']:
+                getattr(figure, section).add_child(
+                    child=_RenderedElement(text=text), name=name)
+            return
+
+        before = {section: dict(getattr(figure, section)._children)
+                  for section in self._sections}
+        self.layer._parent = self._parent
+        self.layer.render(**kwargs)
+        elements = []
+
+        for section in self._sections:
+            for name, element in getattr(figure, section)._children.items():
+                if before[section].get(name) is not element:
+                    elements.append([section, name, element.render(**kwargs)])
+
+        self.fragment = {'name': self.layer.get_name(),
+                         'options': {'name': self.layer_name,
+                                     'overlay': self.overlay,
+                                     'control': self.control,
+                                     'show': self.show},
+                         'elements': elements,
+                         'sidecar': getattr(self.layer, 'sidecar', None)}
+
+
+def _hash_file(path):
+    """Compute the sha1 hash of the file at path, or return None when it
+    does not exist.
+
+    :param path: str
+    :return: str
+    """
+    try:
+        with open(path, 'rb') as infile:
+            return hashlib.sha1(infile.read()).hexdigest()
+
+    except OSError:
+        return None
+
+
+def _generator_sources():
+    """Return the hashes of the source files of the modules that generate
+    the build stages, by file name, so that a stage built by older code
+    is rebuilt.
+
+    :return: dict
+    """
+    if not _generator_hashes:
+        for path in _generator_files:
+            _generator_hashes[os.path.basename(path)] = _hash_file(path=path)
+
+    return _generator_hashes
+
+
+def _stage_key(stage, **inputs):
+    """Derive the key of a build stage from the values of its inputs.
+
+    :param stage: str
+    :return: str
+    """
+    key = dict(inputs, stage=stage, schema_version=_build_schema_version,
+               folium=folium.__version__, generators=_generator_sources())
+
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode(
+        'utf-8')).hexdigest()
+
+
+def _read_build_file(path):
+    """Read a json build file, or return None when it cannot be read.
+
+    :param path: str
+    :return: dict
+    """
+    try:
+        with open(path, encoding='utf-8') as infile:
+            return json.load(infile)
+
+    except (OSError, ValueError):
+        return None
+
+
+def _write_build_file(path, content):
+    """Write a json build file, replacing any earlier one at once.
+
+    :param path: str
+    :param content: dict
+    :return: None
+    """
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as outfile:
+        json.dump(content, outfile, separators=(',', ':'))
+    os.replace(f'{path}.tmp', path)
+
+
+def build_webmap(data_dir, file, cluster=False, sidecar=False, tolerance=None,
+                 topojson=False, rebuild=False):
+    """Build the webmap page at file incrementally, and return the status
+    of each of its stages.
+
+    The page is built in three stages: the population layer fragment,
+    the volcano layer fragment, and the page itself. Each stage is keyed
+    by a hash of its inputs: the content hashes of world.json or of the
+    GVP asset files, the options that apply to it, and, for the page,
+    the keys of both fragments. The keys, the input hashes, and the
+    hashes of the files written are recorded in a build manifest, in
+    the build directory next to file (webmap-build), along with the
+    rendered fragments.
+
+    When the page key is unchanged, and the files written last time are
+    unchanged as well, the build stops there: nothing is loaded,
+    rendered, or written. Otherwise, a fragment found in the build
+    directory under its current key is reused as rendered, and only the
+    other fragments are generated. With rebuild set, every stage runs.
+
+    Return a dict of each stage and its status: 'unchanged', 'reused',
+    or 'generated'.
+
+    :param data_dir: str
+    :param file: str
+    :param cluster: bool
+    :param sidecar: bool
+    :param tolerance: float
+    :param topojson: bool
+    :param rebuild: bool
+    :return: dict
+    """
+    build_dir = os.path.join(os.path.dirname(file), _build_dir)
+    manifest = _read_build_file(path=f'{build_dir}/{_build_manifest}') or {}
+    outputs = [file]
+    if sidecar:
+        outputs.append(os.path.join(os.path.dirname(file), _sidecar_file))
+
+    world_hash = _hash_file(path=f'{data_dir}/world.json')
+    try:
+        gvp_fingerprint = gvp.fingerprint_asset_files(
+            data_dir=data_dir, known=manifest.get('inputs', {}).get('gvp'))
+    except OSError:
+        gvp_fingerprint = None
+
+    def stage_keys():
+        population = _stage_key(stage='population', world=world_hash,
+                                tolerance=tolerance, topojson=topojson)
+        volcanoes = None if gvp_fingerprint is None else _stage_key(
+            stage='volcanoes', cluster=cluster, sidecar=sidecar,
+            gvp=[[entry[0], entry[3]] for entry in gvp_fingerprint])
+        return {'population': population, 'volcanoes': volcanoes,
+                'page': _stage_key(stage='page', population=population,
+                                   volcanoes=volcanoes, outputs=[
+                                       os.path.basename(output)
+                                       for output in outputs])}
+
+    keys = stage_keys()
+
+    if not rebuild and manifest.get('stages') == keys and all(
+            _hash_file(path=output) == manifest.get('outputs', {}).get(
+                os.path.basename(output)) for output in outputs):
+        return {stage: 'unchanged' for stage in _build_stages}
+
+    os.makedirs(build_dir, exist_ok=True)
+    status = {'page': 'generated'}
+    fragments = dict()
+
+    for stage in ('population', 'volcanoes'):
+        fragment = None
+        if not rebuild and keys[stage] is not None:
+            fragment = _read_build_file(
+                path=f'{build_dir}/{stage}-{keys[stage]}.json')
+
+        if fragment is not None:
+            fragments[stage] = _LayerFragment(fragment=fragment)
+            status[stage] = 'reused'
+        elif stage == 'population':
+            fragments[stage] = _LayerFragment(
+                layer=_generate_population_layer(
+                    file=f'{data_dir}/world.json', tolerance=tolerance,
+                    topojson=topojson))
+            status[stage] = 'generated'
+        else:
+            fragments[stage] = _LayerFragment(layer=_load_volcano_layer(
+                data_dir=data_dir, cluster=cluster, sidecar=sidecar))
+            status[stage] = 'generated'
+
+    if gvp_fingerprint is None:
+        gvp_fingerprint = gvp.fingerprint_asset_files(data_dir=data_dir)
+        keys = stage_keys()
+
+    # The layer fragments refer to the map by its name, so the map is
+    # given a fixed name for them to be reusable.
+    webmap = folium.Map(location=[38.000, -99.000], tiles="Mapbox Bright")
+    webmap._id = 'webmap'
+    webmap.add_child(child=fragments['population'])
+    webmap.add_child(child=fragments['volcanoes'])
+    webmap.add_child(child=folium.LayerControl())
+    write_webmap(webmap=webmap, file=file)
+
+    for stage, fragment in fragments.items():
+        if status[stage] == 'generated':
+            _write_build_file(path=f'{build_dir}/{stage}-{keys[stage]}.json',
+                              content=fragment.fragment)
+
+    _write_build_file(path=f'{build_dir}/{_build_manifest}', content={
+        'schema_version': _build_schema_version,
+        'inputs': {'world': world_hash, 'gvp': gvp_fingerprint},
+        'stages': keys,
+        'outputs': {os.path.basename(output): _hash_file(path=output)
+                    for output in outputs}})
+
+    current = {f'{stage}-{keys[stage]}.json' for stage in fragments}
+    for name in os.listdir(build_dir):
+        if name.endswith('.json') and name != _build_manifest and \
+                name not in current:
+            os.remove(f'{build_dir}/{name}')
+
+    return status
+
+
 def write_webmap(webmap, file):
     """Save instance of folium.Map as html file to local filesystem.
 
+    When the map was generated with sidecar set, its volcano data is
+    saved to the sidecar script next to file, once, as compact json.
+
     :param webmap: folium.Map
     :param file: str
     :return: None
     """
     webmap.save(outfile=file)
 
+    for layer in webmap._children.values():
+        if isinstance(layer, (_VolcanoMarkers, _LayerFragment)) and \
+                layer.sidecar is not None:
+            sidecar_path = os.path.join(os.path.dirname(file), _sidecar_file)
+            with open(sidecar_path, 'w', encoding='utf-8') as outfile:
+                outfile.write(f'var {_sidecar_variable} = ')
+                json.dump(layer.sidecar, outfile, separators=(',', ':'))
+                outfile.write(';\n')
+
 
 def _parse_args():
     """Parse and validate command line arguments.
@@ -241,6 +1171,27 @@ def _parse_args():
                         help='Directory to use for local data assets.')
     parser.add_argument('-s', '--save', type=str, default=save_dir,
                         help='Directory to use to save the webmap file.')
+    parser.add_argument('-c', '--cluster', action='store_true',
+                        help='Group nearby volcano markers into clusters.')
+    parser.add_argument('--sidecar', action='store_true',
+                        help='Save the volcano data to a sidecar script.')
+    parser.add_argument('--simplify', type=float, default=None,
+                        metavar='DEGREES',
+                        help='Simplify the country borders to this '
+                             'tolerance, in degrees (e.g. 0.05).')
+    parser.add_argument('--topojson', action='store_true',
+                        help='Embed the country borders as TopoJSON.')
+    parser.add_argument('--tiles', action='store_true',
+                        help='Export both layers as tile pyramids, loaded '
+                             'by the page tile by tile.')
+    parser.add_argument('--tile-format', type=str, default='geojson',
+                        choices=tile_pyramid.formats,
+                        help='Format of the exported tiles.')
+    parser.add_argument('--max-zoom', type=int, default=6,
+                        help='Highest zoom level of the exported tiles.')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Regenerate every layer, ignoring the build '
+                             'cache.')
     return parser.parse_args()
 
 
@@ -253,7 +1204,20 @@ if __name__ == '__main__':
     data_dir = args.data
     save_dir = args.save
 
-    webmap = generate_webmap(data_dir=data_dir)
-    write_webmap(webmap=webmap, file=f'{save_dir}/{save_file}')
+    if args.tiles:
+        webmap = generate_tiled_webmap(data_dir=data_dir, save_dir=save_dir,
+                                       max_zoom=args.max_zoom,
+                                       tile_format=args.tile_format)
+        write_webmap(webmap=webmap, file=f'{save_dir}/{save_file}')
+        status = {'page': 'generated'}
+    else:
+        status = build_webmap(data_dir=data_dir,
+                              file=f'{save_dir}/{save_file}',
+                              cluster=args.cluster, sidecar=args.sidecar,
+                              tolerance=args.simplify, topojson=args.topojson,
+                              rebuild=args.rebuild)
 
-    print(f'Webmap page saved to file:\n  {save_dir}/{save_file}')
+    if status['page'] == 'unchanged':
+        print(f'Webmap page is up to date:\n  {save_dir}/{save_file}')
+    else:
+        print(f'Webmap page saved to file:\n  {save_dir}/{save_file}')